@@ -0,0 +1,292 @@
+"""
+Admission control for the expensive routes (chat turns, multimodal uploads).
+
+Each request is weighed by what it will cost (`request_cost`: media type plus
+size) and must pass, in order:
+
+1. the user's concurrency limit (`USER_MAX_CONCURRENT_REQUESTS`) -> 429;
+2. the user's token bucket (`USER_RATE_PER_SECOND`, `USER_RATE_BURST` cost
+   units) -> 429 with the time until enough tokens are back;
+3. the worker's concurrency limit (`ADMISSION_MAX_CONCURRENT_REQUESTS`). Up
+   to `ADMISSION_MAX_QUEUE` requests wait for a slot; past that, or once the
+   wait exceeds `ADMISSION_QUEUE_TIMEOUT_SECONDS`, requests are shed with 503.
+
+    async with admit(current_user.id, request_cost(media_type, size)):
+        ...
+
+Per-user state lives in the worker (`ADMISSION_BACKEND="memory"`) or in
+Redis (`"redis"`, needs the `redis` extra) so that several workers share the
+same user limits. The worker limit always protects the local process.
+"""
+
+import asyncio
+import logging
+import math
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.core.deadline import remaining
+from app.core.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTIONS
+from app.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+BYTES_PER_MB = 1024 * 1024
+
+
+def request_cost(media_type: Optional[str] = None, size: Optional[int] = None) -> float:
+    """Cost units of a request: its media type's weight plus its size in MB."""
+    cost = settings.ADMISSION_MEDIA_COST.get(media_type or "text", 1.0)
+    if size:
+        cost += settings.ADMISSION_COST_PER_MB * size / BYTES_PER_MB
+    # A request costlier than the burst could never be admitted.
+    return min(cost, settings.USER_RATE_BURST)
+
+
+def _reject(status_code: int, reason: str, retry_after: float, detail: str) -> HTTPException:
+    ADMISSION_REJECTIONS.labels(reason).inc()
+    return HTTPException(
+        status_code=status_code,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class MemoryAdmissionBackend:
+    """Per-user limits kept in this worker."""
+
+    # Idle users' full buckets are dropped once this many are tracked.
+    MAX_TRACKED_USERS = 10_000
+
+    def __init__(self):
+        self._buckets: dict[int, TokenBucket] = {}
+        self._active: dict[int, int] = {}
+
+    async def take(self, user_id: int, cost: float) -> float:
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            if len(self._buckets) >= self.MAX_TRACKED_USERS:
+                self._prune()
+            bucket = self._buckets[user_id] = TokenBucket(
+                settings.USER_RATE_PER_SECOND, settings.USER_RATE_BURST
+            )
+        return bucket.try_acquire(cost)
+
+    def _prune(self) -> None:
+        for user_id, bucket in list(self._buckets.items()):
+            if bucket.try_acquire(0) == 0 and bucket.tokens >= bucket.capacity:
+                del self._buckets[user_id]
+
+    async def acquire_slot(self, user_id: int, lease_id: str) -> bool:
+        active = self._active.get(user_id, 0)
+        if active >= settings.USER_MAX_CONCURRENT_REQUESTS:
+            return False
+        self._active[user_id] = active + 1
+        return True
+
+    async def release_slot(self, user_id: int, lease_id: str) -> None:
+        active = self._active.get(user_id, 0) - 1
+        if active > 0:
+            self._active[user_id] = active
+        else:
+            self._active.pop(user_id, None)
+
+
+# Token bucket kept as a hash {tokens, ts}; returns the wait in seconds.
+_TAKE_SCRIPT = """
+local rate, capacity, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+# In-flight requests as a sorted set of leases scored by expiry, so slots of
+# a crashed worker free themselves.
+_ACQUIRE_SCRIPT = """
+local limit, lease = tonumber(ARGV[1]), tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= limit then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + lease, ARGV[3])
+redis.call('EXPIRE', KEYS[1], math.ceil(lease) + 1)
+return 1
+"""
+
+
+class RedisAdmissionBackend:
+    """
+    Per-user limits shared by all workers through Redis. If Redis can't be
+    reached, requests are let through (and logged) rather than failed.
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._take = self._redis.register_script(_TAKE_SCRIPT)
+        self._acquire = self._redis.register_script(_ACQUIRE_SCRIPT)
+
+    async def take(self, user_id: int, cost: float) -> float:
+        try:
+            wait = await self._take(
+                keys=[f"admission:bucket:{user_id}"],
+                args=[settings.USER_RATE_PER_SECOND, settings.USER_RATE_BURST, cost],
+            )
+        except Exception as e:
+            logger.warning("Admission backend unavailable, admitting: %s", e)
+            return 0.0
+        return float(wait)
+
+    async def acquire_slot(self, user_id: int, lease_id: str) -> bool:
+        try:
+            return bool(
+                await self._acquire(
+                    keys=[f"admission:active:{user_id}"],
+                    args=[
+                        settings.USER_MAX_CONCURRENT_REQUESTS,
+                        settings.MAX_REQUEST_TIMEOUT_SECONDS,
+                        lease_id,
+                    ],
+                )
+            )
+        except Exception as e:
+            logger.warning("Admission backend unavailable, admitting: %s", e)
+            return True
+
+    async def release_slot(self, user_id: int, lease_id: str) -> None:
+        try:
+            await self._redis.zrem(f"admission:active:{user_id}", lease_id)
+        except Exception as e:
+            logger.warning("Could not release admission slot: %s", e)
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+class WorkerLimiter:
+    """Concurrency limit of this worker with a bounded wait queue."""
+
+    def __init__(self, limit: int, max_queue: int):
+        self._semaphore = asyncio.Semaphore(limit)
+        self.max_queue = max_queue
+        self.waiting = 0
+
+    async def acquire(self) -> None:
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                raise _reject(
+                    status.HTTP_503_SERVICE_UNAVAILABLE,
+                    "queue_full",
+                    settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+                    "Server busy, try again later",
+                )
+        self.waiting += 1
+        ADMISSION_QUEUE_DEPTH.inc()
+        try:
+            async with asyncio.timeout(remaining(settings.ADMISSION_QUEUE_TIMEOUT_SECONDS)):
+                await self._semaphore.acquire()
+        except TimeoutError:
+            raise _reject(
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                "queue_timeout",
+                settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+                "Server busy, try again later",
+            )
+        finally:
+            self.waiting -= 1
+            ADMISSION_QUEUE_DEPTH.dec()
+        ADMISSION_IN_FLIGHT.inc()
+
+    def release(self) -> None:
+        ADMISSION_IN_FLIGHT.dec()
+        self._semaphore.release()
+
+
+_backend = None
+_limiter: Optional[WorkerLimiter] = None
+
+
+def get_admission_backend():
+    global _backend
+    if _backend is None:
+        if settings.ADMISSION_BACKEND == "redis":
+            if not settings.REDIS_URL:
+                raise RuntimeError("ADMISSION_BACKEND=redis requires REDIS_URL")
+            _backend = RedisAdmissionBackend(settings.REDIS_URL)
+        else:
+            _backend = MemoryAdmissionBackend()
+    return _backend
+
+
+def _worker_limiter() -> WorkerLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = WorkerLimiter(
+            settings.ADMISSION_MAX_CONCURRENT_REQUESTS, settings.ADMISSION_MAX_QUEUE
+        )
+    return _limiter
+
+
+async def close_admission_backend() -> None:
+    global _backend
+    if isinstance(_backend, RedisAdmissionBackend):
+        await _backend.close()
+    _backend = None
+
+
+@asynccontextmanager
+async def admit(user_id: int, cost: float = 1.0) -> AsyncIterator[None]:
+    """
+    Hold one of the user's and one of the worker's request slots for the
+    enclosed block, after charging `cost` to the user's token bucket. Raises
+    `HTTPException` (429/503 with `Retry-After`) when the request is refused.
+    """
+    if not settings.ADMISSION_ENABLED:
+        yield
+        return
+    # A cost above the burst could never be admitted, however long the
+    # client waited (e.g. the summed cost of a batch).
+    cost = min(cost, settings.USER_RATE_BURST)
+
+    backend = get_admission_backend()
+    lease_id = uuid.uuid4().hex
+    if not await backend.acquire_slot(user_id, lease_id):
+        raise _reject(
+            status.HTTP_429_TOO_MANY_REQUESTS,
+            "user_concurrency",
+            1,
+            "Too many concurrent requests",
+        )
+    try:
+        wait = await backend.take(user_id, cost)
+        if wait > 0:
+            raise _reject(
+                status.HTTP_429_TOO_MANY_REQUESTS, "user_rate", wait, "Rate limit exceeded"
+            )
+        limiter = _worker_limiter()
+        await limiter.acquire()
+        try:
+            yield
+        finally:
+            limiter.release()
+    finally:
+        await backend.release_slot(user_id, lease_id)
@@ -0,0 +1,86 @@
+"""
+Conditional GET for the history endpoints.
+
+Their responses only change when a session's `updated_at` moves (every
+message and attachment write bumps it), so a cheap version query is enough
+to answer a poll with `304 Not Modified` before loading any messages:
+
+    etag = weak_etag(session_id, updated_at)
+    not_modified = conditional_response(request, response, etag, updated_at)
+    if not_modified is not None:
+        return not_modified
+
+ETags are weak because the body may be sent gzip or brotli encoded.
+"""
+
+import datetime
+import hashlib
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+
+def weak_etag(*parts: Any) -> str:
+    digest = hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+
+def http_date(value: datetime.datetime) -> str:
+    """`value` (naive UTC, as stored) as an HTTP date, truncated to seconds."""
+    return format_datetime(
+        value.replace(tzinfo=datetime.timezone.utc, microsecond=0), usegmt=True
+    )
+
+
+def _opaque(tag: str) -> str:
+    return tag.strip().removeprefix("W/")
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime.datetime]
+) -> bool:
+    """
+    Whether the client's copy is current. `If-None-Match` takes precedence;
+    `If-Modified-Since` only has one-second resolution.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {_opaque(tag) for tag in if_none_match.split(",")}
+        return "*" in tags or _opaque(etag) in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=datetime.timezone.utc)
+        modified = last_modified.replace(tzinfo=datetime.timezone.utc, microsecond=0)
+        return modified <= since
+    return False
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime.datetime],
+) -> Optional[Response]:
+    """
+    A bodiless 304 if the client's copy is current. Otherwise sets the
+    validators on `response` and returns None so the handler builds the body.
+    """
+    headers = {
+        "ETag": etag,
+        # Per-user data: caches must revalidate and never share it.
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
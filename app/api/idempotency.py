@@ -0,0 +1,222 @@
+import asyncio
+import datetime
+import hashlib
+import json
+from typing import Any, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import record_cache_access
+from app.models import IdempotencyKey
+
+# Wakes duplicates waiting in this worker as soon as the first request ends;
+# duplicates in other workers fall back to polling.
+_finished_events: dict[tuple[int, str], asyncio.Event] = {}
+
+POLL_INTERVAL_SECONDS = 0.25
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """Stable hash of everything that makes two requests "the same request"."""
+    payload = json.dumps(parts, default=str, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class IdempotentRequest:
+    """
+    Async context manager guarding a mutating endpoint with an optional
+    `Idempotency-Key`:
+
+        async with IdempotentRequest(db, user.id, key, "send_message", fp) as idem:
+            if idem.replay is not None:
+                return idem.replay
+            ...
+            idem.save(payload)
+            return payload
+
+    The first request with a key records it as in progress and stores its
+    response on success. Replays get the stored response back immediately; a
+    concurrent duplicate waits for the first request to finish. If the first
+    request fails, the key is released so a retry can run again.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        key: Optional[str],
+        route: str,
+        fingerprint: str,
+    ):
+        self.db = db
+        self.user_id = user_id
+        self.key = key
+        self.route = route
+        self.fingerprint = fingerprint
+        self.replay: Optional[JSONResponse] = None
+        self._record_id: Optional[int] = None
+        self._response: Any = None
+        self._status_code = 200
+
+    def save(self, response: Any, status_code: int = 200) -> None:
+        self._response = jsonable_encoder(response)
+        self._status_code = status_code
+
+    async def __aenter__(self) -> "IdempotentRequest":
+        if not self.key:
+            return self
+        if len(self.key) > 255:
+            raise HTTPException(status_code=400, detail="Idempotency-Key too long")
+
+        deadline = asyncio.get_running_loop().time() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            if await self._try_claim():
+                record_cache_access("idempotency", hit=False)
+                return self
+
+            row = await self._load()
+            if row is None:
+                # Released by a failed first attempt; try to claim it again.
+                continue
+            if row.fingerprint != self.fingerprint or row.route != self.route:
+                raise HTTPException(
+                    status_code=422,
+                    detail="Idempotency-Key was already used for a different request",
+                )
+            if row.status == "completed":
+                record_cache_access("idempotency", hit=True)
+                self.replay = JSONResponse(
+                    content=row.response,
+                    status_code=row.status_code or 200,
+                    headers={"Idempotent-Replayed": "true"},
+                )
+                return self
+            if await self._take_over_if_stale(row):
+                return self
+
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still in progress",
+                    headers={"Retry-After": "5"},
+                )
+            await self._wait_for_first(min(remaining, POLL_INTERVAL_SECONDS))
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if self._record_id is None:
+            return
+        try:
+            if exc_type is None and self._response is not None:
+                await self.db.execute(
+                    update(IdempotencyKey)
+                    .where(IdempotencyKey.id == self._record_id)
+                    .values(
+                        status="completed",
+                        status_code=self._status_code,
+                        response=self._response,
+                    )
+                )
+            else:
+                await self.db.rollback()
+                await self.db.execute(
+                    delete(IdempotencyKey).where(IdempotencyKey.id == self._record_id)
+                )
+            await self.db.commit()
+        finally:
+            event = _finished_events.pop((self.user_id, self.key), None)
+            if event is not None:
+                event.set()
+
+    async def _try_claim(self) -> bool:
+        now = datetime.datetime.utcnow()
+        expired_before = now - datetime.timedelta(
+            seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS
+        )
+        await self.db.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.user_id == self.user_id,
+                IdempotencyKey.key == self.key,
+                IdempotencyKey.created_at < expired_before,
+            )
+        )
+        # ON CONFLICT rather than catching IntegrityError: a rollback would
+        # expire every object in the request's session, `current_user` too.
+        result = await self.db.execute(
+            pg_insert(IdempotencyKey)
+            .values(
+                user_id=self.user_id,
+                key=self.key,
+                route=self.route,
+                fingerprint=self.fingerprint,
+                status="in_progress",
+                created_at=now,
+            )
+            .on_conflict_do_nothing(constraint="uq_idempotency_keys_user_key")
+            .returning(IdempotencyKey.id)
+        )
+        record_id = result.scalar_one_or_none()
+        await self.db.commit()
+        if record_id is None:
+            return False
+        self._record_id = record_id
+        _finished_events.setdefault((self.user_id, self.key), asyncio.Event())
+        return True
+
+    async def _load(self):
+        result = await self.db.execute(
+            select(
+                IdempotencyKey.id,
+                IdempotencyKey.route,
+                IdempotencyKey.fingerprint,
+                IdempotencyKey.status,
+                IdempotencyKey.status_code,
+                IdempotencyKey.response,
+                IdempotencyKey.created_at,
+            ).where(
+                IdempotencyKey.user_id == self.user_id,
+                IdempotencyKey.key == self.key,
+            )
+        )
+        row = result.first()
+        # Don't sit idle in a transaction while waiting for the first request.
+        await self.db.commit()
+        return row
+
+    async def _take_over_if_stale(self, row) -> bool:
+        """Claim an in-progress key whose owner apparently died."""
+        stale_before = datetime.datetime.utcnow() - datetime.timedelta(
+            seconds=settings.IDEMPOTENCY_STALE_SECONDS
+        )
+        if row.created_at is None or row.created_at >= stale_before:
+            return False
+        result = await self.db.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.id == row.id,
+                IdempotencyKey.status == "in_progress",
+                IdempotencyKey.created_at == row.created_at,
+            )
+            .values(created_at=datetime.datetime.utcnow())
+        )
+        await self.db.commit()
+        if result.rowcount != 1:
+            return False
+        self._record_id = row.id
+        return True
+
+    async def _wait_for_first(self, timeout: float) -> None:
+        event = _finished_events.get((self.user_id, self.key))
+        if event is None:
+            await asyncio.sleep(timeout)
+            return
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
@@ -1,42 +1,106 @@
 # sessions, send message, history
+import asyncio
+import json
+import logging
+import time
 import uuid
-from typing import List
+from contextlib import aclosing
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from sqlalchemy import select
 
-from app.api.deps import get_current_user
-from app.crud.message import create_message
-from app.crud.session import create_chat_session, get_chat_session
+from app.api.admission import admit
+from app.api.conditional import conditional_response, weak_etag
+from app.api.deps import get_current_user, get_current_user_ws
+from app.api.idempotency import IdempotentRequest, request_fingerprint
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, request_deadline, stage
+from app.core.tracing import span
+from app.crud.history import HistoryImport, stream_user_history
+from app.crud.message import add_messages, build_message, get_messages_with_attachments
+from app.crud.search import search_messages
+from app.crud.session import (
+    create_chat_session,
+    delete_chat_session,
+    get_chat_session,
+    get_session_owner,
+    get_session_version,
+    get_sessions_version,
+    list_sessions_with_messages,
+)
 from app.db.session import get_async_session
 from app.models.message import RoleEnum
+from app.schemas.history import ImportSummary, history_record
 from app.schemas.message import MessageCreate, MessageRead
+from app.schemas.search import SearchHit, SearchResults
 from app.schemas.session import SessionCreate, SessionRead
-from app.services.llm_client import generate_response
-from app.models.chat_session import ChatSession
+from app.services.conversation import SessionContext, build_context
+from app.services.llm_client import generate_response, stream_response
+from app.services.s3_gc import s3_gc, schedule_deletion
 from app.schemas.session import SessionWithMessages
-from app.models import Message
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
 
-# List all the user sessions and their related messages
+# List all the user sessions and their related messages (none for archived
+# sessions, until one is opened). Polls carrying the last ETag get a 304
+# without the sessions being loaded.
 @router.get("/sessions", response_model=List[SessionWithMessages])
 async def list_user_sessions(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_session),
+    current_user=Depends(get_current_user),
+):
+    # Read before the data: a concurrent write can only make the ETag stale,
+    # which costs the client one extra full response.
+    count, archived, last_modified = await get_sessions_version(db, current_user.id)
+    not_modified = conditional_response(
+        request,
+        response,
+        weak_etag(current_user.id, count, archived, last_modified),
+        last_modified,
+    )
+    if not_modified is not None:
+        return not_modified
+    return await list_sessions_with_messages(db, current_user.id)
+
+
+# Full-text search over the user's messages and attachment text
+@router.get("/search", response_model=SearchResults)
+async def search_history(
+    q: str = Query(..., min_length=1, max_length=256),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
     db: AsyncSession = Depends(get_async_session),
     current_user=Depends(get_current_user),
 ):
-    query = (
-        select(ChatSession)
-        .where(ChatSession.user_id == current_user.id)
-        .options(selectinload(ChatSession.messages).selectinload(Message.attachments))
-        .order_by(ChatSession.created_at.desc())
+    rows, has_more = await search_messages(db, current_user.id, q, limit, offset)
+    return SearchResults(
+        query=q,
+        limit=limit,
+        offset=offset,
+        has_more=has_more,
+        results=[SearchHit.model_validate(row) for row in rows],
     )
-    result = await db.execute(query)
-    sessions = result.scalars().unique().all()
-    return sessions
 
 
 # Create a new chat session
@@ -56,10 +120,11 @@ async def create_session(
 async def send_message(
     session_id: uuid.UUID,
     message_in: MessageCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: AsyncSession = Depends(get_async_session),
     current_user=Depends(get_current_user),
 ):
-    session = await get_chat_session(db, session_id)
+    session = await get_chat_session(db, session_id, current_user.id)
     if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Session not found"
@@ -69,47 +134,257 @@ async def send_message(
             status_code=status.HTTP_403_FORBIDDEN, detail="Not your session"
         )
 
-    # Save user message
-    await create_message(db, session_id, RoleEnum.user, message_in.content)
+    # Client retries carrying the same Idempotency-Key replay the stored reply,
+    # without being charged by admission control.
+    async with IdempotentRequest(
+        db,
+        current_user.id,
+        idempotency_key,
+        "send_message",
+        request_fingerprint(session_id, message_in.content),
+    ) as idem:
+        if idem.replay is not None:
+            return idem.replay
 
-    # Fetch recent messages for context
-    history = [
-        {"role": m.role.value, "content": m.content} for m in session.messages[-5:]
-    ] + [{"role": "user", "content": message_in.content}]
+        async with admit(current_user.id):
+            # The turn is only saved once the LLM has answered; a failure
+            # (503/504) leaves the session unchanged.
+            user_msg = build_message(session_id, RoleEnum.user, message_in.content)
 
-    # Generate LLM response
-    assistant_content = await generate_response(history)
+            # Rolling summary + recent turns, ending with the new message
+            history = await build_context(db, session_id, pending=[user_msg])
+
+            # Generate LLM response
+            assistant_content = await generate_response(history)
+
+            assistant_msg = build_message(session_id, RoleEnum.assistant, assistant_content)
+            await add_messages(db, [user_msg, assistant_msg])
+
+            idem.save(MessageRead.model_validate(assistant_msg))
+            return assistant_msg
+
+
+# Interactive chat over a WebSocket. The user is authenticated and the session
+# context loaded once per connection; each turn then costs the LLM call and a
+# single insert of the user message and reply.
+#   client -> {"content": "..."}
+#   server -> {"type": "delta", "content": "..."} while the reply streams, then
+#             {"type": "done", "message": MessageRead} or {"type": "error", "detail": "..."}
+# Messages written to the session through other connections are not seen
+# until reconnecting.
+@router.websocket("/sessions/{session_id}/ws")
+async def chat_websocket(
+    websocket: WebSocket,
+    session_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_session),
+    current_user=Depends(get_current_user_ws),
+):
+    # Loads the session (restoring it if archived and ours) before its context
+    session = await get_chat_session(db, session_id, current_user.id)
+    if session is None or session.user_id != current_user.id:
+        await websocket.close(
+            code=status.WS_1008_POLICY_VIOLATION,
+            reason="Session not found" if session is None else "Not your session",
+        )
+        return
+
+    context = await SessionContext.load(db, session_id)
+    # Don't hold a pooled connection while the socket sits idle.
+    await db.commit()
+    await websocket.accept()
+
+    try:
+        while True:
+            raw = await _receive_before_expiry(websocket)
+            if raw is None:
+                await websocket.close(
+                    code=status.WS_1008_POLICY_VIOLATION, reason="Token expired"
+                )
+                return
+            try:
+                content = json.loads(raw).get("content")
+            except (ValueError, AttributeError):
+                content = None
+            if not isinstance(content, str) or not content.strip():
+                await websocket.send_json(
+                    {"type": "error", "detail": 'Expected {"content": "..."}'}
+                )
+                continue
+
+            with span("chat.ws_turn", session_id=str(session_id)):
+                with request_deadline(settings.REQUEST_TIMEOUT_SECONDS):
+                    try:
+                        async with admit(current_user.id):
+                            await _websocket_turn(websocket, db, context, content)
+                    except HTTPException as e:
+                        # Refused by admission control; the connection stays open.
+                        await websocket.send_json(
+                            {
+                                "type": "error",
+                                "detail": e.detail,
+                                "retry_after": int(e.headers["Retry-After"]),
+                            }
+                        )
+    except WebSocketDisconnect:
+        pass
+
+
+async def _receive_before_expiry(websocket: WebSocket) -> Optional[str]:
+    """
+    The next text frame, or None once the token has expired. An idle socket
+    is closed when its token expires; a turn in progress is finished first.
+    """
+    expires_at = websocket.state.token_expires_at
+    if expires_at is None:
+        return await websocket.receive_text()
+    try:
+        return await asyncio.wait_for(
+            websocket.receive_text(), max(0.0, expires_at - time.time())
+        )
+    except asyncio.TimeoutError:
+        return None
 
-    # Save assistant message
-    assistant_msg = await create_message(
-        db, session_id, RoleEnum.assistant, assistant_content
-    )
 
-    return assistant_msg
+async def _websocket_turn(
+    websocket: WebSocket, db: AsyncSession, context: SessionContext, content: str
+) -> None:
+    user_msg = build_message(context.session_id, RoleEnum.user, content)
+    # Only reads if a compaction has finished since the last turn
+    await context.refresh(db)
+    await db.commit()
+
+    reply = []
+    try:
+        async with stage("llm"), aclosing(
+            stream_response(context.prompt([user_msg]))
+        ) as deltas:
+            async for delta in deltas:
+                reply.append(delta)
+                await websocket.send_json({"type": "delta", "content": delta})
+    except WebSocketDisconnect:
+        raise
+    except Exception as e:
+        # Nothing is persisted for a failed turn; the client may resend.
+        logger.warning("Streaming reply for session %s failed: %s", context.session_id, e)
+        detail = str(e) if isinstance(e, DeadlineExceeded) else "LLM request failed"
+        await websocket.send_json({"type": "error", "detail": detail})
+        return
+
+    assistant_msg = build_message(context.session_id, RoleEnum.assistant, "".join(reply))
+    await add_messages(db, [user_msg, assistant_msg])
+    context.extend([user_msg, assistant_msg])
+    await websocket.send_json(
+        {"type": "done", "message": jsonable_encoder(MessageRead.model_validate(assistant_msg))}
+    )
 
 
 # Based on a session_id, fetch all messages in that session
 @router.get("/sessions/{session_id}/messages", response_model=List[MessageRead])
 async def get_session_messages(
     session_id: uuid.UUID,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_async_session),
     current_user=Depends(get_current_user),
 ):
-    session = await get_chat_session(db, session_id)
-    if not session:
+    version = await get_session_version(db, session_id)
+    if version is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    if session.user_id != current_user.id:
+    owner_id, updated_at, archived = version
+    if owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not your session")
 
-    query = (
-        select(Message)
-        .where(Message.session_id == session_id)
-        .options(selectinload(Message.attachments))
-        .order_by(Message.created_at)
+    not_modified = conditional_response(
+        request, response, weak_etag(session_id, updated_at), updated_at
+    )
+    if not_modified is not None:
+        return not_modified
+    if archived:
+        # Restores the session from cold storage; its ETag stays the same.
+        await get_chat_session(db, session_id, current_user.id)
+    return await get_messages_with_attachments(db, session_id)
+
+
+async def _ndjson_lines(request: Request):
+    """Non-empty lines of a streamed NDJSON request body, with their line numbers."""
+    buffer = b""
+    number = 0
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, line
+        if len(buffer) > settings.HISTORY_IMPORT_MAX_LINE_BYTES:
+            raise HTTPException(status_code=413, detail=f"Line {number + 1} is too long")
+    if buffer.strip():
+        yield number + 1, buffer
+
+
+# Download the user's whole history as NDJSON (see app/schemas/history.py)
+@router.get("/export")
+async def export_history(
+    db: AsyncSession = Depends(get_async_session),
+    current_user=Depends(get_current_user),
+):
+    async def body():
+        # Records are small; send them in ~64 kB chunks rather than one per write.
+        chunk = []
+        size = 0
+        async for record in stream_user_history(db, current_user.id):
+            line = record.model_dump_json() + "\n"
+            chunk.append(line)
+            size += len(line)
+            if size >= 64 * 1024:
+                yield "".join(chunk)
+                chunk.clear()
+                size = 0
+        if chunk:
+            yield "".join(chunk)
+
+    return StreamingResponse(
+        body(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="history.ndjson"'},
+    )
+
+
+# Restore an export into the user's account as new sessions, in one transaction
+@router.post("/import", response_model=ImportSummary)
+async def import_history(
+    request: Request,
+    db: AsyncSession = Depends(get_async_session),
+    current_user=Depends(get_current_user),
+):
+    history_import = HistoryImport(
+        db, current_user.id, id_namespace=uuid.uuid4(), copy_media=True
     )
-    result = await db.execute(query)
-    messages = result.scalars().all()
-    return messages
+    try:
+        async for number, line in _ndjson_lines(request):
+            try:
+                record = history_record.validate_json(line)
+            except ValidationError as e:
+                raise HTTPException(
+                    status_code=400, detail=f"Line {number}: {e.errors()[0]['msg']}"
+                )
+            await history_import.add(record)
+        await history_import.flush()
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        # Media already copied for the rolled-back rows
+        if history_import.copied_keys:
+            await schedule_deletion(db, history_import.copied_keys)
+            await db.commit()
+            s3_gc.wake()
+        if isinstance(e, IntegrityError):
+            raise HTTPException(
+                status_code=400,
+                detail="Records must follow their session and message, as in an export",
+            )
+        raise
+    return history_import.summary
 
 
 @router.delete("/sessions/{session_id}", status_code=204)
@@ -118,16 +393,17 @@ async def delete_session(
     db: AsyncSession = Depends(get_async_session),
     current_user=Depends(get_current_user),
 ):
-    session = await get_chat_session(db, session_id)
-    if not session:
+    owner_id = await get_session_owner(db, session_id)
+    if owner_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Session not found"
         )
-    if session.user_id != current_user.id:
+    if owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Not your session"
         )
 
-    await db.delete(session)
-    await db.commit()
+    await delete_chat_session(db, session_id)
+    # Uploaded media and TTS audio are removed in the background
+    s3_gc.wake()
     return None
@@ -1,30 +1,203 @@
+import asyncio
+import json
+import logging
+import math
+import os
 import uuid
-from typing import Optional
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+import anyio
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.admission import admit, request_cost
 from app.api.deps import get_current_user
-from app.crud.attachments import create_attachment
-from app.crud.message import create_message, get_messages_by_session
+from app.api.idempotency import IdempotentRequest, request_fingerprint
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, degraded_stages, mark_degraded
+from app.crud.attachments import build_attachment, create_attachment, get_attachment_content
+from app.crud.message import add_messages, build_message
 from app.crud.session import create_chat_session, get_chat_session
 from app.db.session import get_async_session
-from app.models import VoiceStyle
+from app.models import AudioOutputFormat, AudioOutputQuality, ChatSession, VoiceStyle
 from app.models.attachment import MediaType
 from app.models.message import RoleEnum
+from app.schemas.attachment import AttachmentContentRead
+from app.schemas.upload import (
+    AbortMultipartRequest,
+    CompleteMultipartRequest,
+    FinalizeUploadRequest,
+    PresignedPart,
+    PresignedUpload,
+    UploadRequest,
+)
 from app.services import (
+    ALL_SUPPORTED_TYPES,
+    SUPPORTED_TYPES,
+    AudioDecodeError,
     AudioOutput,
+    DerivedContent,
+    ImageDecodeError,
+    LocalTranscriptionError,
     UploadToS3,
-    analyze_image_vision_fn,
-    extract_text_from_s3_docs,
+    build_context,
+    enrich_media,
+    enrichment_context,
     generate_response,
-    transcribe_file,
+    media_type_for,
+    object_url,
+    preprocess_audio_async,
+    preprocess_image_async,
+    safe_filename,
+    user_upload_prefix,
 )
-from app.utils import clean_text_fn
+from app.services.llm_client import LLMUnavailableError
+from app.utils import CircuitOpenError, content_hash
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/multimodal", tags=["Multimodal"])
 
 
+async def _resolve_session(
+    db: AsyncSession, session_id: Optional[uuid.UUID], user_id: int
+) -> ChatSession:
+    if not session_id:
+        return await create_chat_session(db, user_id, title="Media Session")
+    session = await get_chat_session(db, session_id, user_id)
+    if not session or session.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Invalid session")
+    return session
+
+
+@dataclass
+class IngestedFile:
+    """An uploaded file in S3 with the content derived from it."""
+
+    url: str
+    media_type: Optional[MediaType]
+    metadata: dict
+    content: Optional[DerivedContent]
+
+
+async def _complete_turn(
+    db: AsyncSession,
+    session: ChatSession,
+    prompt: Optional[str],
+    files: Sequence[IngestedFile],
+    audio_output: bool,
+    voice_style: VoiceStyle,
+    audio_format: AudioOutputFormat = AudioOutputFormat.mp3,
+    audio_quality: AudioOutputQuality = AudioOutputQuality.high,
+) -> dict:
+    """
+    Ask the LLM with the enriched context of every file, then persist the
+    user turn, its attachments and the reply in one transaction, and
+    optionally voice the reply. If the LLM fails the request fails (503/504)
+    and nothing is saved. Shared by the proxied, direct-to-S3 and batch
+    upload flows.
+    """
+    # Step 1: The user message, saved together with the reply
+    if len(files) == 1:
+        media_type = files[0].media_type
+        message_content = (
+            prompt or f"Uploaded a {media_type.value if media_type else 'file'}"
+        )
+    elif files:
+        message_content = prompt or f"Uploaded {len(files)} files"
+    else:
+        message_content = prompt or "User sent a text message"
+    user_msg = build_message(session.id, RoleEnum.user, message_content)
+
+    # Step 2: Build conversation history: rolling summary + recent turns
+    history = await build_context(db, session.id, pending=[user_msg])
+
+    # Step 2a: Inject image description or Transcription or or extracted doc text
+    for ingested in files:
+        system_context_msg = enrichment_context(ingested.content)
+        if system_context_msg:
+            if len(files) > 1:
+                filename = ingested.metadata.get("filename") or "file"
+                system_context_msg = f"[{filename}] {system_context_msg}"
+            # Add as a system message as last in history
+            history.append({"role": "system", "content": system_context_msg})
+
+    # Step 3: Generate assistant response using enriched LLM context
+    assistant_content = await generate_response(history)
+
+    assistant_msg = build_message(session.id, RoleEnum.assistant, assistant_content)
+    attachments = [
+        build_attachment(
+            session.id,
+            user_msg.id,
+            ingested.url,
+            ingested.media_type,
+            ingested.metadata,
+            content=ingested.content,
+        )
+        for ingested in files
+    ]
+    await add_messages(db, [user_msg, assistant_msg], attachments)
+
+    response_payload = {
+        "assistant_message": assistant_msg.content,
+        "session_id": str(session.id),
+        "message_id": str(assistant_msg.id),
+    }
+
+    # Step 4: Audio Output (Assistant reply). Optional: if the deadline runs
+    # out, the text answer is returned without audio.
+    speech = None
+    if audio_output:
+        audio_output_service = AudioOutput()
+        try:
+            speech = await audio_output_service.convert_text_into_audio(
+                assistant_content=assistant_content,
+                voice_style=voice_style.value,
+                audio_format=audio_format.value,
+                quality=audio_quality.value,
+            )
+        except (DeadlineExceeded, CircuitOpenError, AudioDecodeError):
+            mark_degraded("tts")
+
+    if speech:
+        response_payload["audio_output_url"] = speech.url
+        response_payload["audio_output_format"] = speech.audio_format
+        response_payload["audio_output_content_type"] = speech.content_type
+        response_payload["voice_style"] = voice_style.value
+
+        await create_attachment(
+            db=db,
+            session_id=session.id,
+            message_id=assistant_msg.id,
+            url=speech.url,
+            media_type=MediaType.audio,
+            metadata_={
+                "voice_style": voice_style.value,
+                "format": speech.audio_format,
+                "content_type": speech.content_type,
+                "bitrate": speech.bitrate,
+                "size": speech.size,
+            },
+            audio_url=speech.url,
+        )
+
+    if len(files) == 1:
+        response_payload["uploaded_file_url"] = files[0].url
+    elif files:
+        response_payload["uploaded_file_urls"] = [ingested.url for ingested in files]
+
+    # Stages skipped for lack of time, e.g. ["transcribe"] or ["tts"]
+    degraded = degraded_stages()
+    if degraded:
+        response_payload["degraded"] = degraded
+
+    return response_payload
+
+
 @router.post("/chat")
 async def multimodal_chat(
     file: Optional[UploadFile] = File(None, description="Optional File Upload"),
@@ -37,12 +210,22 @@ async def multimodal_chat(
         Choose the output voice style:\n
         - alloy: Versatile and neutral-sounding voice.\n
         - echo: Warm and resonant voice.\n
+        - verse: Expressive and dynamic voice.\n
         - fable: Clear and articulate voice.\n
         - onyx: Deep and commanding voice.\n
         - nova: Bright and energetic voice.\n
         - shimmer: Smooth and calming voice.\n
         """,
     ),
+    audio_output_format: AudioOutputFormat = Form(
+        AudioOutputFormat.mp3,
+        description="Encoding of the audio reply; `opus` is the smallest.",
+    ),
+    audio_quality: AudioOutputQuality = Form(
+        AudioOutputQuality.high,
+        description="Bitrate of mp3/opus/aac replies: `low` suits slow mobile links.",
+    ),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: AsyncSession = Depends(get_async_session),
     current_user=Depends(get_current_user),
 ):
@@ -52,160 +235,460 @@ async def multimodal_chat(
     - Supports text or audio output response
     - Returns assistant response and optional audio file URL
     """
-    SUPPORTED_TYPES = {
-        "image": ["image/jpeg", "image/png", "image/webp"],
-        "audio": [
-            "audio/mpeg",
-            "audio/wav",
-            "audio/mp3",
-            "audio/webm",
-            "audio/x-wav",
-            "audio/ogg",
-        ],
-        "document": [
-            "application/pdf",
-            "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        ],
-    }
-
-    all_types = (
-        SUPPORTED_TYPES["image"]
-        + SUPPORTED_TYPES["audio"]
-        + SUPPORTED_TYPES["document"]
-    )
-
     if not file and not prompt:
         raise HTTPException(status_code=400, detail="Either file or prompt is required")
 
-    # Session handling
-    if not session_id:
-        session = await create_chat_session(db, current_user.id, title="Media Session")
-    else:
-        session = await get_chat_session(db, session_id)
-        if not session or session.user_id != current_user.id:
-            raise HTTPException(status_code=403, detail="Invalid session")
-
-    file_url = None
-    media_type = None
-    attachment_metadata = {}
-
-    # Step 1: Save User Message & Attachment if provided
+    file_bytes = None
+    file_hash = None
     if file:
-        if file.content_type not in all_types:
+        if file.content_type not in ALL_SUPPORTED_TYPES:
             raise HTTPException(status_code=400, detail="Unsupported file type")
-
         file_bytes = await file.read()
-        s3_obj = UploadToS3()
-        file_url = s3_obj.upload_file_to_s3(
-            file_bytes, file.filename, file.content_type
-        )
+        file_hash = content_hash(file_bytes)
 
-        attachment_metadata = {"filename": file.filename}
+    # Weighted by media type and size; refused with 429/503 before any work.
+    media = media_type_for(file.content_type) if file else None
+    cost = request_cost(media.value if media else None, len(file_bytes) if file else None)
 
-        # ----- IMAGE -----
-        if file.content_type in SUPPORTED_TYPES["image"]:
-            media_type = MediaType.image
-            image_description = await analyze_image_vision_fn(file_url)
-            attachment_metadata["image_description"] = image_description
+    # Client retries carrying the same Idempotency-Key replay the stored
+    # response instead of re-uploading, re-enriching and re-asking the LLM,
+    # and without being charged by admission control.
+    async with IdempotentRequest(
+        db,
+        current_user.id,
+        idempotency_key,
+        "multimodal_chat",
+        request_fingerprint(
+            session_id,
+            prompt,
+            audio_output,
+            voice_style.value,
+            audio_output_format.value,
+            audio_quality.value,
+            file.filename if file else None,
+            file_hash,
+        ),
+    ) as idem:
+        if idem.replay is not None:
+            return idem.replay
 
-        # ----- AUDIO -----
-        elif file.content_type in SUPPORTED_TYPES["audio"]:
-            media_type = MediaType.audio
-            text_content = transcribe_file(job_name="audio_transcribe", s3_uri=file_url)
-            attachment_metadata["transcription"] = text_content
+        async with admit(current_user.id, cost):
+            # Session handling
+            session = await _resolve_session(db, session_id, current_user.id)
 
-        # ----- DOCUMENT -----
-        elif file.content_type in SUPPORTED_TYPES["document"]:
-            media_type = MediaType.document
-            doc_text = await extract_text_from_s3_docs(file_url)
-            doc_text = clean_text_fn(doc_text)
-            attachment_metadata["document_text"] = doc_text
+            files = [await _ingest_upload(file, file_bytes, file_hash)] if file else []
 
-        else:
-            media_type = None
+            response_payload = await _complete_turn(
+                db,
+                session,
+                prompt,
+                files,
+                audio_output,
+                voice_style,
+                audio_output_format,
+                audio_quality,
+            )
+            idem.save(response_payload)
+            return response_payload
 
-        message_content = (
-            prompt or f"Uploaded a {media_type.value if media_type else 'file'}"
-        )
 
-        user_msg = await create_message(db, session.id, RoleEnum.user, message_content)
+async def _ingest_upload(
+    file: UploadFile, file_bytes: bytes, file_hash: str
+) -> IngestedFile:
+    """Upload a proxied file to S3 and enrich it."""
+    upload_filename = file.filename
+    upload_content_type = file.content_type
+    image_detail = "auto"
+    audio = None
+    metadata = {"filename": file.filename}
 
-        await create_attachment(
-            db,
-            session.id,
-            user_msg.id,
+    # Images are decoded, stripped of EXIF and downscaled before upload
+    # so both S3 and the vision model only ever see the reduced version.
+    if file.content_type in SUPPORTED_TYPES["image"]:
+        try:
+            processed = await preprocess_image_async(file_bytes)
+        except ImageDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid image file")
+        file_bytes = processed.data
+        upload_content_type = processed.content_type
+        upload_filename = f"{os.path.splitext(file.filename or 'image')[0]}.{processed.extension}"
+        image_detail = processed.detail
+
+    # Audio is checked by its actual bytes, downmixed, resampled, trimmed and
+    # re-encoded, so Transcribe gets a small file in the format it's told.
+    elif file.content_type in SUPPORTED_TYPES["audio"] and settings.AUDIO_PREPROCESS_ENABLED:
+        try:
+            audio = await preprocess_audio_async(file_bytes)
+        except AudioDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid audio file")
+        file_bytes = audio.data
+        upload_content_type = audio.content_type
+        upload_filename = f"{os.path.splitext(file.filename or 'audio')[0]}.{audio.extension}"
+        if audio.duration is not None:
+            metadata["duration_seconds"] = round(audio.duration, 2)
+
+    s3_obj = UploadToS3()
+    file_url = await asyncio.to_thread(
+        s3_obj.upload_file_to_s3, file_bytes, upload_filename, upload_content_type
+    )
+
+    try:
+        media_type, content = await enrich_media(
             file_url,
-            media_type,
-            attachment_metadata,
+            file.content_type,
+            image_detail=image_detail,
+            content_key=f"sha256:{file_hash}",
+            audio=audio,
         )
-    else:
-        message_content = prompt or "User sent a text message"
-        user_msg = await create_message(
-            db,
-            session.id,
-            RoleEnum.user,
-            message_content,
+    except LocalTranscriptionError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if content is not None:
+        metadata.update(content.summary())
+    return IngestedFile(file_url, media_type, metadata, content)
+
+
+def _ndjson(event: dict) -> bytes:
+    return (json.dumps(event) + "\n").encode()
+
+
+class _AdmittedStreamingResponse(StreamingResponse):
+    """
+    A streamed response holding an admission slot until it ends, however it
+    ends: Starlette skips `background` tasks when the stream fails or the
+    client disconnects, and a stream that never started never runs its
+    generator's `finally`.
+    """
+
+    def __init__(self, content, admission: AsyncExitStack, **kwargs):
+        super().__init__(content, **kwargs)
+        self.admission = admission
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # Also when cancelled by a disconnect
+            with anyio.CancelScope(shield=True):
+                await self.admission.aclose()
+
+
+@router.post("/batch")
+async def multimodal_batch(
+    files: List[UploadFile] = File(..., description="Files to analyze together"),
+    session_id: Optional[uuid.UUID] = Form(None),
+    prompt: Optional[str] = Form(None, description="User text input or question."),
+    audio_output: bool = Form(False, description="Return response as audio if True."),
+    voice_style: VoiceStyle = Form(VoiceStyle.alloy),
+    audio_output_format: AudioOutputFormat = Form(AudioOutputFormat.mp3),
+    audio_quality: AudioOutputQuality = Form(AudioOutputQuality.high),
+    db: AsyncSession = Depends(get_async_session),
+    current_user=Depends(get_current_user),
+):
+    """
+    Analyze several files in one turn. Files are uploaded and enriched in
+    parallel (`BATCH_CONCURRENCY` at a time), then a single LLM call answers
+    over all of them and the turn is saved with every attachment at once.
+
+    Streams newline-delimited JSON: a `queued` event per file, a `file` event
+    as each one is done (or `file_error` if it was rejected), then `result`
+    with the same payload as `/multimodal/chat`, or `error`.
+    """
+    if len(files) > settings.BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=400, detail=f"At most {settings.BATCH_MAX_FILES} files per batch"
         )
+    for file in files:
+        if file.content_type not in ALL_SUPPORTED_TYPES:
+            raise HTTPException(
+                status_code=400, detail=f"Unsupported file type: {file.filename}"
+            )
+        if file.size is not None and file.size > settings.MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"File too large: {file.filename}")
 
-    # Step 2: Build conversation history directly from DB
-    previous_messages = await get_messages_by_session(db, session.id)
+    session = await _resolve_session(db, session_id, current_user.id)
 
-    history = [
-        {"role": msg.role.value, "content": msg.content} for msg in previous_messages
-    ]
+    # Admitted for the whole batch before the stream starts, so limits still
+    # answer 429/503; released once the response is done. The summed cost is
+    # capped at the burst by admit().
+    admission = AsyncExitStack()
+    await admission.enter_async_context(
+        admit(
+            current_user.id,
+            sum(
+                request_cost(media_type_for(file.content_type).value, file.size)
+                for file in files
+            ),
+        )
+    )
 
-    # Step 2a: Inject image description or Transcription or or extracted doc text
-    system_context_msg = None
-    if file:
-        if "image_description" in attachment_metadata:
-            system_context_msg = (
-                f"OCR extracted from image: {attachment_metadata['image_description']}"
+    semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+    async def ingest(index: int, file: UploadFile):
+        async with semaphore:
+            try:
+                file_bytes = await file.read()
+                result = await _ingest_upload(file, file_bytes, content_hash(file_bytes))
+            except HTTPException as e:
+                return index, None, e.detail
+            except Exception as e:
+                # S3, Textract, Transcribe...: fails this file, not the batch.
+                logger.warning("Batch file %s failed: %s", file.filename, e)
+                return index, None, "File could not be processed"
+            return index, result, None
+
+    async def events():
+        for index, file in enumerate(files):
+            yield _ndjson({"type": "queued", "index": index, "filename": file.filename})
+
+        tasks = [asyncio.create_task(ingest(i, file)) for i, file in enumerate(files)]
+        ingested: dict[int, IngestedFile] = {}
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, result, detail = await next_done
+                if result is None:
+                    yield _ndjson(
+                        {
+                            "type": "file_error",
+                            "index": index,
+                            "filename": files[index].filename,
+                            "detail": detail,
+                        }
+                    )
+                    continue
+                ingested[index] = result
+                yield _ndjson(
+                    {
+                        "type": "file",
+                        "index": index,
+                        "filename": files[index].filename,
+                        "url": result.url,
+                        "media_type": result.media_type.value if result.media_type else None,
+                    }
+                )
+
+            if not ingested:
+                yield _ndjson(
+                    {"type": "error", "status": 400, "detail": "No file could be processed"}
+                )
+                return
+            payload = await _complete_turn(
+                db,
+                session,
+                prompt,
+                [ingested[index] for index in sorted(ingested)],
+                audio_output,
+                voice_style,
+                audio_output_format,
+                audio_quality,
             )
-        elif "transcription" in attachment_metadata:
-            system_context_msg = (
-                f"Transcription of audio: {attachment_metadata['transcription']}"
+            yield _ndjson({"type": "result", **payload})
+        # The status line is already sent: failures the app would answer with
+        # an error status are reported as the last event instead.
+        except HTTPException as e:
+            yield _ndjson({"type": "error", "status": e.status_code, "detail": e.detail})
+        except DeadlineExceeded as e:
+            yield _ndjson({"type": "error", "status": 504, "detail": str(e)})
+        except CircuitOpenError as e:
+            yield _ndjson(
+                {"type": "error", "status": 503, "detail": str(e), "retry_after": e.retry_after}
             )
-        elif "document_text" in attachment_metadata:
-            system_context_msg = f"Extracted text from document: {attachment_metadata['document_text'][:2000]}"  # truncate for safety
+        except LLMUnavailableError:
+            yield _ndjson({"type": "error", "status": 503, "detail": "LLM request failed"})
+        finally:
+            for task in tasks:
+                task.cancel()
 
-        if system_context_msg:
-            # Add as a system message as last in history
-            history.append({"role": "system", "content": system_context_msg})
+    return _AdmittedStreamingResponse(
+        events(), admission, media_type="application/x-ndjson"
+    )
 
-    # Step 3: Generate assistant response using enriched LLM context
-    assistant_content = await generate_response(history)
 
-    assistant_msg = await create_message(
-        db, session.id, RoleEnum.assistant, assistant_content
+@router.get("/attachments/{attachment_id}/content", response_model=AttachmentContentRead)
+async def read_attachment_content(
+    attachment_id: uuid.UUID,
+    include_raw: bool = False,
+    db: AsyncSession = Depends(get_async_session),
+    current_user=Depends(get_current_user),
+):
+    """
+    Text derived from an attachment (document text, image description or
+    audio transcript). History endpoints only carry lightweight attachment
+    metadata; clients fetch this when the user opens an attachment.
+    """
+    content = await get_attachment_content(
+        db, attachment_id, current_user.id, include_raw=include_raw
+    )
+    if content is None:
+        raise HTTPException(status_code=404, detail="Attachment content not found")
+    return AttachmentContentRead(
+        attachment_id=content.attachment_id,
+        kind=content.kind,
+        text=content.text,
+        raw=content.raw if include_raw else None,
     )
 
-    response_payload = {
-        "assistant_message": assistant_msg.content,
-        "session_id": str(session.id),
-        "message_id": str(assistant_msg.id),
-    }
 
-    # Step 4: Audio Output (Assistant reply)
-    if audio_output:
-        audio_output_service = AudioOutput()
-        audio_s3_url = await audio_output_service.convert_text_into_audio(
-            assistant_content=assistant_content,
-            voice_style=voice_style.value,
+@router.post("/uploads", response_model=PresignedUpload)
+async def create_upload(
+    upload_in: UploadRequest,
+    current_user=Depends(get_current_user),
+):
+    """
+    Phase 1 of a direct upload: issue presigned S3 URL(s) for the file.
+    Small files get a single POST policy; files above the multipart threshold
+    get one presigned PUT URL per part.
+    """
+    if upload_in.content_type not in ALL_SUPPORTED_TYPES:
+        raise HTTPException(status_code=400, detail="Unsupported file type")
+    if upload_in.size > settings.MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="File too large")
+
+    key = f"{user_upload_prefix(current_user.id)}{uuid.uuid4()}-{safe_filename(upload_in.filename)}"
+    expires_in = settings.PRESIGNED_URL_EXPIRE_SECONDS
+    s3_obj = UploadToS3()
+
+    if upload_in.size <= settings.MULTIPART_THRESHOLD_BYTES:
+        presigned = s3_obj.create_presigned_post(
+            key, upload_in.content_type, upload_in.size, expires_in
+        )
+        return PresignedUpload(
+            key=key,
+            expires_in=expires_in,
+            url=presigned["url"],
+            fields=presigned["fields"],
         )
 
-        response_payload["audio_output_url"] = audio_s3_url
+    part_size = settings.MULTIPART_PART_SIZE_BYTES
+    part_count = math.ceil(upload_in.size / part_size)
+    if part_count > 10_000:  # S3 hard limit
+        raise HTTPException(status_code=413, detail="File too large")
 
-        await create_attachment(
-            db=db,
-            session_id=session.id,
-            message_id=assistant_msg.id,
-            url=audio_s3_url,
-            media_type=MediaType.audio,
-            metadata_={"voice_style": voice_style.value},
-            audio_url=audio_s3_url,
+    upload_id = await asyncio.to_thread(
+        s3_obj.create_multipart_upload, key, upload_in.content_type
+    )
+    parts = [
+        PresignedPart(
+            part_number=number,
+            url=s3_obj.presign_upload_part(key, upload_id, number, expires_in),
         )
+        for number in range(1, part_count + 1)
+    ]
+    return PresignedUpload(
+        key=key,
+        expires_in=expires_in,
+        upload_id=upload_id,
+        part_size=part_size,
+        parts=parts,
+    )
 
-    if file_url:
-        response_payload["uploaded_file_url"] = file_url
 
-    return response_payload
+@router.post("/uploads/complete", status_code=204)
+async def complete_upload(
+    complete_in: CompleteMultipartRequest,
+    current_user=Depends(get_current_user),
+):
+    """Assemble the parts of a multipart direct upload."""
+    if not complete_in.key.startswith(user_upload_prefix(current_user.id)):
+        raise HTTPException(status_code=403, detail="Not your upload")
+
+    parts = [
+        {"PartNumber": p.part_number, "ETag": p.etag}
+        for p in sorted(complete_in.parts, key=lambda p: p.part_number)
+    ]
+    await asyncio.to_thread(
+        UploadToS3().complete_multipart_upload,
+        complete_in.key,
+        complete_in.upload_id,
+        parts,
+    )
+    return None
+
+
+@router.post("/uploads/abort", status_code=204)
+async def abort_upload(
+    abort_in: AbortMultipartRequest,
+    current_user=Depends(get_current_user),
+):
+    """
+    Abandon a multipart direct upload and free the parts already stored.
+    Uploads a client never completes nor aborts are left to the bucket's
+    AbortIncompleteMultipartUpload lifecycle rule (see README).
+    """
+    if not abort_in.key.startswith(user_upload_prefix(current_user.id)):
+        raise HTTPException(status_code=403, detail="Not your upload")
+
+    await asyncio.to_thread(
+        UploadToS3().abort_multipart_upload, abort_in.key, abort_in.upload_id
+    )
+    return None
+
+
+@router.post("/uploads/finalize")
+async def finalize_upload(
+    finalize_in: FinalizeUploadRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: AsyncSession = Depends(get_async_session),
+    current_user=Depends(get_current_user),
+):
+    """
+    Phase 2 of a direct upload: validate the uploaded object by its S3 key,
+    run enrichment on it and answer exactly like `/multimodal/chat`.
+    """
+    if not finalize_in.key.startswith(user_upload_prefix(current_user.id)):
+        raise HTTPException(status_code=403, detail="Not your upload")
+
+    async with IdempotentRequest(
+        db,
+        current_user.id,
+        idempotency_key,
+        "finalize_upload",
+        request_fingerprint(finalize_in.model_dump(mode="json")),
+    ) as idem:
+        if idem.replay is not None:
+            return idem.replay
+
+        head = await asyncio.to_thread(UploadToS3().head_object, finalize_in.key)
+        if head is None:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        content_type = head.get("ContentType")
+        if content_type not in ALL_SUPPORTED_TYPES:
+            raise HTTPException(status_code=400, detail="Unsupported file type")
+        if head["ContentLength"] > settings.MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="File too large")
+
+        media = media_type_for(content_type)
+        cost = request_cost(media.value if media else None, head["ContentLength"])
+        async with admit(current_user.id, cost):
+            session = await _resolve_session(db, finalize_in.session_id, current_user.id)
+
+            file_url = object_url(finalize_in.key)
+            # Same bytes uploaded with the same part layout yield the same ETag.
+            etag = head["ETag"].strip('"')
+            try:
+                media_type, content = await enrich_media(
+                    file_url,
+                    content_type,
+                    content_key=f"etag:{etag}:{head['ContentLength']}",
+                )
+            except LocalTranscriptionError as e:
+                raise HTTPException(status_code=422, detail=str(e))
+            # Key is "<prefix><uuid4>-<filename>"; the uuid itself has four hyphens.
+            filename = finalize_in.key.rsplit("/", 1)[-1].split("-", 5)[-1]
+            attachment_metadata = {
+                "filename": filename,
+                "size": head["ContentLength"],
+                **(content.summary() if content is not None else {}),
+            }
+
+            response_payload = await _complete_turn(
+                db,
+                session,
+                finalize_in.prompt,
+                [IngestedFile(file_url, media_type, attachment_metadata, content)],
+                finalize_in.audio_output,
+                finalize_in.voice_style,
+                finalize_in.audio_output_format,
+                finalize_in.audio_quality,
+            )
+            idem.save(response_payload)
+            return response_payload
@@ -0,0 +1,111 @@
+"""
+Response compression: brotli when the client accepts it and the optional
+`brotli` package is installed, gzip otherwise.
+
+Bodies below `settings.COMPRESSION_MINIMUM_SIZE`, already compressed media
+(audio, images, archives) and NDJSON streams (`/chat/export`, the
+`/multimodal/batch` progress events, which must reach the client as each
+line is written) are sent as is. Other streamed bodies are flushed chunk by
+chunk.
+
+Written against the responder API of the pinned Starlette (0.48):
+`apply_compression` is synchronous.
+"""
+
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder, IdentityResponder
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # optional: pip install .[brotli]
+    brotli = None
+
+EXCLUDED_CONTENT_TYPES = (
+    "text/event-stream",
+    "application/x-ndjson",
+    "application/gzip",
+    "application/x-gzip",
+    "application/zip",
+    "audio/",
+    "image/",
+    "video/",
+)
+
+
+class _ExcludeContentTypes:
+    """Pass `EXCLUDED_CONTENT_TYPES` through uncompressed."""
+
+    async def send_with_compression(self, message) -> None:
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            excluded = content_type.lower().startswith(EXCLUDED_CONTENT_TYPES)
+            await super().send_with_compression(message)
+            self.content_type_is_excluded = self.content_type_is_excluded or excluded
+            return
+        await super().send_with_compression(message)
+
+
+class _GZipResponder(_ExcludeContentTypes, GZipResponder):
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        self.gzip_file.write(body)
+        if more_body:
+            # Sync flush: the client can decode everything sent so far.
+            self.gzip_file.flush()
+        else:
+            self.gzip_file.close()
+
+        body = self.gzip_buffer.getvalue()
+        self.gzip_buffer.seek(0)
+        self.gzip_buffer.truncate()
+        return body
+
+
+class BrotliResponder(_ExcludeContentTypes, IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app, minimum_size: int, quality: int):
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        data = self.compressor.process(body)
+        return data + (self.compressor.flush() if more_body else self.compressor.finish())
+
+
+def _accepts_brotli(accept_encoding: str) -> bool:
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() == "br":
+            return params.replace(" ", "") not in ("q=0", "q=0.0")
+    return False
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """ASGI middleware compressing responses with brotli or gzip."""
+
+    def __init__(self, app):
+        super().__init__(
+            app,
+            minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+            compresslevel=settings.GZIP_COMPRESSLEVEL,
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        if brotli is not None and _accepts_brotli(accept_encoding):
+            responder = BrotliResponder(
+                self.app, self.minimum_size, settings.BROTLI_QUALITY
+            )
+        elif "gzip" in accept_encoding:
+            responder = _GZipResponder(
+                self.app, self.minimum_size, compresslevel=self.compresslevel
+            )
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+        await responder(scope, receive, send)
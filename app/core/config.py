@@ -10,12 +10,167 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24
     OPENAI_API_KEY: Optional[str] = None
+    OPENAI_BASE_URL: Optional[str] = None
+    OPENAI_TIMEOUT_SECONDS: float = 120.0
+    OPENAI_MAX_CONNECTIONS: int = 100
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    OPENAI_MAX_CONCURRENCY_PER_MODEL: int = 16
+    OPENAI_MODEL_CONCURRENCY: dict[str, int] = {}  # per-model overrides
+    OPENAI_REQUESTS_PER_MINUTE: int = 500
+    OPENAI_MAX_RETRIES: int = 5
+    OPENAI_RETRY_BASE_DELAY: float = 0.5
+    OPENAI_RETRY_MAX_DELAY: float = 20.0
+    # Request deadlines (see app/core/deadline.py). Clients may send their own
+    # budget in seconds with `X-Request-Timeout`, up to the maximum.
+    REQUEST_TIMEOUT_SECONDS: float = 60.0
+    ROUTE_TIMEOUT_SECONDS: dict[str, float] = {
+        "/api/v1/multimodal/chat": 180.0,
+        "/api/v1/multimodal/uploads/finalize": 180.0,
+        "/api/v1/multimodal/batch": 300.0,
+    }
+    MAX_REQUEST_TIMEOUT_SECONDS: float = 300.0
+    # Held back from enrichment (vision, Transcribe, text extraction) so the
+    # LLM can still answer when enrichment runs long
+    DEADLINE_LLM_RESERVE_SECONDS: float = 30.0
+    # Circuit breakers around external backends (app/utils/resilience.py)
+    CIRCUIT_FAILURE_THRESHOLD: int = 5  # consecutive failures that open it
+    CIRCUIT_RESET_SECONDS: float = 30.0  # open time before a probe call
+    CIRCUIT_SLOW_CALL_SECONDS: float = 30.0  # abandoned calls this slow count as failures
+    # Hedged requests for idempotent enrichment calls
+    HEDGE_MIN_SAMPLES: int = 20  # latencies needed before hedging
+    HEDGE_MIN_DELAY_SECONDS: float = 0.5
+    HEDGE_BUDGET_RATIO: float = 0.1  # at most ~10% extra calls
+    HEDGE_MAX_BURST: float = 10.0
+    # Admission control for chat and upload routes (app/api/admission.py).
+    # Request cost = ADMISSION_MEDIA_COST[media type] + ADMISSION_COST_PER_MB * size
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_BACKEND: str = "memory"  # "memory" (per worker) or "redis" (shared)
+    REDIS_URL: Optional[str] = None
+    USER_MAX_CONCURRENT_REQUESTS: int = 4
+    USER_RATE_PER_SECOND: float = 1.0  # cost units refilled per second
+    USER_RATE_BURST: float = 20.0
+    ADMISSION_MAX_CONCURRENT_REQUESTS: int = 32  # per worker
+    ADMISSION_MAX_QUEUE: int = 64  # waiting requests before shedding with 503
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 10.0
+    ADMISSION_MEDIA_COST: dict[str, float] = {
+        "text": 1.0,
+        "image": 2.0,
+        "document": 3.0,
+        "audio": 4.0,
+    }
+    ADMISSION_COST_PER_MB: float = 0.5
     sqlalchemy_echo: bool = False
+    LOG_LEVEL: str = "INFO"
+    # Import heavy service backends in a background thread after startup
+    WARMUP_ON_STARTUP: bool = True
+    # Tracing: "none", "console" or "file"
+    TRACING_EXPORTER: str = "none"
+    TRACING_FILE_PATH: str = "traces.jsonl"
+    TRACING_SERVER_TIMING: bool = True
+    # Response compression (brotli needs the optional `brotli` package)
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    GZIP_COMPRESSLEVEL: int = 6
+    BROTLI_QUALITY: int = 5
     # Storage (S3)
     AWS_ACCESS_KEY_ID: str | None = os.getenv("AWS_ACCESS_KEY_ID")
     AWS_SECRET_ACCESS_KEY: str | None = os.getenv("AWS_SECRET_ACCESS_KEY")
     AWS_S3_BUCKET_NAME: str | None = os.getenv("AWS_S3_BUCKET_NAME")
     AWS_S3_REGION: str | None = os.getenv("AWS_S3_REGION", "us-east-1")
+    AWS_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    AWS_READ_TIMEOUT_SECONDS: float = 60.0
+    AWS_MAX_ATTEMPTS: int = 3
+    TRANSCRIBE_POLL_INTERVAL_SECONDS: float = 5.0
+    TRANSCRIPT_DOWNLOAD_TIMEOUT_SECONDS: float = 30.0
+    # Single-flight coalescing of enrichment calls: "local" (per process) or
+    # "advisory" (claim rows in Postgres, shared across workers)
+    SINGLE_FLIGHT_MODE: str = "local"
+    # A claim older than this is assumed abandoned and taken over
+    SINGLE_FLIGHT_LOCK_TIMEOUT_SECONDS: int = 300
+    SINGLE_FLIGHT_POLL_INTERVAL_SECONDS: float = 0.5
+    SINGLE_FLIGHT_RESULT_TTL_SECONDS: int = 600
+    # Idempotency-Key handling
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 24 * 60 * 60
+    # How long a duplicate waits for the first request before answering 409
+    IDEMPOTENCY_WAIT_SECONDS: float = 60.0
+    # An in-progress key older than this is assumed abandoned and taken over
+    IDEMPOTENCY_STALE_SECONDS: int = 10 * 60
+    # Direct-to-S3 uploads
+    MAX_UPLOAD_BYTES: int = 200 * 1024 * 1024
+    MULTIPART_THRESHOLD_BYTES: int = 25 * 1024 * 1024
+    MULTIPART_PART_SIZE_BYTES: int = 8 * 1024 * 1024
+    PRESIGNED_URL_EXPIRE_SECONDS: int = 900
+    # /multimodal/batch: files per request, and how many are uploaded and
+    # enriched at once
+    BATCH_MAX_FILES: int = 10
+    BATCH_CONCURRENCY: int = 4
+    # Background deletion of orphaned S3 objects
+    S3_GC_BATCH_SIZE: int = 1000  # S3 caps DeleteObjects at 1000 keys
+    S3_GC_LINGER_SECONDS: float = 1.0
+    S3_GC_MAX_ATTEMPTS: int = 3
+    # How often each worker also looks for keys queued by workers that died
+    S3_GC_SWEEP_INTERVAL_SECONDS: float = 300.0
+    # History export/import (GET /chat/export, POST /chat/import): rows per
+    # cursor fetch and per INSERT batch, and the longest accepted NDJSON line
+    HISTORY_BATCH_SIZE: int = 1000
+    HISTORY_IMPORT_MAX_LINE_BYTES: int = 16 * 1024 * 1024
+    # Server-side S3 copies of an import's media in flight at once
+    HISTORY_IMPORT_COPY_CONCURRENCY: int = 8
+    # Cold storage (app/services/session_archive.py): sessions untouched for
+    # ARCHIVE_AFTER_DAYS are moved out of the hot tables into zstd-compressed
+    # NDJSON, in S3 or, with ARCHIVE_BACKEND="filesystem", under ARCHIVE_DIR.
+    # Needs the `archive` extra (zstandard)
+    ARCHIVE_ENABLED: bool = False
+    ARCHIVE_BACKEND: str = "s3"
+    ARCHIVE_PREFIX: str = "archive/"
+    ARCHIVE_DIR: str = "archive"
+    ARCHIVE_AFTER_DAYS: int = 90
+    ARCHIVE_INTERVAL_SECONDS: float = 3600.0
+    ARCHIVE_BATCH_SIZE: int = 100  # sessions per run
+    ARCHIVE_ZSTD_LEVEL: int = 10
+    # Compressed archives up to this size stay in memory before the upload
+    ARCHIVE_SPOOL_BYTES: int = 8 * 1024 * 1024
+    # Conversation context: recent turns are sent verbatim, older ones are
+    # folded into a rolling per-session summary in the background
+    CONTEXT_RECENT_TOKENS: int = 3000
+    SUMMARY_TRIGGER_TOKENS: int = 6000  # unsummarized history that starts a compaction
+    SUMMARY_CHUNK_TOKENS: int = 8000  # history folded per summarization call
+    SUMMARY_MAX_TOKENS: int = 600
+    SUMMARY_MODEL: str = "gpt-4o-mini"
+    TOKENIZER_ENCODING: str = "o200k_base"
+    # Media processing
+    WORKER_POOL_SIZE: Optional[int] = None  # defaults to os.cpu_count()
+    IMAGE_MAX_DIMENSION: int = 2048
+    IMAGE_JPEG_QUALITY: int = 85
+    IMAGE_LOW_DETAIL_MAX_DIMENSION: int = 512
+    # Uploaded audio is transcoded to mono Ogg/Opus before transcription;
+    # without the ffmpeg binary clips are uploaded as received
+    AUDIO_PREPROCESS_ENABLED: bool = True
+    FFMPEG_BINARY: str = "ffmpeg"
+    AUDIO_SAMPLE_RATE: int = 16000
+    AUDIO_BITRATE: str = "24k"
+    AUDIO_TRIM_SILENCE: bool = True
+    AUDIO_PREPROCESS_TIMEOUT_SECONDS: float = 60.0
+    # Spoken replies (app/services/audio_output.py). Below "high" quality,
+    # compressed formats are synthesized as PCM and encoded with ffmpeg at
+    # these bitrates; without ffmpeg the TTS API's own encoding is used
+    TTS_MODEL: str = "gpt-4o-mini-tts"
+    TTS_PCM_SAMPLE_RATE: int = 24000  # of the TTS API's "pcm" output
+    TTS_BITRATES: dict[str, dict[str, str]] = {
+        "low": {"opus": "16k", "mp3": "32k", "aac": "32k"},
+        "medium": {"opus": "32k", "mp3": "64k", "aac": "64k"},
+    }
+    TTS_ENCODE_TIMEOUT_SECONDS: float = 30.0
+    # Speech to text (app/services/speech_to_text.py): "aws", "auto" (local
+    # for short decoded clips when WHISPER_MODEL_DIR is set, AWS Transcribe
+    # for the rest and when local fails) or "local" (local only: other clips
+    # are rejected with 422, never sent to AWS). Local transcription needs an
+    # ONNX Whisper export in WHISPER_MODEL_DIR and audio preprocessing (ffmpeg)
+    TRANSCRIPTION_BACKEND: str = "auto"
+    LOCAL_TRANSCRIPTION_MAX_SECONDS: float = 30.0  # Whisper's window
+    WHISPER_MODEL_DIR: Optional[str] = None
+    WHISPER_LANGUAGES: list[str] = ["en", "hi"]
+    WHISPER_MAX_TOKENS: int = 224
+    WHISPER_THREADS: int = 1  # per worker process
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,170 @@
+"""
+Request deadlines.
+
+Every HTTP request gets a deadline when it enters the app: the
+`X-Request-Timeout` header (seconds), else the route's entry in
+`settings.ROUTE_TIMEOUT_SECONDS`, else `settings.REQUEST_TIMEOUT_SECONDS`.
+It lives in a context variable, so it follows the request into every
+service call, including code run with `asyncio.to_thread` (which copies the
+context).
+
+Backend calls run inside a `stage`, which gets whatever budget is left
+(optionally capped, or with some time held back for later stages) and raises
+`DeadlineExceeded` when that runs out:
+
+    async with stage("transcribe", reserve=settings.DEADLINE_LLM_RESERVE_SECONDS):
+        ...
+
+Handlers catch `DeadlineExceeded` around optional stages and record them
+with `mark_degraded`, so the user still gets a partial answer. Anything
+left unhandled is answered with 504.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import Context, ContextVar, copy_context
+from typing import AsyncIterator, Iterator, Optional
+
+from app.core.config import settings
+
+TIMEOUT_HEADER = b"x-request-timeout"
+
+
+class DeadlineExceeded(TimeoutError):
+    def __init__(self, stage: str):
+        super().__init__(f"Deadline exceeded during {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    __slots__ = ("expires_at", "degraded")
+
+    def __init__(self, expires_at: float, degraded: Optional[list[str]] = None):
+        # time.monotonic(), which threads can read as well as the event loop
+        self.expires_at = expires_at
+        # Stages skipped because they ran out of time; shared with child stages
+        self.degraded = degraded if degraded is not None else []
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def remaining(cap: Optional[float] = None) -> Optional[float]:
+    """Seconds left for the current work, at most `cap`; None if unbounded."""
+    deadline = _current.get()
+    if deadline is None:
+        return cap
+    left = deadline.remaining()
+    return left if cap is None else min(cap, left)
+
+
+def check(stage: str) -> None:
+    """Raise `DeadlineExceeded` if the current deadline has passed."""
+    if remaining() == 0:
+        raise DeadlineExceeded(stage)
+
+
+def mark_degraded(stage: str) -> None:
+    deadline = _current.get()
+    if deadline is not None and stage not in deadline.degraded:
+        deadline.degraded.append(stage)
+
+
+def degraded_stages() -> list[str]:
+    deadline = _current.get()
+    return list(deadline.degraded) if deadline is not None else []
+
+
+@contextmanager
+def request_deadline(seconds: float) -> Iterator[Deadline]:
+    """Give the enclosed work `seconds` from now."""
+    deadline = Deadline(time.monotonic() + seconds)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def detached_context(seconds: Optional[float] = None) -> Context:
+    """
+    A copy of the current context with a deadline of its own, `seconds`
+    (default `MAX_REQUEST_TIMEOUT_SECONDS`) from now, for a task shared by
+    requests with different budgets: the request that happens to start it
+    must not impose its budget on the others. Each request bounds only its
+    own wait for the task, with a `stage`.
+    """
+    if seconds is None:
+        seconds = settings.MAX_REQUEST_TIMEOUT_SECONDS
+    context = copy_context()
+    context.run(_current.set, Deadline(time.monotonic() + seconds))
+    return context
+
+
+@asynccontextmanager
+async def stage(
+    name: str, cap: Optional[float] = None, reserve: float = 0.0
+) -> AsyncIterator[Optional[float]]:
+    """
+    Run the block within the remaining budget minus `reserve` (and at most
+    `cap` seconds), cancelling it and raising `DeadlineExceeded(name)` when
+    that runs out. Work started inside, threads included, sees the stage's
+    budget as its deadline. Yields the budget (None if unbounded).
+    """
+    parent = _current.get()
+    budget = cap
+    if parent is not None:
+        left = parent.remaining() - reserve
+        budget = left if budget is None else min(budget, left)
+    if budget is None:
+        yield None
+        return
+    if budget <= 0:
+        raise DeadlineExceeded(name)
+
+    token = _current.set(
+        Deadline(time.monotonic() + budget, parent.degraded if parent else None)
+    )
+    try:
+        async with asyncio.timeout(budget) as scope:
+            yield budget
+    except TimeoutError as e:
+        if scope.expired():
+            raise DeadlineExceeded(name) from e
+        raise
+    finally:
+        _current.reset(token)
+
+
+class DeadlineMiddleware:
+    """ASGI middleware starting each HTTP request's deadline."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        seconds = settings.ROUTE_TIMEOUT_SECONDS.get(
+            scope["path"], settings.REQUEST_TIMEOUT_SECONDS
+        )
+        header = dict(scope.get("headers") or []).get(TIMEOUT_HEADER)
+        if header:
+            try:
+                seconds = float(header)
+            except ValueError:
+                pass
+        seconds = min(max(seconds, 0.0), settings.MAX_REQUEST_TIMEOUT_SECONDS)
+
+        with request_deadline(seconds):
+            await self.app(scope, receive, send)
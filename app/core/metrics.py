@@ -0,0 +1,228 @@
+"""
+Prometheus metrics.
+
+When the `PROMETHEUS_MULTIPROC_DIR` environment variable is set (it must point
+to an empty, writable directory shared by all uvicorn workers and be set
+before the workers start), samples are written there by every worker and
+`/metrics` aggregates them with a `MultiProcessCollector`.
+"""
+
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from app.core.tracing import Span
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests handled.",
+    ["method", "route", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency.",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served.",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+BACKEND_CALLS = Counter(
+    "backend_calls_total",
+    "Calls to external backends (openai, s3, textract, transcribe, db).",
+    ["backend", "operation", "outcome"],
+)
+BACKEND_LATENCY = Histogram(
+    "backend_call_duration_seconds",
+    "Latency of calls to external backends.",
+    ["backend", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+OPENAI_TOKENS = Counter(
+    "openai_tokens_total",
+    "Tokens consumed through the OpenAI gateway.",
+    ["model", "kind"],
+)
+OPENAI_RETRIES = Counter(
+    "openai_retries_total",
+    "OpenAI requests retried by the gateway.",
+    ["model", "reason"],
+)
+
+DB_POOL_SIZE = Gauge(
+    "db_pool_size", "Configured DB connection pool size.", multiprocess_mode="livesum"
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "DB connections currently checked out.",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "DB connections opened beyond the pool size.",
+    multiprocess_mode="livesum",
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups; hit ratio = hit / (hit + miss).",
+    ["cache", "result"],
+)
+
+
+SINGLE_FLIGHT_CALLS = Counter(
+    "single_flight_calls_total",
+    "Single-flight callers: leader ran the call, coalesced awaited an in-flight "
+    "one, shared reused another worker's result.",
+    ["group", "operation", "result"],
+)
+
+S3_GC_OBJECTS = Counter(
+    "s3_gc_objects_total",
+    "S3 objects removed (or failed to be removed) by the background GC.",
+    ["result"],
+)
+
+SUMMARY_COMPACTIONS = Counter(
+    "summary_compactions_total",
+    "Background conversation compactions by outcome.",
+    ["result"],
+)
+
+SESSION_ARCHIVE_OPERATIONS = Counter(
+    "session_archive_operations_total",
+    "Sessions moved to (archive) or back from (restore) cold storage.",
+    ["operation", "result"],
+)
+
+CIRCUIT_BREAKER_STATE = Gauge(
+    "circuit_breaker_state",
+    "Backend circuit breaker state: 0 closed, 1 half-open, 2 open.",
+    ["backend"],
+    multiprocess_mode="max",
+)
+CIRCUIT_BREAKER_REJECTIONS = Counter(
+    "circuit_breaker_rejections_total",
+    "Calls failed fast because the backend's circuit was open.",
+    ["backend"],
+)
+HEDGED_REQUESTS = Counter(
+    "hedged_requests_total",
+    "Hedged backend calls: sent after the p95 delay, won when the hedge answered first.",
+    ["operation", "result"],
+)
+
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total",
+    "Requests refused by admission control (429/503).",
+    ["reason"],
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight",
+    "Admitted requests currently running.",
+    multiprocess_mode="livesum",
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth",
+    "Requests waiting for an admission slot.",
+    multiprocess_mode="livesum",
+)
+
+
+def record_cache_access(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+class MetricsSpanExporter:
+    """
+    Turns finished spans tagged with a `backend` attribute into backend call
+    counters and latency histograms, so tracing and metrics share one
+    instrumentation point.
+    """
+
+    def export(self, span: Span) -> None:
+        backend = span.attributes.get("backend")
+        if not backend:
+            return
+        outcome = "error" if span.status == "ERROR" else "ok"
+        BACKEND_CALLS.labels(backend, span.name, outcome).inc()
+        BACKEND_LATENCY.labels(backend, span.name).observe(span.duration_ms / 1000)
+
+
+def update_db_pool_gauges() -> None:
+    from app.db.session import engine
+
+    pool = engine.pool
+    # Pools without these counters (e.g. NullPool in tests) are skipped.
+    if not hasattr(pool, "checkedout"):
+        return
+    DB_POOL_SIZE.set(pool.size())
+    DB_POOL_CHECKED_OUT.set(pool.checkedout())
+    DB_POOL_OVERFLOW.set(max(0, pool.overflow()))
+
+
+def render_metrics() -> tuple[bytes, str]:
+    update_db_pool_gauges()
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead() -> None:
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request counts, latency and in-flight requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        HTTP_IN_PROGRESS.labels(method).inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_PROGRESS.labels(method).dec()
+            route = scope.get("route")
+            # Templated path keeps label cardinality bounded.
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUESTS.labels(method, route_path, str(status["code"])).inc()
+            HTTP_LATENCY.labels(method, route_path).observe(
+                time.perf_counter() - start
+            )
+            update_db_pool_gauges()
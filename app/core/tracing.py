@@ -0,0 +1,284 @@
+"""
+Lightweight request tracing.
+
+Spans follow the OpenTelemetry data model (W3C trace/span ids, parent links,
+unix-nano timestamps, attributes, status) so exported records can be loaded
+into any OTLP-aware tool, but nothing here depends on the OpenTelemetry SDK.
+
+    with span("s3.upload", backend="s3"):
+        ...
+
+    @traced("openai.vision", backend="openai")
+    async def analyze(...): ...
+
+`TracingMiddleware` opens a root span per HTTP request, honours an incoming
+`traceparent` header and reports per-stage durations in `Server-Timing`.
+"""
+
+import functools
+import inspect
+import json
+import logging
+import secrets
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional, Protocol
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str] = None
+    start_time_unix_nano: int = field(default_factory=time.time_ns)
+    end_time_unix_nano: Optional[int] = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    status: str = "OK"
+    error: Optional[str] = None
+    _start_perf: float = field(default_factory=time.perf_counter, repr=False)
+    duration_ms: float = 0.0
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self) -> None:
+        self.end_time_unix_nano = time.time_ns()
+        self.duration_ms = (time.perf_counter() - self._start_perf) * 1000
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id,
+            "startTimeUnixNano": self.start_time_unix_nano,
+            "endTimeUnixNano": self.end_time_unix_nano,
+            "durationMs": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "status": {"code": self.status, "message": self.error},
+        }
+
+
+class SpanExporter(Protocol):
+    def export(self, span: Span) -> None: ...
+
+
+class ConsoleSpanExporter:
+    """Writes one JSON line per finished span to stderr."""
+
+    def export(self, span: Span) -> None:
+        sys.stderr.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+
+class FileSpanExporter:
+    """Appends one JSON line per finished span to a file, for offline analysis."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+_exporters: list[SpanExporter] = []
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_request_spans: ContextVar[Optional[list[Span]]] = ContextVar(
+    "request_spans", default=None
+)
+
+
+def add_span_exporter(exporter: SpanExporter) -> None:
+    _exporters.append(exporter)
+
+
+def configure_tracing() -> None:
+    """Install the exporter selected by `settings.TRACING_EXPORTER`."""
+    kind = settings.TRACING_EXPORTER.lower()
+    if kind == "console":
+        add_span_exporter(ConsoleSpanExporter())
+    elif kind == "file":
+        add_span_exporter(FileSpanExporter(settings.TRACING_FILE_PATH))
+    elif kind != "none":
+        raise ValueError(f"Unknown TRACING_EXPORTER: {settings.TRACING_EXPORTER}")
+
+
+def get_current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def detach_from_request() -> None:
+    """
+    Start spans opened from here on in a trace of their own, left out of
+    the current request's `Server-Timing`. For background work started by
+    a request, run inside the task's own context.
+    """
+    _current_span.set(None)
+    _request_spans.set(None)
+
+
+def _export(finished: Span) -> None:
+    for exporter in _exporters:
+        try:
+            exporter.export(finished)
+        except Exception:
+            logger.exception("Span exporter %r failed", exporter)
+
+
+class span:
+    """
+    Context manager recording one unit of work as a child of the current span.
+    Works unchanged in sync code, async code and threads started with
+    `asyncio.to_thread` (which copies the context).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: Optional[str] = None,
+        parent_span_id: Optional[str] = None,
+        **attributes: Any,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.parent_span_id = parent_span_id
+        self.attributes = attributes
+        self.span: Optional[Span] = None
+        self._token = None
+
+    def __enter__(self) -> Span:
+        parent = _current_span.get()
+        self.span = Span(
+            name=self.name,
+            trace_id=self.trace_id
+            or (parent.trace_id if parent else secrets.token_hex(16)),
+            span_id=secrets.token_hex(8),
+            parent_span_id=self.parent_span_id
+            or (parent.span_id if parent else None),
+            attributes=dict(self.attributes),
+        )
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.span.end()
+        if exc is not None:
+            self.span.status = "ERROR"
+            self.span.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+
+        collected = _request_spans.get()
+        if collected is not None:
+            collected.append(self.span)
+        _export(self.span)
+
+    async def __aenter__(self) -> Span:
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.__exit__(exc_type, exc, tb)
+
+
+def traced(name: Optional[str] = None, **attributes: Any) -> Callable:
+    """Decorator wrapping a sync or async function in a `span`."""
+
+    def decorator(fn: Callable) -> Callable:
+        span_name = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, **attributes):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def sync_wrapper(*args, **kwargs):
+            with span(span_name, **attributes):
+                return fn(*args, **kwargs)
+
+        return sync_wrapper
+
+    return decorator
+
+
+def _parse_traceparent(value: Optional[str]) -> tuple[Optional[str], Optional[str]]:
+    # version-traceid-parentid-flags, e.g. 00-<32 hex>-<16 hex>-01
+    if not value:
+        return None, None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None
+    return parts[1], parts[2]
+
+
+def _server_timing(spans: list[Span], root: Span) -> str:
+    totals: dict[str, float] = {}
+    for s in spans:
+        if s is root:
+            continue
+        key = s.name.replace(" ", "_")
+        totals[key] = totals.get(key, 0.0) + s.duration_ms
+    entries = [f"{key};dur={ms:.1f}" for key, ms in totals.items()]
+    elapsed = (time.perf_counter() - root._start_perf) * 1000
+    entries.append(f"total;dur={elapsed:.1f}")
+    return ", ".join(entries)
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a root span for every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        trace_id, parent_id = _parse_traceparent(
+            headers.get(b"traceparent", b"").decode("latin-1")
+        )
+        collected: list[Span] = []
+        spans_token = _request_spans.set(collected)
+
+        with span(
+            f"{scope['method']} {scope['path']}",
+            trace_id=trace_id,
+            parent_span_id=parent_id,
+            **{"http.method": scope["method"], "http.target": scope["path"]},
+        ) as root:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    root.set_attribute("http.status_code", message["status"])
+                    extra = [
+                        (b"traceparent", f"00-{root.trace_id}-{root.span_id}-01".encode()),
+                    ]
+                    if settings.TRACING_SERVER_TIMING:
+                        extra.append(
+                            (b"server-timing", _server_timing(collected, root).encode())
+                        )
+                    message["headers"] = list(message.get("headers", [])) + extra
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    root.set_attribute("http.route", getattr(route, "path", None))
+                _request_spans.reset(spans_token)
@@ -1,25 +1,84 @@
+import datetime
+import uuid
+
 from app.models.attachment import Attachment
+from app.models.attachment_content import AttachmentContent
+from app.models.chat_session import ChatSession
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+from app.core.tracing import traced
+from app.crud.session import touch_sessions
 
 
-async def create_attachment(
-    db: AsyncSession,
+def build_attachment(
     session_id,
     message_id,
     url,
     media_type,
     metadata_=None,
     audio_url=None,
-):
+    content=None,
+) -> Attachment:
+    """
+    An unsaved attachment; `content` is the enrichment's DerivedContent,
+    stored in attachment_contents. Save it with `add_messages` or
+    `create_attachment`.
+    """
     attachment = Attachment(
+        id=uuid.uuid4(),
         session_id=session_id,
         message_id=message_id,
         url=url,
         media_type=media_type,
         metadata_=metadata_,
         audio_url=audio_url,
+        created_at=datetime.datetime.utcnow(),
+    )
+    if content is not None:
+        attachment.content = AttachmentContent(
+            kind=content.kind, text=content.text, raw=content.raw
+        )
+    return attachment
+
+
+@traced("db.create_attachment", backend="db")
+async def create_attachment(
+    db: AsyncSession,
+    session_id,
+    message_id,
+    url,
+    media_type,
+    metadata_=None,
+    audio_url=None,
+    content=None,
+):
+    """`content` is the enrichment's DerivedContent, stored in attachment_contents."""
+    attachment = build_attachment(
+        session_id, message_id, url, media_type, metadata_, audio_url, content
     )
     db.add(attachment)
+    await touch_sessions(db, [session_id])
     await db.commit()
     await db.refresh(attachment)
     return attachment
+
+
+@traced("db.get_attachment_content", backend="db")
+async def get_attachment_content(
+    db: AsyncSession, attachment_id, user_id: int, include_raw: bool = False
+):
+    """Derived content of an attachment owned by `user_id`, or None."""
+    stmt = (
+        select(AttachmentContent)
+        .join(Attachment, Attachment.id == AttachmentContent.attachment_id)
+        .join(ChatSession, ChatSession.id == Attachment.session_id)
+        .where(
+            AttachmentContent.attachment_id == attachment_id,
+            ChatSession.user_id == user_id,
+        )
+    )
+    if include_raw:
+        stmt = stmt.options(undefer(AttachmentContent.raw))
+    q = await db.execute(stmt)
+    return q.scalars().first()
@@ -0,0 +1,311 @@
+"""
+Export and import of whole chat histories in the NDJSON record format of
+app/schemas/history.py, in constant memory however many messages there are:
+reads stream from server-side cursors (`yield_per`), writes go out as
+multi-row INSERT batches.
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert, or_, select
+from sqlalchemy.orm import lazyload, undefer_group
+import asyncio
+import logging
+import os
+import uuid
+from typing import AsyncIterator, Optional, Union
+
+from app.core.config import settings
+from app.models import ArchivedMediaKey, Attachment, AttachmentContent, ChatSession, Message
+from app.schemas.history import (
+    AttachmentContentRecord,
+    AttachmentRecord,
+    ImportSummary,
+    MessageRecord,
+    SessionRecord,
+)
+
+HistoryRecord = Union[SessionRecord, MessageRecord, AttachmentRecord]
+
+logger = logging.getLogger(__name__)
+
+
+def _streamed(statement):
+    return statement.execution_options(yield_per=settings.HISTORY_BATCH_SIZE)
+
+
+def session_record(session: ChatSession) -> SessionRecord:
+    return SessionRecord(
+        id=session.id,
+        title=session.title,
+        created_at=session.created_at,
+        updated_at=session.updated_at,
+        summary=session.summary,
+        summarized_until=session.summarized_until,
+    )
+
+
+async def stream_session_records(
+    db: AsyncSession, session: ChatSession
+) -> AsyncIterator[HistoryRecord]:
+    """The session, its messages in order, then its attachments."""
+    yield session_record(session)
+
+    messages = await db.stream_scalars(
+        _streamed(
+            select(Message)
+            .where(Message.session_id == session.id)
+            .order_by(Message.created_at)
+            .options(lazyload(Message.attachments))
+        )
+    )
+    async for msg in messages:
+        yield MessageRecord(
+            id=msg.id,
+            session_id=msg.session_id,
+            role=msg.role,
+            content=msg.content,
+            metadata=msg.metadata_,
+            created_at=msg.created_at,
+        )
+
+    session_messages = select(Message.id).where(Message.session_id == session.id)
+    attachments = await db.stream(
+        _streamed(
+            select(Attachment, AttachmentContent.kind, AttachmentContent.text)
+            .outerjoin(AttachmentContent)
+            .where(
+                or_(
+                    Attachment.session_id == session.id,
+                    Attachment.message_id.in_(session_messages),
+                )
+            )
+            .order_by(Attachment.created_at)
+        )
+    )
+    async for attachment, kind, text in attachments:
+        yield AttachmentRecord(
+            id=attachment.id,
+            session_id=attachment.session_id,
+            message_id=attachment.message_id,
+            url=attachment.url,
+            media_type=attachment.media_type,
+            metadata=attachment.metadata_,
+            audio_url=attachment.audio_url,
+            created_at=attachment.created_at,
+            content=AttachmentContentRecord(kind=kind, text=text) if kind else None,
+        )
+
+
+async def stream_user_history(
+    db: AsyncSession, user_id: int
+) -> AsyncIterator[HistoryRecord]:
+    """
+    Every session of the user, oldest first, each followed by its records.
+    Archived sessions are read from cold storage without being restored.
+    """
+    from app.services.session_archive import read_archived_records
+
+    sessions = await db.stream_scalars(
+        _streamed(
+            select(ChatSession)
+            .where(ChatSession.user_id == user_id)
+            .order_by(ChatSession.created_at)
+            .options(undefer_group("summary"), lazyload(ChatSession.user))
+        )
+    )
+    async for session in sessions:
+        if session.archive_key is not None:
+            yield session_record(session)
+            async for record in read_archived_records(session.archive_key):
+                if not isinstance(record, SessionRecord):
+                    yield record
+        else:
+            async for record in stream_session_records(db, session):
+                yield record
+
+
+class HistoryImport:
+    """
+    Insert history records in multi-row batches, within the caller's
+    transaction. Records must come in export order (a session before its
+    messages, a message before its attachments); batches are written
+    parents first so foreign keys always hold.
+
+    Imported ids are mapped to `uuid5(id_namespace, id)`, so importing the
+    same export twice (or into the account it came from) creates copies
+    instead of colliding, without keeping a map of every id. Without a
+    namespace ids are kept as they are.
+
+    With `copy_media`, attachment URLs into our bucket are untrusted input:
+    objects the user owns (under their upload prefix, or already attached
+    to one of their sessions, archived ones included) are copied to new keys, so deleting either
+    copy never removes the other's media, and any other URL into the bucket
+    is cleared. URLs elsewhere are kept. `copied_keys` lists the new
+    objects, for the caller to queue for deletion if it rolls back.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        id_namespace: Optional[uuid.UUID] = None,
+        copy_media: bool = False,
+    ):
+        self.db = db
+        self.user_id = user_id
+        self.id_namespace = id_namespace
+        self.copy_media = copy_media
+        self.copied_keys: list[str] = []
+        self.summary = ImportSummary()
+        self._rows: dict[type, list[dict]] = {
+            ChatSession: [],
+            Message: [],
+            Attachment: [],
+            AttachmentContent: [],
+        }
+        self._buffered = 0
+
+    def _id(self, value: Optional[uuid.UUID]) -> Optional[uuid.UUID]:
+        if value is None or self.id_namespace is None:
+            return value
+        return uuid.uuid5(self.id_namespace, str(value))
+
+    async def add(self, record: HistoryRecord) -> None:
+        if isinstance(record, SessionRecord):
+            self._rows[ChatSession].append(
+                {
+                    "id": self._id(record.id),
+                    "user_id": self.user_id,
+                    "title": record.title,
+                    "created_at": record.created_at,
+                    "updated_at": record.updated_at,
+                    "summary": record.summary,
+                    "summarized_until": record.summarized_until,
+                }
+            )
+            self.summary.sessions += 1
+        elif isinstance(record, MessageRecord):
+            self._rows[Message].append(
+                {
+                    "id": self._id(record.id),
+                    "session_id": self._id(record.session_id),
+                    "role": record.role,
+                    "content": record.content,
+                    "metadata_": record.metadata,
+                    "created_at": record.created_at,
+                }
+            )
+            self.summary.messages += 1
+        else:
+            attachment_id = self._id(record.id)
+            self._rows[Attachment].append(
+                {
+                    "id": attachment_id,
+                    "session_id": self._id(record.session_id),
+                    "message_id": self._id(record.message_id),
+                    "url": record.url,
+                    "media_type": record.media_type,
+                    "metadata_": record.metadata,
+                    "audio_url": record.audio_url,
+                    "created_at": record.created_at,
+                }
+            )
+            if record.content is not None:
+                self._rows[AttachmentContent].append(
+                    {
+                        "attachment_id": attachment_id,
+                        "kind": record.content.kind,
+                        "text": record.content.text,
+                        "created_at": record.created_at,
+                    }
+                )
+            self.summary.attachments += 1
+
+        self._buffered += 1
+        if self._buffered >= settings.HISTORY_BATCH_SIZE:
+            await self.flush()
+
+    async def _owned_urls(self, keys: dict[str, str]) -> set[str]:
+        """
+        The URLs (mapped to their object keys) already attached to one of
+        the user's sessions, hot or archived.
+        """
+        if not keys:
+            return set()
+        urls = list(keys)
+        user_sessions = select(ChatSession.id).where(ChatSession.user_id == self.user_id)
+        user_messages = select(Message.id).where(Message.session_id.in_(user_sessions))
+        q = await self.db.execute(
+            select(Attachment.url, Attachment.audio_url).where(
+                or_(Attachment.url.in_(urls), Attachment.audio_url.in_(urls)),
+                or_(
+                    Attachment.session_id.in_(user_sessions),
+                    Attachment.message_id.in_(user_messages),
+                ),
+            )
+        )
+        owned = {url for row in q.all() for url in row if url in keys}
+        q = await self.db.execute(
+            select(ArchivedMediaKey.key).where(
+                ArchivedMediaKey.key.in_(set(keys.values())),
+                ArchivedMediaKey.session_id.in_(user_sessions),
+            )
+        )
+        archived = set(q.scalars())
+        return owned | {url for url, key in keys.items() if key in archived}
+
+    async def _copy_media(self, rows: list[dict]) -> None:
+        """Rewrite the rows' URLs into our bucket to fresh copies, or clear them."""
+        from app.services.s3_gc import object_key
+        from app.services.s3_storage import (
+            UploadToS3,
+            object_url,
+            safe_filename,
+            user_upload_prefix,
+        )
+
+        prefix = user_upload_prefix(self.user_id)
+        keys = {
+            url: key
+            for row in rows
+            for url in (row["url"], row["audio_url"])
+            if (key := object_key(url))
+        }
+        if not keys:
+            return
+        unchecked = {url: key for url, key in keys.items() if not key.startswith(prefix)}
+        owned = await self._owned_urls(unchecked)
+
+        storage = UploadToS3()
+        limit = asyncio.Semaphore(settings.HISTORY_IMPORT_COPY_CONCURRENCY)
+
+        async def copy(key: str) -> Optional[str]:
+            new_key = f"{prefix}{uuid.uuid4()}-{safe_filename(os.path.basename(key))}"
+            async with limit:
+                try:
+                    await asyncio.to_thread(storage.copy_object, key, new_key)
+                except Exception:
+                    logger.warning("Could not copy %s on import", key, exc_info=True)
+                    return None
+            self.copied_keys.append(new_key)
+            return object_url(new_key)
+
+        to_copy = [url for url in keys if url not in unchecked or url in owned]
+        copies = await asyncio.gather(*(copy(keys[url]) for url in to_copy))
+        replaced = dict(zip(to_copy, copies))
+
+        for row in rows:
+            for field in ("url", "audio_url"):
+                if row[field] in keys:
+                    row[field] = replaced.get(row[field])
+                    if row[field] is None:
+                        self.summary.media_dropped += 1
+
+    async def flush(self) -> None:
+        if self.copy_media and self._rows[Attachment]:
+            await self._copy_media(self._rows[Attachment])
+        for model, rows in self._rows.items():
+            if rows:
+                await self.db.execute(insert(model), rows)
+                rows.clear()
+        self._buffered = 0
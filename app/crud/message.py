@@ -1,19 +1,80 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+import datetime
 import uuid
-from typing import List
+from typing import List, Optional, Sequence
 from app.models import Message, RoleEnum
+from app.core.tracing import traced
+from app.crud.session import touch_sessions
 
 
+@traced("db.create_message", backend="db")
 async def create_message(
     db: AsyncSession, session_id, role: RoleEnum, content: str, metadata: dict = None
 ) -> Message:
     msg = Message(session_id=session_id, role=role, content=content, metadata_=metadata)
     db.add(msg)
+    await touch_sessions(db, [session_id])
     await db.commit()
     await db.refresh(msg)
+    # A new message has no attachments yet; mark the collection as loaded so
+    # serializing it never triggers a lazy load outside the async context.
+    set_committed_value(msg, "attachments", [])
     return msg
 
-async def get_messages_by_session(db: AsyncSession, session_id: uuid.UUID) -> List[Message]:
-    q = await db.execute(select(Message).where(Message.session_id == session_id).order_by(Message.created_at))
-    return q.scalars().all()
\ No newline at end of file
+def build_message(
+    session_id, role: RoleEnum, content: str, metadata: dict = None
+) -> Message:
+    """A message with its id and timestamp fixed now, to be saved later with `add_messages`."""
+    return Message(
+        id=uuid.uuid4(),
+        session_id=session_id,
+        role=role,
+        content=content,
+        metadata_=metadata,
+        created_at=datetime.datetime.utcnow(),
+    )
+
+
+@traced("db.add_messages", backend="db")
+async def add_messages(
+    db: AsyncSession, messages: Sequence[Message], attachments: Sequence = ()
+) -> None:
+    """
+    Insert fully built messages (ids and timestamps set by the caller), and
+    the attachments built for them, in one transaction without reading them
+    back.
+    """
+    db.add_all(messages)
+    db.add_all(attachments)
+    await touch_sessions(db, [msg.session_id for msg in messages])
+    await db.commit()
+    for msg in messages:
+        set_committed_value(
+            msg, "attachments", [a for a in attachments if a.message_id == msg.id]
+        )
+
+
+@traced("db.get_messages_by_session", backend="db")
+async def get_messages_by_session(
+    db: AsyncSession, session_id: uuid.UUID, after: Optional[datetime.datetime] = None
+) -> List[Message]:
+    """Messages of the session in order, optionally only those created after `after`."""
+    stmt = select(Message).where(Message.session_id == session_id)
+    if after is not None:
+        stmt = stmt.where(Message.created_at > after)
+    q = await db.execute(stmt.order_by(Message.created_at))
+    return q.scalars().all()
+
+
+@traced("db.get_messages_with_attachments", backend="db")
+async def get_messages_with_attachments(db: AsyncSession, session_id: uuid.UUID) -> List[Message]:
+    q = await db.execute(
+        select(Message)
+        .where(Message.session_id == session_id)
+        .options(selectinload(Message.attachments))
+        .order_by(Message.created_at)
+    )
+    return q.scalars().all()
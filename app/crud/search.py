@@ -0,0 +1,101 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, cast, func, literal, null, select, union_all
+from sqlalchemy.dialects.postgresql import REGCONFIG, UUID
+from typing import Sequence, Tuple
+
+from app.models import Attachment, AttachmentContent, ChatSession, Message
+from app.core.tracing import traced
+
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2"
+
+
+def _config():
+    return cast("english", REGCONFIG)
+
+
+def _hit_order(hits):
+    # A message and its attachments share message_id and often rank equally:
+    # without a total order, OFFSET paging can repeat or skip hits.
+    return (
+        hits.c.rank.desc(),
+        hits.c.message_id,
+        hits.c.source,
+        hits.c.attachment_id.asc().nulls_first(),
+    )
+
+
+@traced("db.search_messages", backend="db")
+async def search_messages(
+    db: AsyncSession, user_id: int, q: str, limit: int, offset: int
+) -> Tuple[Sequence, bool]:
+    """
+    Full-text search over the user's messages and the text extracted from
+    their attachments, best matches first.
+
+    Ranking runs over the matching rows only, and snippets are generated for
+    the requested page only, since ts_headline is the expensive part.
+    Returns (rows, has_more).
+    """
+    query = func.websearch_to_tsquery(_config(), q)
+
+    message_hits = (
+        select(
+            Message.id.label("message_id"),
+            cast(null(), UUID(as_uuid=True)).label("attachment_id"),
+            literal("message").label("source"),
+            func.ts_rank_cd(Message.search_vector, query).label("rank"),
+        )
+        .join(ChatSession, ChatSession.id == Message.session_id)
+        .where(ChatSession.user_id == user_id, Message.search_vector.op("@@")(query))
+    )
+    attachment_hits = (
+        select(
+            Attachment.message_id,
+            Attachment.id,
+            literal("attachment"),
+            func.ts_rank_cd(AttachmentContent.search_vector, query),
+        )
+        .select_from(AttachmentContent)
+        .join(Attachment, Attachment.id == AttachmentContent.attachment_id)
+        .join(ChatSession, ChatSession.id == Attachment.session_id)
+        .where(
+            ChatSession.user_id == user_id,
+            Attachment.message_id.is_not(None),
+            AttachmentContent.search_vector.op("@@")(query),
+        )
+    )
+    hits = union_all(message_hits, attachment_hits).subquery("hits")
+    page = (
+        select(hits)
+        .order_by(*_hit_order(hits))
+        .limit(limit + 1)
+        .offset(offset)
+        .subquery("page")
+    )
+
+    snippet_source = case(
+        (page.c.source == "attachment", AttachmentContent.text), else_=Message.content
+    )
+    stmt = (
+        select(
+            page.c.message_id,
+            page.c.attachment_id,
+            page.c.source,
+            page.c.rank,
+            Message.session_id,
+            ChatSession.title.label("session_title"),
+            Message.role,
+            Message.created_at,
+            func.ts_headline(_config(), snippet_source, query, HEADLINE_OPTIONS).label(
+                "snippet"
+            ),
+        )
+        .join(Message, Message.id == page.c.message_id)
+        .join(ChatSession, ChatSession.id == Message.session_id)
+        .outerjoin(
+            AttachmentContent, AttachmentContent.attachment_id == page.c.attachment_id
+        )
+        .order_by(*_hit_order(page))
+    )
+    rows = (await db.execute(stmt)).all()
+    return rows[:limit], len(rows) > limit
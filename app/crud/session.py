@@ -1,11 +1,15 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.orm import selectinload
+import datetime
 import uuid
-from typing import Optional
+from typing import List, Optional, Tuple
 
-from app.models import ChatSession
+from app.models import ArchivedMediaKey, Attachment, ChatSession, Message
+from app.core.tracing import traced
 
 
+@traced("db.create_chat_session", backend="db")
 async def create_chat_session(
     db: AsyncSession, user_id: int, title: Optional[str] = None
 ) -> ChatSession:
@@ -16,8 +20,189 @@ async def create_chat_session(
     return session
 
 
+@traced("db.get_chat_session", backend="db")
 async def get_chat_session(
-    db: AsyncSession, session_id: uuid.UUID
+    db: AsyncSession, session_id: uuid.UUID, user_id: Optional[int] = None
 ) -> Optional[ChatSession]:
+    """
+    The session, restored from cold storage first if it was archived. With
+    `user_id`, someone else's session is returned as it is, for the caller
+    to refuse, and never restored.
+    """
     q = await db.execute(select(ChatSession).where(ChatSession.id == session_id))
-    return q.scalars().first()
+    session = q.scalars().first()
+    if (
+        session is not None
+        and session.archived_at is not None
+        and (user_id is None or session.user_id == user_id)
+    ):
+        from app.services.session_archive import restore_session
+
+        await restore_session(db, session)
+    return session
+
+
+@traced("db.list_sessions_with_messages", backend="db")
+async def list_sessions_with_messages(db: AsyncSession, user_id: int) -> List[ChatSession]:
+    """
+    The user's sessions with their messages. Archived sessions are listed
+    with `archived_at` set and no messages; opening one restores them.
+    """
+    q = await db.execute(
+        select(ChatSession)
+        .where(ChatSession.user_id == user_id)
+        .options(selectinload(ChatSession.messages).selectinload(Message.attachments))
+        .order_by(ChatSession.created_at.desc())
+    )
+    return q.scalars().unique().all()
+
+
+@traced("db.get_session_owner", backend="db")
+async def get_session_owner(db: AsyncSession, session_id: uuid.UUID) -> Optional[int]:
+    """user_id of the session, without loading the session or its messages."""
+    q = await db.execute(select(ChatSession.user_id).where(ChatSession.id == session_id))
+    return q.scalar_one_or_none()
+
+
+@traced("db.get_session_version", backend="db")
+async def get_session_version(
+    db: AsyncSession, session_id: uuid.UUID
+) -> Optional[Tuple[int, datetime.datetime, bool]]:
+    """
+    Owner and `updated_at` of the session, for answering conditional
+    requests, and whether it is archived.
+    """
+    q = await db.execute(
+        select(ChatSession.user_id, ChatSession.updated_at, ChatSession.archived_at).where(
+            ChatSession.id == session_id
+        )
+    )
+    row = q.one_or_none()
+    return (row.user_id, row.updated_at, row.archived_at is not None) if row else None
+
+
+@traced("db.get_sessions_version", backend="db")
+async def get_sessions_version(
+    db: AsyncSession, user_id: int
+) -> Tuple[int, int, Optional[datetime.datetime]]:
+    """
+    Number of the user's sessions, how many of them are archived, and the
+    latest `updated_at` or `archived_at` among them. Archiving and restoring
+    change what the session list shows without touching `updated_at`.
+    """
+    q = await db.execute(
+        select(
+            func.count(),
+            func.count(ChatSession.archived_at),
+            func.max(ChatSession.updated_at),
+            func.max(ChatSession.archived_at),
+        ).where(ChatSession.user_id == user_id)
+    )
+    count, archived, updated_at, archived_at = q.one()
+    return count, archived, max(filter(None, (updated_at, archived_at)), default=None)
+
+
+async def touch_sessions(db: AsyncSession, session_ids) -> None:
+    """
+    Bump `updated_at` of sessions whose history changed, in the caller's
+    transaction. History endpoints derive their ETag from it.
+    """
+    await db.execute(
+        update(ChatSession)
+        .where(ChatSession.id.in_(set(session_ids)))
+        .values(updated_at=datetime.datetime.utcnow())
+    )
+
+
+@traced("db.get_session_summary", backend="db")
+async def get_session_summary(
+    db: AsyncSession, session_id: uuid.UUID
+) -> Tuple[Optional[str], Optional[datetime.datetime]]:
+    """The session's rolling summary and the creation time of the last message it covers."""
+    q = await db.execute(
+        select(ChatSession.summary, ChatSession.summarized_until).where(
+            ChatSession.id == session_id
+        )
+    )
+    row = q.one_or_none()
+    return (row.summary, row.summarized_until) if row else (None, None)
+
+
+@traced("db.update_session_summary", backend="db")
+async def update_session_summary(
+    db: AsyncSession,
+    session_id: uuid.UUID,
+    summary: str,
+    summarized_until: datetime.datetime,
+    expected_until: Optional[datetime.datetime],
+) -> bool:
+    """
+    Store a new rolling summary if the session is still summarized up to
+    `expected_until`. Returns False when another compaction got there first.
+    """
+    q = await db.execute(
+        update(ChatSession)
+        .where(
+            ChatSession.id == session_id,
+            ChatSession.summarized_until.is_not_distinct_from(expected_until),
+        )
+        # Compaction doesn't change what the user sees; keep updated_at as is.
+        .values(
+            summary=summary,
+            summarized_until=summarized_until,
+            updated_at=ChatSession.updated_at,
+        )
+    )
+    await db.commit()
+    return q.rowcount == 1
+
+
+@traced("db.delete_chat_session", backend="db")
+async def delete_chat_session(db: AsyncSession, session_id: uuid.UUID) -> None:
+    """
+    Delete a session with a single DELETE; messages, attachments and the
+    media keys recorded for its archive go with it through the ON DELETE
+    CASCADE foreign keys. The S3 objects the session's attachments pointed
+    at, unless another attachment or archived session still does, are
+    queued for the GC in the same transaction (wake `s3_gc` afterwards); an
+    archived session's cold-storage blob is deleted here.
+    """
+    from app.services.s3_gc import keys_from_urls, schedule_deletion
+    from app.services.s3_storage import object_url
+
+    session_messages = select(Message.id).where(Message.session_id == session_id)
+    q = await db.execute(
+        select(Attachment.url, Attachment.audio_url).where(
+            or_(
+                Attachment.session_id == session_id,
+                Attachment.message_id.in_(session_messages),
+            )
+        )
+    )
+    urls = {url for row in q.all() for url in row if url}
+    q = await db.execute(
+        select(ArchivedMediaKey.key).where(ArchivedMediaKey.session_id == session_id)
+    )
+    urls.update(object_url(key) for key in q.scalars())
+    keys = set(keys_from_urls(urls))
+    q = await db.execute(select(ChatSession.archive_key).where(ChatSession.id == session_id))
+    archive_key = q.scalar_one_or_none()
+    await db.execute(delete(ChatSession).where(ChatSession.id == session_id))
+
+    # Objects other rows still point at (e.g. an imported copy) are kept.
+    q = await db.execute(
+        select(Attachment.url, Attachment.audio_url).where(
+            or_(Attachment.url.in_(urls), Attachment.audio_url.in_(urls))
+        )
+    )
+    in_use = set(keys_from_urls(url for row in q.all() for url in row))
+    q = await db.execute(
+        select(ArchivedMediaKey.key).where(ArchivedMediaKey.key.in_(keys))
+    )
+    in_use.update(q.scalars())
+    await schedule_deletion(db, sorted(keys - in_use))
+    await db.commit()
+    if archive_key is not None:
+        from app.services.session_archive import delete_archive
+
+        await delete_archive(archive_key)
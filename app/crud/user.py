@@ -5,18 +5,22 @@ from typing import Optional
 from app.models.user import User
 from app.schemas.user import UserCreate
 from app.auth.password import get_password_hash
+from app.core.tracing import traced
 
 
+@traced("db.get_user_by_email", backend="db")
 async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
     q = await db.execute(select(User).where(User.email == email))
     return q.scalars().first()
 
 
+@traced("db.get_user", backend="db")
 async def get_user(db: AsyncSession, user_id: int) -> Optional[User]:
     q = await db.execute(select(User).where(User.id == user_id))
     return q.scalars().first()
 
 
+@traced("db.create_user", backend="db")
 async def create_user(db: AsyncSession, user_in: UserCreate) -> User:
     user = User(
         email=user_in.email,
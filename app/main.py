@@ -1,12 +1,59 @@
-from fastapi import FastAPI, Depends
+import asyncio
+import logging
+import math
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
+from app.api.admission import close_admission_backend
 from app.api.v1 import auth, users, chat, multimodal
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, DeadlineMiddleware
+from app.core.metrics import (
+    MetricsMiddleware,
+    MetricsSpanExporter,
+    mark_worker_dead,
+    render_metrics,
+)
+from app.core.tracing import TracingMiddleware, add_span_exporter, configure_tracing
 from app.db.session import get_async_session
+from app.services import close_openai_client, warm_up
+from app.services.conversation import drain_compactions
+from app.services.llm_client import LLMUnavailableError
+from app.services.s3_gc import s3_gc
+from app.services.session_archive import archiver
+from app.utils import CircuitOpenError, shutdown_worker_pools
+
+logging.basicConfig(level=settings.LOG_LEVEL)
+configure_tracing()
+add_span_exporter(MetricsSpanExporter())
+
 
-app = FastAPI(title="Chatbot API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Backends are imported lazily; preload them off the event loop so the
+    # worker accepts traffic immediately and the first requests stay fast.
+    if settings.WARMUP_ON_STARTUP:
+        app.state.warmup = asyncio.create_task(asyncio.to_thread(warm_up))
+    s3_gc.start()
+    if settings.ARCHIVE_ENABLED:
+        archiver.start()
+    yield
+    await archiver.stop()
+    await drain_compactions()
+    await s3_gc.stop()
+    await close_openai_client()
+    await close_admission_backend()
+    shutdown_worker_pools()
+    mark_worker_dead()
+
+
+app = FastAPI(title="Chatbot API", lifespan=lifespan)
 
 
 # Allow frontend origins
@@ -22,8 +69,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # allow all HTTP methods
     allow_headers=["*"],  # allow all headers
+    expose_headers=["Server-Timing", "traceparent", "Retry-After"],
 )
 
+# gzip/brotli for large bodies (history, search)
+app.add_middleware(CompressionMiddleware)
+# Request deadline (X-Request-Timeout or the per-route default)
+app.add_middleware(DeadlineMiddleware)
+# Per-request root span + Server-Timing header
+app.add_middleware(TracingMiddleware)
+# Route histograms / in-flight gauge
+app.add_middleware(MetricsMiddleware)
+
 # Routers
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(users.router, prefix="/api/v1")
@@ -31,6 +88,26 @@ app.include_router(chat.router, prefix="/api/v1")
 app.include_router(multimodal.router, prefix="/api/v1")
 
 
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    # A required stage (e.g. the LLM answer) ran out of time
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+
+
+@app.exception_handler(LLMUnavailableError)
+async def llm_unavailable_handler(request: Request, exc: LLMUnavailableError):
+    return JSONResponse(status_code=503, content={"detail": "LLM request failed"})
+
+
 @app.get("/")
 async def health_check(db: AsyncSession = Depends(get_async_session)):
     try:
@@ -39,3 +116,9 @@ async def health_check(db: AsyncSession = Depends(get_async_session)):
     except Exception as e:
         db_status = f"error: {str(e)}"
     return {"status": "ok", "database": db_status}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
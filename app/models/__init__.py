@@ -2,4 +2,10 @@ from .chat_session import ChatSession
 from .message import Message, RoleEnum
 from .user import User
 from .attachment import Attachment
-from .voice_styles import VoiceStyle
\ No newline at end of file
+from .attachment_content import AttachmentContent
+from .voice_styles import VoiceStyle
+from .audio_formats import AudioOutputFormat, AudioOutputQuality
+from .single_flight_result import SingleFlightResult
+from .idempotency_key import IdempotencyKey
+from .pending_s3_deletion import PendingS3Deletion
+from .archived_media_key import ArchivedMediaKey
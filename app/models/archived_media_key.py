@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.db.base import Base
+
+
+class ArchivedMediaKey(Base):
+    """
+    S3 object an archived session's attachments point at. Recorded when the
+    session is archived and removed when it is restored, so the objects in
+    use can be told without opening any archive.
+    """
+
+    __tablename__ = "archived_media_keys"
+
+    session_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("chat_sessions.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    # Is any archived session still using the object? WHERE key IN (...)
+    key = Column(String, primary_key=True, index=True)
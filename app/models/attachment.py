@@ -1,6 +1,6 @@
 import datetime
 import uuid
-from sqlalchemy import Column, String, DateTime, Enum, ForeignKey
+from sqlalchemy import Column, String, DateTime, Enum, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 
@@ -16,21 +16,30 @@ class MediaType(str, enum.Enum):
 
 class Attachment(Base):
     __tablename__ = "attachments"
+    __table_args__ = (
+        # Finding other rows that point at the same S3 object (GC, imports).
+        # Hash indexes: URLs are unbounded, and only compared for equality.
+        Index("ix_attachments_url", "url", postgresql_using="hash"),
+        Index("ix_attachments_audio_url", "audio_url", postgresql_using="hash"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     session_id = Column(
         UUID(as_uuid=True),
         ForeignKey("chat_sessions.id", ondelete="CASCADE"),
         nullable=True,
+        index=True,
     )
     message_id = Column(
         UUID(as_uuid=True),
         ForeignKey("messages.id", ondelete="CASCADE"),
         nullable=True,
+        index=True,
     )
 
     url = Column(String, nullable=True)
     media_type = Column(Enum(MediaType), nullable=True)
+    # Lightweight metadata only; derived text lives in AttachmentContent
     metadata_ = Column(JSONB, nullable=True)
 
     # To store generated assistant audio responses
@@ -40,3 +49,12 @@ class Attachment(Base):
 
     session = relationship("ChatSession", back_populates="attachments")
     message = relationship("Message", back_populates="attachments")
+    # Potentially megabytes of text: never loaded implicitly
+    content = relationship(
+        "AttachmentContent",
+        back_populates="attachment",
+        uselist=False,
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise",
+    )
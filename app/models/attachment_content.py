@@ -0,0 +1,40 @@
+import datetime
+from sqlalchemy import Column, Computed, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
+from sqlalchemy.orm import deferred, relationship
+
+from app.db.base import Base
+
+
+class AttachmentContent(Base):
+    """
+    Text derived from an attachment (document text, image description or
+    audio transcript). Kept out of `attachments` so listing history never
+    reads it; it is loaded only when explicitly requested.
+    """
+
+    __tablename__ = "attachment_contents"
+    __table_args__ = (
+        Index("ix_attachment_contents_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+    attachment_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("attachments.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    # "document_text", "image_description" or "transcript"
+    kind = Column(String(32), nullable=False)
+    text = Column(Text, nullable=False)
+    # Full backend response (e.g. Transcribe JSON with per-word timings)
+    raw = deferred(Column(JSONB, nullable=True))
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # Capped so the tsvector stays far below its 1MB limit
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed("to_tsvector('english', left(text, 100000))", persisted=True),
+        )
+    )
+
+    attachment = relationship("Attachment", back_populates="content")
@@ -0,0 +1,22 @@
+from enum import Enum
+
+
+class AudioOutputFormat(str, Enum):
+    """Encodings of spoken replies; the values are the TTS API's response formats."""
+
+    mp3 = "mp3"
+    opus = "opus"
+    aac = "aac"
+    flac = "flac"
+    wav = "wav"
+
+
+class AudioOutputQuality(str, Enum):
+    """
+    Bitrate of compressed spoken replies (`TTS_BITRATES`); `high` keeps the
+    TTS API's own encoding.
+    """
+
+    low = "low"
+    medium = "medium"
+    high = "high"
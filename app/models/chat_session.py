@@ -1,23 +1,45 @@
 import datetime
 import uuid
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, text
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 
 from app.db.base import Base
 
 
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
+    __table_args__ = (
+        # session list: WHERE user_id = ? ORDER BY created_at DESC
+        Index("ix_chat_sessions_user_id_created_at", "user_id", "created_at"),
+        # archival candidates: WHERE archived_at IS NULL AND updated_at < ?
+        Index(
+            "ix_chat_sessions_updated_at_hot",
+            "updated_at",
+            postgresql_where=text("archived_at IS NULL"),
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     title = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    # Rolling summary of every message created up to `summarized_until`,
+    # maintained by app.services.conversation
+    summary = deferred(Column(Text, nullable=True), group="summary")
+    summarized_until = deferred(Column(DateTime, nullable=True), group="summary")
+    # Set while the session's messages and attachments live in cold storage
+    # (app/services/session_archive.py) instead of their tables
+    archived_at = Column(DateTime, nullable=True)
+    archive_key = Column(String, nullable=True)
 
     user = relationship("User", back_populates="sessions", lazy="joined")
-    messages = relationship("Message", back_populates="session", cascade="all, delete-orphan", lazy="selectin", order_by="Message.created_at")
-    attachments = relationship("Attachment", back_populates="session", cascade="all, delete")
+    # Child rows are removed by the database (ON DELETE CASCADE); passive_deletes
+    # stops the ORM from loading them just to delete them one by one.
+    # Messages are never loaded implicitly: a long session would pull its whole
+    # transcript on every lookup. Use selectinload() or the message CRUD.
+    messages = relationship("Message", back_populates="session", cascade="all, delete-orphan", passive_deletes=True, lazy="raise", order_by="Message.created_at")
+    attachments = relationship("Attachment", back_populates="session", cascade="all, delete", passive_deletes=True)
 
 
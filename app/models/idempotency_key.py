@@ -0,0 +1,26 @@
+import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.db.base import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Client-supplied `Idempotency-Key` of a mutating request together with the
+    request fingerprint and, once finished, the stored response.
+    """
+
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_key"),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    key = Column(String(255), nullable=False)
+    route = Column(String, nullable=False)
+    fingerprint = Column(String(64), nullable=False)
+    # "in_progress" while the first request runs, then "completed"
+    status = Column(String(16), nullable=False, default="in_progress")
+    status_code = Column(Integer, nullable=True)
+    response = Column(JSONB, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
@@ -1,8 +1,8 @@
 import datetime
 import uuid
-from sqlalchemy import Column, Text, DateTime, Enum, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Computed, Text, DateTime, Enum, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 import enum
 
 from app.db.base import Base
@@ -16,20 +16,31 @@ class RoleEnum(str, enum.Enum):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # history reads: WHERE session_id = ? ORDER BY created_at
+        Index("ix_messages_session_id_created_at", "session_id", "created_at"),
+        Index("ix_messages_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     session_id = Column(
         UUID(as_uuid=True),
         ForeignKey("chat_sessions.id", ondelete="CASCADE"),
         nullable=False,
-        index=True,
     )
     role = Column(Enum(RoleEnum), nullable=False, default=RoleEnum.user)
     content = Column(Text, nullable=False)
     metadata_ = Column("metadata", JSONB, nullable=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # Full-text search document, maintained by Postgres
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed("to_tsvector('english', coalesce(content, ''))", persisted=True),
+        )
+    )
 
-    session = relationship("ChatSession", back_populates="messages", lazy="joined")
+    session = relationship("ChatSession", back_populates="messages")
     # Relationship to Attachment
-    attachments = relationship("Attachment", back_populates="message", cascade="all, delete-orphan")
+    attachments = relationship("Attachment", back_populates="message", cascade="all, delete-orphan", passive_deletes=True)
 
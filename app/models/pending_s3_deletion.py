@@ -0,0 +1,20 @@
+import datetime
+from sqlalchemy import Column, Integer, String, DateTime
+
+from app.db.base import Base
+
+
+class PendingS3Deletion(Base):
+    """
+    S3 object queued for deletion by the background GC. Written in the same
+    transaction as the DELETE that orphaned the object, so a key is never
+    lost when a worker dies before the object is gone.
+    """
+
+    __tablename__ = "s3_gc_pending"
+
+    key = Column(String, primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    # Not picked up before this time (backoff after a failed attempt)
+    retry_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
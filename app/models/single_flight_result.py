@@ -0,0 +1,21 @@
+import datetime
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.db.base import Base
+
+
+class SingleFlightResult(Base):
+    """
+    Short-lived results of coalesced backend calls, shared between workers
+    when single-flight runs in advisory mode. While the leader's call runs
+    the row is its claim (status "in_progress", no result).
+    """
+
+    __tablename__ = "single_flight_results"
+
+    key = Column(String, primary_key=True)
+    # "in_progress" while the leader's call runs, then "completed"
+    status = Column(String(16), nullable=False, default="completed", server_default="completed")
+    result = Column(JSONB, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
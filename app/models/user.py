@@ -17,5 +17,5 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
     # relationships
-    sessions = relationship("ChatSession", back_populates="user", lazy="selectin")
+    sessions = relationship("ChatSession", back_populates="user", passive_deletes=True)
 
@@ -3,6 +3,7 @@ from enum import Enum
 
 class VoiceStyle(str, Enum):
     alloy = "alloy"
+    echo = "echo"
     verse = "verse"
     fable = "fable"
     onyx = "onyx"
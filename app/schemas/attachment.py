@@ -15,3 +15,15 @@ class AttachmentRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class AttachmentContentRead(BaseModel):
+    attachment_id: uuid.UUID
+    # "document_text", "image_description" or "transcript"
+    kind: str
+    text: str
+    # Full backend response; only returned with ?include_raw=true
+    raw: Optional[dict] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,67 @@
+"""
+Records of the NDJSON history format (`GET /chat/export`, `POST /chat/import`):
+one JSON object per line, each session followed by its messages and then
+its attachments.
+"""
+
+from pydantic import BaseModel, Field, TypeAdapter
+from datetime import datetime
+import uuid
+from typing import Annotated, Literal, Optional, Union
+
+from app.models import RoleEnum
+from app.models.attachment import MediaType
+
+
+class SessionRecord(BaseModel):
+    type: Literal["session"] = "session"
+    id: uuid.UUID
+    title: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    summary: Optional[str] = None
+    summarized_until: Optional[datetime] = None
+
+
+class MessageRecord(BaseModel):
+    type: Literal["message"] = "message"
+    id: uuid.UUID
+    session_id: uuid.UUID
+    role: RoleEnum
+    content: str
+    metadata: Optional[dict] = None
+    created_at: datetime
+
+
+class AttachmentContentRecord(BaseModel):
+    kind: str
+    text: str
+
+
+class AttachmentRecord(BaseModel):
+    type: Literal["attachment"] = "attachment"
+    id: uuid.UUID
+    session_id: Optional[uuid.UUID] = None
+    message_id: Optional[uuid.UUID] = None
+    url: Optional[str] = None
+    media_type: Optional[MediaType] = None
+    metadata: Optional[dict] = None
+    audio_url: Optional[str] = None
+    created_at: datetime
+    # Derived text (document text, image description, transcript)
+    content: Optional[AttachmentContentRecord] = None
+
+
+HistoryRecord = Annotated[
+    Union[SessionRecord, MessageRecord, AttachmentRecord], Field(discriminator="type")
+]
+history_record = TypeAdapter(HistoryRecord)
+
+
+class ImportSummary(BaseModel):
+    sessions: int = 0
+    messages: int = 0
+    attachments: int = 0
+    # Media URLs cleared because they pointed at objects in our bucket the
+    # importing user does not own (or that could not be copied)
+    media_dropped: int = 0
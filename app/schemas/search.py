@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from datetime import datetime
+import uuid
+from typing import List, Literal, Optional
+
+from app.models import RoleEnum
+
+
+class SearchHit(BaseModel):
+    message_id: uuid.UUID
+    session_id: uuid.UUID
+    session_title: Optional[str]
+    role: RoleEnum
+    created_at: datetime
+    # "message" when the message text matched, "attachment" when the text
+    # extracted from one of its attachments did
+    source: Literal["message", "attachment"]
+    attachment_id: Optional[uuid.UUID] = None
+    rank: float
+    # Excerpt with matches wrapped in <mark>...</mark>; the surrounding text
+    # is user content and is not HTML-escaped.
+    snippet: str
+
+    class Config:
+        from_attributes = True
+
+
+class SearchResults(BaseModel):
+    query: str
+    limit: int
+    offset: int
+    has_more: bool
+    results: List[SearchHit]
@@ -15,6 +15,8 @@ class SessionRead(BaseModel):
     title: Optional[str]
     created_at: datetime
     updated_at: datetime
+    # Set while the messages are in cold storage; reading them restores them
+    archived_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -25,6 +27,7 @@ class SessionWithMessages(BaseModel):
     title: str | None
     created_at: datetime
     updated_at: datetime
+    archived_at: Optional[datetime] = None
     messages: List[MessageRead]
 
     class Config:
@@ -0,0 +1,54 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+import uuid
+
+from app.models import AudioOutputFormat, AudioOutputQuality, VoiceStyle
+
+
+class UploadRequest(BaseModel):
+    filename: str
+    content_type: str
+    size: int = Field(..., gt=0, description="Exact object size in bytes")
+
+
+class PresignedPart(BaseModel):
+    part_number: int
+    url: str
+
+
+class PresignedUpload(BaseModel):
+    key: str
+    expires_in: int
+    # Single-part uploads: POST `fields` + the file to `url`
+    url: Optional[str] = None
+    fields: Optional[dict] = None
+    # Multipart uploads: PUT each part to its URL, then call /uploads/complete
+    upload_id: Optional[str] = None
+    part_size: Optional[int] = None
+    parts: Optional[List[PresignedPart]] = None
+
+
+class CompletedPart(BaseModel):
+    part_number: int
+    etag: str
+
+
+class CompleteMultipartRequest(BaseModel):
+    key: str
+    upload_id: str
+    parts: List[CompletedPart]
+
+
+class AbortMultipartRequest(BaseModel):
+    key: str
+    upload_id: str
+
+
+class FinalizeUploadRequest(BaseModel):
+    key: str
+    session_id: Optional[uuid.UUID] = None
+    prompt: Optional[str] = None
+    audio_output: bool = False
+    voice_style: VoiceStyle = VoiceStyle.alloy
+    audio_output_format: AudioOutputFormat = AudioOutputFormat.mp3
+    audio_quality: AudioOutputQuality = AudioOutputQuality.high
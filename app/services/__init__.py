@@ -1,6 +1,82 @@
-from .llm_client import generate_response
-from .textract import extract_text_from_s3_docs
-from .s3_storage import UploadToS3
-from .transcribe import transcribe_file
-from .audio_output import AudioOutput
-from .analyse_image_vision import analyze_image_vision_fn
\ No newline at end of file
+"""
+Service layer.
+
+Names are resolved lazily (PEP 562): `from app.services import X` only loads
+the module defining X, and the backends behind each service (openai, boto3,
+PyPDF2, docx, Pillow) are imported on first use. `warm_up` loads them all
+ahead of the first request.
+"""
+import importlib
+from typing import TYPE_CHECKING
+
+_EXPORTS = {
+    "get_openai_client": "openai_gateway",
+    "close_openai_client": "openai_gateway",
+    "get_gateway_stats": "openai_gateway",
+    "get_aws_client": "aws_clients",
+    "generate_response": "llm_client",
+    "extract_text_from_s3_docs": "textract",
+    "UploadToS3": "s3_storage",
+    "object_url": "s3_storage",
+    "safe_filename": "s3_storage",
+    "user_upload_prefix": "s3_storage",
+    "transcribe_file": "transcribe",
+    "transcribe_audio": "speech_to_text",
+    "LocalTranscriptionError": "speech_to_text",
+    "AudioOutput": "audio_output",
+    "analyze_image_vision_fn": "analyse_image_vision",
+    "preprocess_image_async": "image_preprocess",
+    "ProcessedImage": "image_preprocess",
+    "ImageDecodeError": "image_preprocess",
+    "preprocess_audio_async": "audio_preprocess",
+    "ProcessedAudio": "audio_preprocess",
+    "AudioDecodeError": "audio_preprocess",
+    "ALL_SUPPORTED_TYPES": "enrichment",
+    "SUPPORTED_TYPES": "enrichment",
+    "enrich_media": "enrichment",
+    "enrichment_context": "enrichment",
+    "media_type_for": "enrichment",
+    "DerivedContent": "enrichment",
+    "build_context": "conversation",
+    "count_tokens": "conversation",
+    "warm_up": "warmup",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .openai_gateway import get_openai_client, close_openai_client, get_gateway_stats
+    from .aws_clients import get_aws_client
+    from .llm_client import generate_response
+    from .textract import extract_text_from_s3_docs
+    from .s3_storage import UploadToS3, object_url, safe_filename, user_upload_prefix
+    from .transcribe import transcribe_file
+    from .speech_to_text import transcribe_audio, LocalTranscriptionError
+    from .audio_output import AudioOutput
+    from .analyse_image_vision import analyze_image_vision_fn
+    from .image_preprocess import preprocess_image_async, ProcessedImage, ImageDecodeError
+    from .audio_preprocess import preprocess_audio_async, ProcessedAudio, AudioDecodeError
+    from .enrichment import (
+        ALL_SUPPORTED_TYPES,
+        SUPPORTED_TYPES,
+        enrich_media,
+        enrichment_context,
+        media_type_for,
+        DerivedContent,
+    )
+    from .conversation import build_context, count_tokens
+    from .warmup import warm_up
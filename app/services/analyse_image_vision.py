@@ -1,19 +1,15 @@
-import os
+from app.services.openai_gateway import chat_completion
+from app.core.tracing import traced
 
-from dotenv import load_dotenv
-from openai import AsyncOpenAI
 
-load_dotenv()
-
-# Use async client
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-async def analyze_image_vision_fn(image_url: str) -> str:
+@traced("openai.vision", backend="openai")
+async def analyze_image_vision_fn(image_url: str, detail: str = "auto") -> str:
     """
     Analyze image using GPT-4o Vision asynchronously.
     Returns a short description and any detected text.
+    `detail` is forwarded to the API ("low", "high" or "auto").
     """
-    response = await client.chat.completions.create(
+    response = await chat_completion(
         model="gpt-4o",
         messages=[
             {
@@ -27,7 +23,10 @@ async def analyze_image_vision_fn(image_url: str) -> str:
                         "type": "text",
                         "text": "Describe this image briefly. If there is any text, extract it.",
                     },
-                    {"type": "image_url", "image_url": {"url": image_url}},
+                    {
+                        "type": "image_url",
+                        "image_url": {"url": image_url, "detail": detail},
+                    },
                 ],
             },
         ],
@@ -1,31 +1,92 @@
-from openai import AsyncOpenAI
-import tempfile
-from app.core.config import settings
+import asyncio
+import shutil
 import uuid
+from dataclasses import dataclass
+from typing import Optional
+
 from app.services import UploadToS3
+from app.services.audio_preprocess import SPEECH_ENCODERS, encode_speech
+from app.services.openai_gateway import create_speech
+from app.core.config import settings
+from app.core.deadline import remaining, stage
+from app.core.tracing import traced
+from app.utils.worker_pool import run_in_process_pool
+
+# S3 content type and file extension of each output format. OpenAI's
+# "opus" is Opus in an Ogg container, like the ffmpeg encoding.
+CONTENT_TYPES = {
+    "mp3": ("audio/mpeg", "mp3"),
+    "opus": ("audio/ogg", "opus"),
+    "aac": ("audio/aac", "aac"),
+    "flac": ("audio/flac", "flac"),
+    "wav": ("audio/wav", "wav"),
+}
+
+
+@dataclass
+class SpeechAudio:
+    url: str
+    audio_format: str
+    content_type: str
+    size: int
+    bitrate: Optional[str]  # None when the TTS API's own encoding was kept
 
 
 class AudioOutput:
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         self.s3_obj = UploadToS3()
 
-    async def convert_text_into_audio(self, voice_style: str, assistant_content: str):
+    @traced("audio_output")
+    async def convert_text_into_audio(
+        self,
+        voice_style: str,
+        assistant_content: str,
+        audio_format: str = "mp3",
+        quality: str = "high",
+    ) -> SpeechAudio:
         """
         Converts text into audio using OpenAI's TTS model and uploads it to S3.
+        Below "high" quality, compressed formats are synthesized as PCM and
+        encoded at the quality's bitrate. Every step is bounded by the
+        request deadline.
         """
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as temp_audio:
-            audio_resp = await self.client.audio.speech.create(
-                model="gpt-4o-mini-tts",
+        content_type, extension = CONTENT_TYPES[audio_format]
+        bitrate = settings.TTS_BITRATES.get(quality, {}).get(audio_format)
+        if audio_format not in SPEECH_ENCODERS or shutil.which(settings.FFMPEG_BINARY) is None:
+            bitrate = None
+
+        if bitrate is None:
+            audio_bytes = await create_speech(
+                model=settings.TTS_MODEL,
+                voice=voice_style,
+                text=assistant_content,
+                response_format=audio_format,
+            )
+        else:
+            pcm = await create_speech(
+                model=settings.TTS_MODEL,
                 voice=voice_style,
-                input=assistant_content,
+                text=assistant_content,
+                response_format="pcm",
             )
-        audio_resp.stream_to_file(temp_audio.name)
+            async with stage("tts.encode"):
+                audio_bytes = await run_in_process_pool(
+                    encode_speech,
+                    pcm,
+                    audio_format,
+                    bitrate,
+                    sample_rate=settings.TTS_PCM_SAMPLE_RATE,
+                    ffmpeg=settings.FFMPEG_BINARY,
+                    timeout=remaining(settings.TTS_ENCODE_TIMEOUT_SECONDS),
+                )
 
         # Upload generated audio to S3
-        with open(temp_audio.name, "rb") as audio_file:
-            audio_url = self.s3_obj.upload_file_to_s3(
-                audio_file.read(), f"{uuid.uuid4()}.mp3", "audio/mpeg"
+        async with stage("tts.upload"):
+            audio_url = await asyncio.to_thread(
+                self.s3_obj.upload_file_to_s3,
+                audio_bytes,
+                f"{uuid.uuid4()}.{extension}",
+                content_type,
             )
 
-        return audio_url
\ No newline at end of file
+        return SpeechAudio(audio_url, audio_format, content_type, len(audio_bytes), bitrate)
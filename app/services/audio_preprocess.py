@@ -0,0 +1,194 @@
+import shutil
+import subprocess
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.config import settings
+from app.core.deadline import remaining, stage
+from app.utils.worker_pool import run_in_process_pool
+
+# Formats AWS Transcribe accepts, by the content type they are stored with.
+CONTENT_TYPES = {
+    "mp3": "audio/mpeg",
+    "wav": "audio/wav",
+    "ogg": "audio/ogg",
+    "webm": "audio/webm",
+    "flac": "audio/flac",
+    "mp4": "audio/mp4",
+}
+
+
+def audio_format_for(content_type: Optional[str]) -> Optional[str]:
+    """Transcribe MediaFormat for a declared content type (clips not preprocessed)."""
+    for media_format, known in CONTENT_TYPES.items():
+        if content_type == known:
+            return media_format
+    return {"audio/mp3": "mp3", "audio/x-wav": "wav"}.get(content_type)
+
+
+# Drops leading silence and every pause longer than two seconds (trailing
+# silence included).
+SILENCE_FILTER = (
+    "silenceremove=start_periods=1:start_threshold=-50dB:"
+    "stop_periods=-1:stop_duration=2:stop_threshold=-50dB"
+)
+
+
+class AudioDecodeError(ValueError):
+    pass
+
+
+@dataclass
+class ProcessedAudio:
+    data: bytes
+    content_type: str
+    extension: str
+    media_format: str  # MediaFormat for Transcribe
+    duration: Optional[float]  # seconds of audio after trimming; None if not decoded
+    original_size: int
+    # 16-bit mono PCM at the preprocessing sample rate, kept for short clips
+    # that may be transcribed locally
+    pcm: Optional[bytes] = None
+
+
+def sniff_audio_format(data: bytes) -> Optional[str]:
+    """The container format from the file's magic bytes, whatever its declared type."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return "wav"
+    if data[:4] == b"OggS":
+        return "ogg"
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if data[:4] == b"fLaC":
+        return "flac"
+    if data[4:8] == b"ftyp":
+        return "mp4"
+    if data[:3] == b"ID3" or (len(data) > 1 and data[0] == 0xFF and data[1] & 0xE0 == 0xE0):
+        return "mp3"
+    return None
+
+
+def _run_ffmpeg(args: list[str], data: bytes, timeout: Optional[float]) -> bytes:
+    try:
+        result = subprocess.run(
+            args, input=data, capture_output=True, timeout=timeout, check=True
+        )
+    except subprocess.CalledProcessError as e:
+        message = e.stderr.decode(errors="replace").strip().splitlines()
+        raise AudioDecodeError(message[-1] if message else "ffmpeg failed") from None
+    except subprocess.TimeoutExpired:
+        raise AudioDecodeError("Audio processing timed out") from None
+    return result.stdout
+
+
+def preprocess_audio(
+    file_bytes: bytes,
+    ffmpeg: str = "ffmpeg",
+    sample_rate: int = 16000,
+    bitrate: str = "24k",
+    trim_silence: bool = True,
+    timeout: Optional[float] = None,
+    keep_pcm_seconds: float = 0.0,
+) -> ProcessedAudio:
+    """
+    Decode an uploaded clip whatever its container, downmix it to mono at
+    `sample_rate`, trim silence and re-encode it as Ogg/Opus, which is far
+    smaller than the WAVs browsers record and which Transcribe accepts.
+
+    Without an ffmpeg binary the clip is passed through unchanged, labelled
+    with its sniffed format. Raises `AudioDecodeError` for anything that
+    isn't audio. The decoded PCM is returned too for clips of at most
+    `keep_pcm_seconds`. Synchronous (ffmpeg runs as a subprocess); use
+    `preprocess_audio_async` from request handlers.
+    """
+    source_format = sniff_audio_format(file_bytes)
+    binary = shutil.which(ffmpeg)
+    if binary is None:
+        if source_format is None:
+            raise AudioDecodeError("Unrecognized audio format")
+        return ProcessedAudio(
+            data=file_bytes,
+            content_type=CONTENT_TYPES[source_format],
+            extension=source_format,
+            media_format=source_format,
+            duration=None,
+            original_size=len(file_bytes),
+        )
+
+    quiet = [binary, "-hide_banner", "-loglevel", "error", "-nostdin"]
+    decode = quiet + ["-i", "pipe:0", "-vn", "-ac", "1", "-ar", str(sample_rate)]
+    if trim_silence:
+        decode += ["-af", SILENCE_FILTER]
+    pcm = _run_ffmpeg(decode + ["-f", "s16le", "pipe:1"], file_bytes, timeout)
+    if not pcm:
+        raise AudioDecodeError("No audible content")
+
+    encode = quiet + [
+        "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+        "-c:a", "libopus", "-b:a", bitrate, "-application", "voip",
+        "-f", "ogg", "pipe:1",
+    ]
+    duration = len(pcm) / (2 * sample_rate)
+    return ProcessedAudio(
+        data=_run_ffmpeg(encode, pcm, timeout),
+        content_type=CONTENT_TYPES["ogg"],
+        extension="ogg",
+        media_format="ogg",
+        duration=duration,
+        original_size=len(file_bytes),
+        pcm=pcm if duration <= keep_pcm_seconds else None,
+    )
+
+
+# ffmpeg encoder and container of each compressed spoken-reply format
+SPEECH_ENCODERS = {
+    "opus": ["-c:a", "libopus", "-application", "voip", "-f", "ogg"],
+    "mp3": ["-c:a", "libmp3lame", "-f", "mp3"],
+    "aac": ["-c:a", "aac", "-f", "adts"],
+}
+
+
+def encode_speech(
+    pcm: bytes,
+    audio_format: str,
+    bitrate: str,
+    sample_rate: int = 24000,
+    ffmpeg: str = "ffmpeg",
+    timeout: Optional[float] = None,
+) -> bytes:
+    """
+    Encode 16-bit mono PCM (the TTS API's "pcm" output) as `audio_format`
+    at `bitrate`. Synchronous; meant for the worker pool.
+    """
+    args = [
+        shutil.which(ffmpeg) or ffmpeg, "-hide_banner", "-loglevel", "error", "-nostdin",
+        "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+        "-b:a", bitrate, *SPEECH_ENCODERS[audio_format], "pipe:1",
+    ]
+    return _run_ffmpeg(args, pcm, timeout)
+
+
+async def preprocess_audio_async(file_bytes: bytes) -> ProcessedAudio:
+    """
+    Run `preprocess_audio` in the shared worker pool, off the event loop,
+    within the request deadline.
+    """
+    from app.services.speech_to_text import local_transcription_enabled
+
+    keep_pcm_seconds = (
+        settings.LOCAL_TRANSCRIPTION_MAX_SECONDS if local_transcription_enabled() else 0.0
+    )
+    if shutil.which(settings.FFMPEG_BINARY) is None:
+        # Only sniffing to do; not worth a trip to the pool.
+        return preprocess_audio(file_bytes, ffmpeg=settings.FFMPEG_BINARY)
+    async with stage("audio_preprocess"):
+        return await run_in_process_pool(
+            preprocess_audio,
+            file_bytes,
+            ffmpeg=settings.FFMPEG_BINARY,
+            sample_rate=settings.AUDIO_SAMPLE_RATE,
+            bitrate=settings.AUDIO_BITRATE,
+            trim_silence=settings.AUDIO_TRIM_SILENCE,
+            timeout=remaining(settings.AUDIO_PREPROCESS_TIMEOUT_SECONDS),
+            keep_pcm_seconds=keep_pcm_seconds,
+        )
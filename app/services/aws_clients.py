@@ -0,0 +1,40 @@
+import threading
+
+from app.core.config import settings
+
+_clients: dict = {}
+_lock = threading.Lock()
+
+
+def get_aws_client(service: str):
+    """
+    Process-wide boto3 client for `service`, created on first use.
+
+    boto3 is only imported here, so modules that talk to AWS stay cheap to
+    import. Clients are thread-safe once built, but building one is slow and
+    not thread-safe, hence the lock.
+
+    Every call is bounded by the connect/read timeouts: boto3 runs in worker
+    threads, which a request deadline can stop waiting for but not cancel.
+    """
+    client = _clients.get(service)
+    if client is None:
+        with _lock:
+            client = _clients.get(service)
+            if client is None:
+                import boto3
+                from botocore.config import Config
+
+                client = boto3.client(
+                    service,
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region_name=settings.AWS_S3_REGION,
+                    config=Config(
+                        connect_timeout=settings.AWS_CONNECT_TIMEOUT_SECONDS,
+                        read_timeout=settings.AWS_READ_TIMEOUT_SECONDS,
+                        retries={"max_attempts": settings.AWS_MAX_ATTEMPTS, "mode": "standard"},
+                    ),
+                )
+                _clients[service] = client
+    return client
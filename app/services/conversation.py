@@ -0,0 +1,255 @@
+"""
+Prompt context for a chat turn: the session's rolling summary followed by the
+most recent turns verbatim.
+
+Once the unsummarized part of a session grows past
+`settings.SUMMARY_TRIGGER_TOKENS`, a background task folds its older turns
+into `ChatSession.summary`. Each turn therefore reads a bounded number of
+rows and sends a roughly constant-size prompt, however long the session is.
+"""
+
+import asyncio
+import datetime
+import logging
+import uuid
+from typing import Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.deadline import detached_context
+from app.core.metrics import SUMMARY_COMPACTIONS
+from app.core.tracing import detach_from_request, traced
+from app.crud.message import get_messages_by_session
+from app.crud.session import get_session_summary, update_session_summary
+from app.models import Message
+from app.services.openai_gateway import chat_completion
+
+logger = logging.getLogger(__name__)
+
+# Framing tokens the chat format adds around every message.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a conversation between a user and an "
+    "assistant. Merge the new turns into the current summary. Keep facts, "
+    "decisions, names, numbers, open questions and the user's preferences; "
+    "drop greetings and filler. Reply with the updated summary only."
+)
+
+
+_tokenizer = None
+
+
+def load_tokenizer() -> None:
+    """
+    Load the tiktoken encoding. Blocking (the encoding is downloaded on first
+    use), so `warm_up` calls it off the event loop; until it has run,
+    `count_tokens` estimates from the text length.
+    """
+    global _tokenizer
+    if _tokenizer is not None:
+        return
+    try:
+        import tiktoken
+
+        _tokenizer = tiktoken.get_encoding(settings.TOKENIZER_ENCODING)
+    except Exception as e:
+        logger.warning("Tokenizer unavailable, estimating token counts: %s", e)
+
+
+def count_tokens(text: str) -> int:
+    if _tokenizer is None:
+        return len(text) // 4 + 1
+    return len(_tokenizer.encode(text, disallowed_special=()))
+
+
+def _message_tokens(messages: Sequence[Message]) -> list[int]:
+    return [count_tokens(m.content) + MESSAGE_OVERHEAD_TOKENS for m in messages]
+
+
+def _recent_start(tokens: Sequence[int], budget: int) -> int:
+    """Index where the longest suffix fitting `budget` starts (never past the last message)."""
+    start, used = len(tokens), 0
+    while start > 0:
+        cost = tokens[start - 1]
+        if used + cost > budget and start < len(tokens):
+            break
+        used += cost
+        start -= 1
+    return start
+
+
+class SessionContext:
+    """
+    Prompt state of one session: its rolling summary and the messages created
+    since. `build_context` loads one per request; a WebSocket connection keeps
+    one for its lifetime and adds the messages it writes (write-through),
+    so its turns don't read the history back.
+    """
+
+    def __init__(
+        self,
+        session_id: uuid.UUID,
+        summary: Optional[str],
+        summarized_until: Optional[datetime.datetime],
+        messages: Sequence[Message],
+    ):
+        self.session_id = session_id
+        self.summary = summary
+        self.summarized_until = summarized_until
+        self._messages = list(messages)
+        self._tokens = _message_tokens(self._messages)
+        self._compaction: Optional[asyncio.Task] = None
+
+    @classmethod
+    async def load(cls, db: AsyncSession, session_id: uuid.UUID) -> "SessionContext":
+        summary, summarized_until = await get_session_summary(db, session_id)
+        messages = await get_messages_by_session(db, session_id, after=summarized_until)
+        return cls(session_id, summary, summarized_until, messages)
+
+    def extend(self, messages: Sequence[Message]) -> None:
+        self._messages.extend(messages)
+        self._tokens.extend(_message_tokens(messages))
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """Pick up the summary of a finished compaction and drop the turns it folded."""
+        if self._compaction is None or not self._compaction.done():
+            return
+        self._compaction = None
+        summary, until = await get_session_summary(db, self.session_id)
+        if until is None or until == self.summarized_until:
+            return
+        keep = [i for i, m in enumerate(self._messages) if m.created_at > until]
+        self._messages = [self._messages[i] for i in keep]
+        self._tokens = [self._tokens[i] for i in keep]
+        self.summary, self.summarized_until = summary, until
+
+    def prompt(self, pending: Sequence[Message] = ()) -> list[dict]:
+        """
+        Chat messages for the next LLM call: the rolling summary (if any) as a
+        system message, then the latest turns within `CONTEXT_RECENT_TOKENS`,
+        ending with the not yet persisted `pending` messages. Schedules a
+        compaction when the unsummarized history has grown too long.
+        """
+        messages = self._messages + list(pending)
+        tokens = self._tokens + _message_tokens(pending)
+        if sum(tokens) > settings.SUMMARY_TRIGGER_TOKENS:
+            self._compaction = schedule_compaction(self.session_id)
+
+        history = []
+        if self.summary:
+            history.append(
+                {"role": "system", "content": f"Summary of the conversation so far:\n{self.summary}"}
+            )
+        start = _recent_start(tokens, settings.CONTEXT_RECENT_TOKENS)
+        history.extend({"role": m.role.value, "content": m.content} for m in messages[start:])
+        return history
+
+
+async def build_context(
+    db: AsyncSession, session_id: uuid.UUID, pending: Sequence[Message] = ()
+) -> list[dict]:
+    """Prompt messages for a turn of `session_id` (see `SessionContext.prompt`)."""
+    return (await SessionContext.load(db, session_id)).prompt(pending)
+
+
+async def summarize(previous: Optional[str], messages: Sequence[Message]) -> str:
+    # A single oversized message is clipped rather than overflowing the call.
+    max_chars = settings.SUMMARY_CHUNK_TOKENS * 4
+    transcript = "\n\n".join(f"{m.role.value}: {m.content[:max_chars]}" for m in messages)
+    resp = await chat_completion(
+        model=settings.SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+            {
+                "role": "user",
+                "content": f"Current summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript}",
+            },
+        ],
+        max_tokens=settings.SUMMARY_MAX_TOKENS,
+    )
+    return (resp.choices[0].message.content or "").strip()
+
+
+@traced("conversation.compact_session")
+async def compact_session(session_id: uuid.UUID) -> bool:
+    """
+    Fold every unsummarized message older than the recent-turns window into
+    the session summary, `SUMMARY_CHUNK_TOKENS` at a time. Returns whether
+    the summary moved.
+    """
+    from app.db.session import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        summary, until = await get_session_summary(db, session_id)
+        messages = await get_messages_by_session(db, session_id, after=until)
+        tokens = _message_tokens(messages)
+        fold = _recent_start(tokens, settings.CONTEXT_RECENT_TOKENS)
+        # End the read transaction so no pooled connection is held while the
+        # summarizer runs (commit, unlike rollback, keeps `messages` loaded).
+        await db.commit()
+
+        compacted = False
+        done = 0
+        while done < fold:
+            end, used = done, 0
+            while end < fold and (end == done or used + tokens[end] <= settings.SUMMARY_CHUNK_TOKENS):
+                used += tokens[end]
+                end += 1
+            chunk = messages[done:end]
+            new_summary = await summarize(summary, chunk)
+            if not new_summary:
+                break
+            if not await update_session_summary(
+                db, session_id, new_summary, chunk[-1].created_at, expected_until=until
+            ):
+                # Another worker compacted the session concurrently.
+                SUMMARY_COMPACTIONS.labels("conflict").inc()
+                return compacted
+            summary, until = new_summary, chunk[-1].created_at
+            compacted = True
+            done = end
+
+    SUMMARY_COMPACTIONS.labels("compacted" if compacted else "skipped").inc()
+    return compacted
+
+
+# At most one compaction per session and process; tasks are kept referenced
+# until they finish.
+_compactions: dict[uuid.UUID, asyncio.Task] = {}
+
+
+def schedule_compaction(session_id: uuid.UUID) -> asyncio.Task:
+    """Start compacting the session unless this process already is; returns the task."""
+    task = _compactions.get(session_id)
+    if task is not None and not task.done():
+        return task
+    # Not bound by the budget of the request that happens to trigger it, nor
+    # part of that request's trace.
+    context = detached_context()
+    context.run(detach_from_request)
+    task = asyncio.create_task(
+        compact_session(session_id), name=f"compact-{session_id}", context=context
+    )
+    _compactions[session_id] = task
+    task.add_done_callback(lambda t: _compaction_done(session_id, t))
+    return task
+
+
+def _compaction_done(session_id: uuid.UUID, task: asyncio.Task) -> None:
+    if _compactions.get(session_id) is task:
+        del _compactions[session_id]
+    if not task.cancelled() and task.exception() is not None:
+        SUMMARY_COMPACTIONS.labels("error").inc()
+        logger.warning("Compaction of session %s failed: %s", session_id, task.exception())
+
+
+async def drain_compactions(timeout: float = 10.0) -> None:
+    """Give running compactions `timeout` seconds to finish, then cancel them."""
+    tasks = list(_compactions.values())
+    if not tasks:
+        return
+    _, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
@@ -0,0 +1,148 @@
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, mark_degraded, stage
+from app.models.attachment import MediaType
+from app.services.analyse_image_vision import analyze_image_vision_fn
+from app.services.audio_preprocess import ProcessedAudio
+from app.services.textract import extract_text_from_s3_docs
+from app.services.speech_to_text import transcribe_audio
+from app.utils import CircuitOpenError, SingleFlight, clean_text_fn, hedged
+
+logger = logging.getLogger(__name__)
+
+# Identical uploads enriched concurrently (double submits, viral media) share
+# one backend call per operation.
+enrichment_flight = SingleFlight("enrichment")
+
+SUPPORTED_TYPES = {
+    "image": ["image/jpeg", "image/png", "image/webp"],
+    "audio": [
+        "audio/mpeg",
+        "audio/wav",
+        "audio/mp3",
+        "audio/webm",
+        "audio/x-wav",
+        "audio/ogg",
+    ],
+    "document": [
+        "application/pdf",
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ],
+}
+
+ALL_SUPPORTED_TYPES = (
+    SUPPORTED_TYPES["image"] + SUPPORTED_TYPES["audio"] + SUPPORTED_TYPES["document"]
+)
+
+
+@dataclass
+class DerivedContent:
+    """Text derived from an uploaded file, stored apart from the attachment row."""
+
+    # "document_text", "image_description" or "transcript"
+    kind: str
+    text: str
+    # Full backend response, when worth keeping (Transcribe JSON)
+    raw: Optional[dict] = None
+
+    def summary(self) -> dict:
+        """Lightweight attachment metadata describing the content."""
+        return {"content_kind": self.kind, "content_chars": len(self.text)}
+
+
+def _transcript_text(transcript_json: dict) -> str:
+    transcripts = (transcript_json or {}).get("results", {}).get("transcripts", [])
+    return " ".join(t.get("transcript", "") for t in transcripts).strip()
+
+
+def media_type_for(content_type: Optional[str]) -> Optional[MediaType]:
+    for media_type in MediaType:
+        if content_type in SUPPORTED_TYPES[media_type.value]:
+            return media_type
+    return None
+
+
+async def enrich_media(
+    file_url: str,
+    content_type: str,
+    image_detail: str = "auto",
+    content_key: Optional[str] = None,
+    audio: Optional[ProcessedAudio] = None,
+) -> tuple[Optional[MediaType], Optional[DerivedContent]]:
+    """
+    Run the enrichment step matching the media type of an uploaded S3 object:
+    vision for images, Transcribe for audio, text extraction for documents.
+    Returns the media type and the derived content (None if there is none).
+
+    `content_key` identifies the content (e.g. its sha256); concurrent calls
+    with the same key and operation are coalesced into one backend call.
+    `audio` is the result of preprocessing an audio upload, which decides
+    the transcription backend and the format it is told.
+
+    Enrichment leaves `DEADLINE_LLM_RESERVE_SECONDS` of the request deadline
+    for the answer. When it runs out of time, or the backend's circuit is
+    open, the upload is kept without derived content and the stage is
+    reported as degraded.
+    """
+    media_type = media_type_for(content_type)
+    content = None
+
+    async def run(operation: str, fn):
+        async with stage(operation, reserve=settings.DEADLINE_LLM_RESERVE_SECONDS):
+            if content_key is None:
+                return await fn()
+            return await enrichment_flight.do(
+                f"{operation}:{content_key}", fn, operation=operation
+            )
+
+    try:
+        # ----- IMAGE -----
+        if media_type == MediaType.image:
+            # Vision and text extraction are idempotent, so slow calls are hedged.
+            description = await run(
+                f"vision-{image_detail}",
+                lambda: hedged(
+                    "vision",
+                    lambda: analyze_image_vision_fn(file_url, detail=image_detail),
+                ),
+            )
+            content = DerivedContent("image_description", description or "")
+
+        # ----- AUDIO -----
+        elif media_type == MediaType.audio:
+            transcript_json = await run(
+                "transcribe", lambda: transcribe_audio(file_url, content_type, audio)
+            )
+            content = DerivedContent(
+                "transcript", _transcript_text(transcript_json), raw=transcript_json
+            )
+
+        # ----- DOCUMENT -----
+        elif media_type == MediaType.document:
+            doc_text = await run(
+                "extract_text",
+                lambda: hedged("extract_text", lambda: extract_text_from_s3_docs(file_url)),
+            )
+            content = DerivedContent("document_text", clean_text_fn(doc_text))
+    except (DeadlineExceeded, CircuitOpenError) as e:
+        logger.warning("Enrichment of %s skipped: %s", file_url, e)
+        mark_degraded(e.stage)
+
+    return media_type, content
+
+
+def enrichment_context(content: Optional[DerivedContent]) -> Optional[str]:
+    """System message exposing the derived content of an attachment to the LLM."""
+    if content is None:
+        return None
+    if content.kind == "image_description":
+        return f"OCR extracted from image: {content.text}"
+    if content.kind == "transcript":
+        return f"Transcription of audio: {content.text}"
+    if content.kind == "document_text":
+        # truncate for safety
+        return f"Extracted text from document: {content.text[:2000]}"
+    return None
@@ -0,0 +1,113 @@
+import io
+from dataclasses import dataclass
+
+from app.core.config import settings
+from app.core.deadline import stage
+from app.utils.worker_pool import run_in_process_pool
+
+# GPT-4o scales every "high" detail image to fit 2048x2048 and then to a
+# shortest side of 768px before tiling, so anything larger is wasted bytes.
+VISION_MAX_LONG_SIDE = 2048
+VISION_MAX_SHORT_SIDE = 768
+
+
+class ImageDecodeError(ValueError):
+    pass
+
+
+@dataclass
+class ProcessedImage:
+    data: bytes
+    content_type: str
+    extension: str
+    width: int
+    height: int
+    original_size: int
+    detail: str
+
+
+def pick_detail_level(width: int, height: int, low_detail_max: int) -> str:
+    """
+    "low" detail is a fixed 512x512 pass, so images already that small lose
+    nothing by using it. Everything else needs "high" to keep text legible.
+    """
+    if max(width, height) <= low_detail_max:
+        return "low"
+    return "high"
+
+
+def _target_size(width: int, height: int, max_dimension: int) -> tuple[int, int]:
+    long_side, short_side = max(width, height), min(width, height)
+    scale = min(
+        1.0,
+        min(max_dimension, VISION_MAX_LONG_SIDE) / long_side,
+        VISION_MAX_SHORT_SIDE / short_side,
+    )
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def preprocess_image(
+    file_bytes: bytes,
+    max_dimension: int = VISION_MAX_LONG_SIDE,
+    jpeg_quality: int = 85,
+    low_detail_max: int = 512,
+) -> ProcessedImage:
+    """
+    Decode an uploaded image, apply and strip its EXIF orientation, downscale
+    it to the resolution the vision model actually uses and re-encode it.
+    Raises `ImageDecodeError` for bytes that are not a usable image.
+
+    Synchronous and CPU-bound; use `preprocess_image_async` from request handlers.
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(io.BytesIO(file_bytes)) as img:
+            img.load()
+            # Bake the EXIF rotation into the pixels, then drop all metadata.
+            img = ImageOps.exif_transpose(img)
+
+            width, height = _target_size(img.width, img.height, max_dimension)
+            if (width, height) != img.size:
+                img = img.resize((width, height), Image.Resampling.LANCZOS)
+
+            has_alpha = img.mode in ("RGBA", "LA") or (
+                img.mode == "P" and "transparency" in img.info
+            )
+            out = io.BytesIO()
+            if has_alpha:
+                img.convert("RGBA").save(out, format="PNG", optimize=True)
+                content_type, extension = "image/png", "png"
+            else:
+                img.convert("RGB").save(
+                    out, format="JPEG", quality=jpeg_quality, optimize=True
+                )
+                content_type, extension = "image/jpeg", "jpg"
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        # Unreadable, truncated or oversized (UnidentifiedImageError is an OSError)
+        raise ImageDecodeError(str(e)) from None
+
+    return ProcessedImage(
+        data=out.getvalue(),
+        content_type=content_type,
+        extension=extension,
+        width=width,
+        height=height,
+        original_size=len(file_bytes),
+        detail=pick_detail_level(width, height, low_detail_max),
+    )
+
+
+async def preprocess_image_async(file_bytes: bytes) -> ProcessedImage:
+    """
+    Run `preprocess_image` in the shared worker pool, off the event loop,
+    within the request deadline.
+    """
+    async with stage("image_preprocess"):
+        return await run_in_process_pool(
+            preprocess_image,
+            file_bytes,
+            max_dimension=settings.IMAGE_MAX_DIMENSION,
+            jpeg_quality=settings.IMAGE_JPEG_QUALITY,
+            low_detail_max=settings.IMAGE_LOW_DETAIL_MAX_DIMENSION,
+        )
@@ -1,26 +1,37 @@
 # wrapper for OpenAI API
+from typing import AsyncIterator
 
-# from autogen_ext.models.openai import OpenAIChatCompletionClient
-# from autogen_agentchat.messages import UserMessage
-from langchain_openai import ChatOpenAI
-from app.core.config import settings
+from app.services.openai_gateway import chat_completion, chat_completion_stream
+from app.core.deadline import DeadlineExceeded
+from app.core.tracing import span, traced
+from app.utils import CircuitOpenError
 
-OPENAI_API_KEY = settings.OPENAI_API_KEY
 
+class LLMUnavailableError(Exception):
+    """The LLM failed to produce a reply, even after the gateway's retries."""
 
+
+@traced("openai.generate_response", backend="openai")
 async def generate_response(messages: list[dict]) -> str:
     """
     messages: list of dicts like [{"role": "user", "content": "hi"}, ...]
+
+    Failures raise (answered with 503, or 504 for deadlines) so that an
+    error is never stored as the assistant's reply.
     """
     try:
-        model_client = ChatOpenAI(
-            model="gpt-4o-mini",
-            api_key=OPENAI_API_KEY,
-        )
-
-        resp = model_client.invoke(list(messages))
+        resp = await chat_completion(model="gpt-4o-mini", messages=list(messages))
 
-        return resp.content
+        return resp.choices[0].message.content
 
+    except (DeadlineExceeded, CircuitOpenError):
+        raise
     except Exception as e:
-        return f"Error from LLM: {str(e)}"
+        raise LLMUnavailableError(str(e)) from e
+
+
+async def stream_response(messages: list[dict]) -> AsyncIterator[str]:
+    """Like `generate_response`, but yields the reply as it is generated. Errors propagate."""
+    with span("openai.stream_response", backend="openai"):
+        async for delta in chat_completion_stream(model="gpt-4o-mini", messages=list(messages)):
+            yield delta
@@ -0,0 +1,213 @@
+"""
+Single entry point for every OpenAI call made by the app.
+
+One pooled `AsyncOpenAI` client is shared by all services. Each model gets its
+own concurrency semaphore and request token bucket, and 429/transient errors
+are retried with exponential backoff and full jitter. Request and token
+counters are kept per model for observability.
+"""
+
+import asyncio
+import random
+from collections import defaultdict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Optional
+
+from app.core.config import settings
+from app.core.deadline import remaining, stage
+from app.core.metrics import OPENAI_RETRIES, OPENAI_TOKENS
+from app.core.tracing import traced
+from app.utils.rate_limit import TokenBucket
+from app.utils.resilience import get_breaker
+
+# `openai` (and the httpx stack under it) is imported on first use so that
+# importing the app stays fast.
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+_client: Optional["AsyncOpenAI"] = None
+_semaphores: dict[str, asyncio.Semaphore] = {}
+_buckets: dict[str, TokenBucket] = {}
+_stats: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+
+@lru_cache(maxsize=None)
+def _retryable_errors() -> tuple[type[Exception], ...]:
+    from openai import (
+        APIConnectionError,
+        APITimeoutError,
+        InternalServerError,
+        RateLimitError,
+    )
+
+    return (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+
+def get_openai_client() -> "AsyncOpenAI":
+    """Return the process-wide OpenAI client, creating it on first use."""
+    global _client
+    if _client is None:
+        import httpx
+        from openai import AsyncOpenAI
+
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(settings.OPENAI_TIMEOUT_SECONDS, connect=5.0),
+        )
+        _client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            http_client=http_client,
+            # Retries are handled here so they share the model's limiter.
+            max_retries=0,
+        )
+    return _client
+
+
+async def close_openai_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def _semaphore(model: str) -> asyncio.Semaphore:
+    if model not in _semaphores:
+        limit = settings.OPENAI_MODEL_CONCURRENCY.get(
+            model, settings.OPENAI_MAX_CONCURRENCY_PER_MODEL
+        )
+        _semaphores[model] = asyncio.Semaphore(limit)
+    return _semaphores[model]
+
+
+def _bucket(model: str) -> TokenBucket:
+    if model not in _buckets:
+        rpm = settings.OPENAI_REQUESTS_PER_MINUTE
+        # Allow short bursts of up to 10% of the per-minute budget.
+        _buckets[model] = TokenBucket(rate=rpm / 60.0, capacity=max(1, rpm // 10))
+    return _buckets[model]
+
+
+def _retry_delay(attempt: int, error: Exception) -> float:
+    """Honour Retry-After when the API sends it, otherwise backoff with full jitter."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), settings.OPENAI_RETRY_MAX_DELAY)
+        except ValueError:
+            pass
+    ceiling = min(
+        settings.OPENAI_RETRY_MAX_DELAY,
+        settings.OPENAI_RETRY_BASE_DELAY * (2**attempt),
+    )
+    return random.uniform(0, ceiling)
+
+
+async def _call(model: str, request: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Run `request` under the model's limits, retrying transient errors. The
+    whole call, queueing and backoff included, is bounded by the request
+    deadline, and each attempt goes through the model's circuit breaker.
+    """
+    stats = _stats[model]
+    breaker = get_breaker(f"openai.{model}")
+    async with stage(f"openai.{model}"), _semaphore(model):
+        attempt = 0
+        while True:
+            await _bucket(model).acquire()
+            stats["requests"] += 1
+            try:
+                async with breaker.guard():
+                    return await request()
+            except _retryable_errors() as e:
+                from openai import RateLimitError
+
+                if isinstance(e, RateLimitError):
+                    stats["rate_limited"] += 1
+                delay = _retry_delay(attempt, e)
+                left = remaining()
+                # Don't back off past the deadline; fail with the real error.
+                if attempt >= settings.OPENAI_MAX_RETRIES or (left is not None and delay >= left):
+                    stats["errors"] += 1
+                    raise
+                stats["retries"] += 1
+                OPENAI_RETRIES.labels(model, type(e).__name__).inc()
+                await asyncio.sleep(delay)
+                attempt += 1
+            except Exception:
+                stats["errors"] += 1
+                raise
+
+
+def _record_usage(model: str, usage) -> None:
+    if usage is None:
+        return
+    _stats[model]["prompt_tokens"] += usage.prompt_tokens or 0
+    _stats[model]["completion_tokens"] += usage.completion_tokens or 0
+    OPENAI_TOKENS.labels(model, "prompt").inc(usage.prompt_tokens or 0)
+    OPENAI_TOKENS.labels(model, "completion").inc(usage.completion_tokens or 0)
+
+
+async def chat_completion(model: str, messages: list[dict], **kwargs):
+    """Rate-limited `chat.completions.create` through the shared client."""
+    client = get_openai_client()
+    response = await _call(
+        model,
+        lambda: client.chat.completions.create(
+            model=model, messages=messages, **kwargs
+        ),
+    )
+    _record_usage(model, response.usage)
+    return response
+
+
+async def chat_completion_stream(
+    model: str, messages: list[dict], **kwargs
+) -> AsyncIterator[str]:
+    """
+    Streaming `chat_completion`: yields content deltas as they arrive.
+    Rate limiting and retries cover opening the stream; an error after the
+    first delta propagates to the caller.
+    """
+    client = get_openai_client()
+    stream = await _call(
+        model,
+        lambda: client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **kwargs,
+        ),
+    )
+    try:
+        async for chunk in stream:
+            if chunk.usage is not None:
+                _record_usage(model, chunk.usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        await stream.close()
+
+
+@traced("openai.tts", backend="openai")
+async def create_speech(model: str, voice: str, text: str, **kwargs) -> bytes:
+    """Rate-limited text-to-speech; returns the encoded audio bytes."""
+    client = get_openai_client()
+    response = await _call(
+        model,
+        lambda: client.audio.speech.create(
+            model=model, voice=voice, input=text, **kwargs
+        ),
+    )
+    _stats[model]["characters"] += len(text)
+    return response.content
+
+
+def get_gateway_stats() -> dict[str, dict[str, int]]:
+    """Snapshot of per-model request/token counters."""
+    return {model: dict(counters) for model, counters in _stats.items()}
@@ -0,0 +1,171 @@
+"""
+Background garbage collection of S3 objects that no longer have a row
+pointing at them (e.g. uploads and TTS audio of a deleted session).
+
+Request handlers record the keys in `s3_gc_pending`, in the transaction
+that orphans them; a worker task per process drains the table and removes
+them with batched `DeleteObjects` calls.
+"""
+
+import asyncio
+import datetime
+import logging
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import S3_GC_OBJECTS
+from app.models import PendingS3Deletion
+from app.utils import extract_bucket_and_key
+
+logger = logging.getLogger(__name__)
+
+# Hard limit of a single DeleteObjects request.
+MAX_DELETE_BATCH = 1000
+
+
+def object_key(url: Optional[str]) -> Optional[str]:
+    """Key of an object URL in our bucket; None for anything else."""
+    if not url:
+        return None
+    try:
+        bucket, key = extract_bucket_and_key(url)
+    except ValueError:
+        return None
+    if bucket == settings.AWS_S3_BUCKET_NAME and key:
+        return key
+    return None
+
+
+def keys_from_urls(urls: Iterable[Optional[str]]) -> list[str]:
+    """Object keys in our bucket for the given object URLs; others are skipped."""
+    return sorted({key for key in map(object_key, urls) if key})
+
+
+async def schedule_deletion(db: AsyncSession, keys: Iterable[str]) -> None:
+    """
+    Queue keys for the GC in the caller's transaction: they are deleted only
+    if it commits, and stay queued until they are, whatever happens to this
+    worker. Call `s3_gc.wake()` after the commit.
+    """
+    now = datetime.datetime.utcnow()
+    rows = [{"key": key, "attempts": 0, "retry_at": now, "created_at": now} for key in keys]
+    if rows:
+        await db.execute(
+            pg_insert(PendingS3Deletion).values(rows).on_conflict_do_nothing()
+        )
+
+
+class S3GarbageCollector:
+    """
+    Drains `s3_gc_pending`. Every worker runs one; row locks with SKIP
+    LOCKED split the work between them, and keys left by a worker that died
+    are picked up by the periodic sweep.
+    """
+
+    def __init__(self):
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def wake(self) -> None:
+        """Start on newly scheduled keys now rather than at the next sweep."""
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="s3-gc")
+
+    async def stop(self) -> None:
+        """Stop the worker; whatever is still queued is kept for the next run."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        from app.services.s3_storage import UploadToS3
+
+        s3 = UploadToS3()
+        while True:
+            self._wake.clear()
+            try:
+                while await self.collect(s3):
+                    pass
+            except Exception as e:
+                logger.warning("S3 GC run failed: %s", e)
+            try:
+                await asyncio.wait_for(
+                    self._wake.wait(), settings.S3_GC_SWEEP_INTERVAL_SECONDS
+                )
+                # Linger briefly so keys from concurrent deletions share a request.
+                await asyncio.sleep(settings.S3_GC_LINGER_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def collect(self, s3, session_factory=None) -> int:
+        """
+        Delete one batch of due keys. Returns how many keys were attempted;
+        keys that fail are retried later with backoff, up to
+        `S3_GC_MAX_ATTEMPTS` times.
+        """
+        if session_factory is None:
+            from app.db.session import AsyncSessionLocal as session_factory
+
+        limit = min(settings.S3_GC_BATCH_SIZE, MAX_DELETE_BATCH)
+        async with session_factory() as db:
+            now = datetime.datetime.utcnow()
+            q = await db.execute(
+                select(PendingS3Deletion.key, PendingS3Deletion.attempts)
+                .where(PendingS3Deletion.retry_at <= now)
+                .order_by(PendingS3Deletion.retry_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            attempts = dict(q.all())
+            if not attempts:
+                return 0
+            keys = sorted(attempts)
+
+            try:
+                failed = set(await asyncio.to_thread(s3.delete_objects, keys))
+            except Exception as e:
+                logger.warning("S3 GC batch of %d keys failed: %s", len(keys), e)
+                failed = set(keys)
+
+            deleted = [key for key in keys if key not in failed]
+            gave_up = [
+                key for key in failed if attempts[key] + 1 >= settings.S3_GC_MAX_ATTEMPTS
+            ]
+            retried = [key for key in failed if key not in gave_up]
+            if deleted or gave_up:
+                await db.execute(
+                    delete(PendingS3Deletion).where(
+                        PendingS3Deletion.key.in_(deleted + gave_up)
+                    )
+                )
+            for key in retried:
+                await db.execute(
+                    update(PendingS3Deletion)
+                    .where(PendingS3Deletion.key == key)
+                    .values(
+                        attempts=attempts[key] + 1,
+                        retry_at=now + datetime.timedelta(seconds=2 ** (attempts[key] + 1)),
+                    )
+                )
+            await db.commit()
+
+        S3_GC_OBJECTS.labels("deleted").inc(len(deleted))
+        if gave_up:
+            S3_GC_OBJECTS.labels("failed").inc(len(gave_up))
+            logger.error("S3 GC gave up on %d keys: %s", len(gave_up), gave_up[:10])
+        return len(keys)
+
+
+s3_gc = S3GarbageCollector()
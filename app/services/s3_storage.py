@@ -1,17 +1,32 @@
-import boto3
+import os
+import re
+
 import uuid
 from app.core.config import settings
+from app.services.aws_clients import get_aws_client
+from app.core.tracing import traced
+
+
+def object_url(key: str) -> str:
+    return f"https://{settings.AWS_S3_BUCKET_NAME}.s3.{settings.AWS_S3_REGION}.amazonaws.com/{key}"
+
+
+def user_upload_prefix(user_id: int) -> str:
+    """Key prefix a user's own uploads live under."""
+    return f"uploads/{user_id}/"
+
+
+def safe_filename(filename: str | None) -> str:
+    """Strip any path and characters that would need escaping in an S3 key."""
+    name = os.path.basename(filename or "") or "file"
+    return re.sub(r"[^A-Za-z0-9._-]", "_", name)[:128]
 
 
 class UploadToS3:
     def __init__(self):
-        self.s3_client = boto3.client(
-            "s3",
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_S3_REGION,
-        )
+        self.s3_client = get_aws_client("s3")
 
+    @traced("s3.upload_file", backend="s3")
     def upload_file_to_s3(
         self, file_bytes: bytes, filename: str, content_type: str
     ) -> str:
@@ -22,4 +37,113 @@ class UploadToS3:
             Body=file_bytes,
             ContentType=content_type,
         )
-        return f"https://{settings.AWS_S3_BUCKET_NAME}.s3.{settings.AWS_S3_REGION}.amazonaws.com/{key}"
+        return object_url(key)
+
+    @traced("s3.upload_fileobj", backend="s3")
+    def upload_fileobj(self, fileobj, key: str, content_type: str) -> None:
+        """Upload a file-like object under `key`, in parts when it is large."""
+        self.s3_client.upload_fileobj(
+            fileobj,
+            settings.AWS_S3_BUCKET_NAME,
+            key,
+            ExtraArgs={"ContentType": content_type},
+        )
+
+    @traced("s3.get_object", backend="s3")
+    def open_object(self, key: str):
+        """A streaming, file-like body of the object at `key`."""
+        return self.s3_client.get_object(
+            Bucket=settings.AWS_S3_BUCKET_NAME, Key=key
+        )["Body"]
+
+    @traced("s3.copy_object", backend="s3")
+    def copy_object(self, src_key: str, dst_key: str) -> None:
+        """Server-side copy within the bucket; no bytes pass through us."""
+        self.s3_client.copy_object(
+            Bucket=settings.AWS_S3_BUCKET_NAME,
+            Key=dst_key,
+            CopySource={"Bucket": settings.AWS_S3_BUCKET_NAME, "Key": src_key},
+        )
+
+    # ----- Direct (presigned) uploads -----
+    # Clients upload straight to S3 so API workers never proxy media bytes.
+
+    def create_presigned_post(
+        self, key: str, content_type: str, max_size: int, expires_in: int
+    ) -> dict:
+        """
+        Presigned POST policy pinning the key, the exact content type and an
+        upper bound on the object size.
+        """
+        return self.s3_client.generate_presigned_post(
+            Bucket=settings.AWS_S3_BUCKET_NAME,
+            Key=key,
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 1, max_size],
+            ],
+            ExpiresIn=expires_in,
+        )
+
+    @traced("s3.create_multipart_upload", backend="s3")
+    def create_multipart_upload(self, key: str, content_type: str) -> str:
+        resp = self.s3_client.create_multipart_upload(
+            Bucket=settings.AWS_S3_BUCKET_NAME, Key=key, ContentType=content_type
+        )
+        return resp["UploadId"]
+
+    def presign_upload_part(
+        self, key: str, upload_id: str, part_number: int, expires_in: int
+    ) -> str:
+        return self.s3_client.generate_presigned_url(
+            "upload_part",
+            Params={
+                "Bucket": settings.AWS_S3_BUCKET_NAME,
+                "Key": key,
+                "UploadId": upload_id,
+                "PartNumber": part_number,
+            },
+            ExpiresIn=expires_in,
+        )
+
+    @traced("s3.complete_multipart_upload", backend="s3")
+    def complete_multipart_upload(
+        self, key: str, upload_id: str, parts: list[dict]
+    ) -> None:
+        self.s3_client.complete_multipart_upload(
+            Bucket=settings.AWS_S3_BUCKET_NAME,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+
+    @traced("s3.abort_multipart_upload", backend="s3")
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        self.s3_client.abort_multipart_upload(
+            Bucket=settings.AWS_S3_BUCKET_NAME, Key=key, UploadId=upload_id
+        )
+
+    @traced("s3.delete_objects", backend="s3")
+    def delete_objects(self, keys: list[str]) -> list[str]:
+        """
+        Delete up to 1000 keys in one request (the S3 limit). Returns the
+        keys S3 reported as failed; missing keys count as deleted.
+        """
+        resp = self.s3_client.delete_objects(
+            Bucket=settings.AWS_S3_BUCKET_NAME,
+            Delete={"Objects": [{"Key": k} for k in keys], "Quiet": True},
+        )
+        return [err["Key"] for err in resp.get("Errors", [])]
+
+    @traced("s3.head_object", backend="s3")
+    def head_object(self, key: str) -> dict | None:
+        """Object metadata, or None when the key does not exist."""
+        try:
+            return self.s3_client.head_object(
+                Bucket=settings.AWS_S3_BUCKET_NAME, Key=key
+            )
+        except self.s3_client.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
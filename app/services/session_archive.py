@@ -0,0 +1,322 @@
+"""
+Hot/cold tiering of chat history.
+
+Sessions untouched for `ARCHIVE_AFTER_DAYS` are archived: their records, in
+the NDJSON format of `GET /chat/export`, are written to one zstd-compressed
+blob and their messages, attachments and attachment content are deleted.
+The `ChatSession` row stays behind as a stub (title, summary, timestamps)
+with `archived_at` and `archive_key` set. Session lists still show it, with
+`archived_at` and without its messages; archiving and restoring change the
+list's ETag. The S3 objects its attachments point at are recorded in
+`archived_media_keys`, so deleting other sessions never garbage-collects
+them and deleting this one needs no archive read.
+
+The first read by the owner through `get_chat_session` (sending a message,
+uploads, WebSocket) or the messages endpoint restores the session: ids and
+timestamps come back as they were, so the session's messages and their
+ETag are unchanged. Full-text search does not cover archived sessions.
+
+Blobs go to S3 under `ARCHIVE_PREFIX`, or below `ARCHIVE_DIR` with
+`ARCHIVE_BACKEND="filesystem"` (local runs and tests).
+
+`archiver` runs in every worker when `ARCHIVE_ENABLED` is set; row locks
+with SKIP LOCKED keep workers off each other's sessions. For a one-off
+run (e.g. from cron): `python -m app.services.session_archive`.
+"""
+
+import asyncio
+import datetime
+import logging
+import os
+import shutil
+import tempfile
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import lazyload, undefer_group
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import settings
+from app.core.metrics import SESSION_ARCHIVE_OPERATIONS
+from app.crud.history import HistoryImport, HistoryRecord, stream_session_records
+from app.models import ArchivedMediaKey, Attachment, ChatSession, Message
+from app.schemas.history import AttachmentRecord, SessionRecord, history_record
+from app.services.s3_gc import keys_from_urls
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install .[archive]
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "application/zstd"
+# Decompressed bytes read from an archive at a time
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+class ArchiveUnavailableError(RuntimeError):
+    pass
+
+
+def _require_zstandard() -> None:
+    if zstandard is None:
+        raise ArchiveUnavailableError(
+            "Session archives need the zstandard package (pip install .[archive])"
+        )
+
+
+class S3ArchiveStore:
+    def __init__(self):
+        from app.services.s3_storage import UploadToS3
+
+        self.s3 = UploadToS3()
+
+    def put(self, key: str, fileobj) -> None:
+        self.s3.upload_fileobj(fileobj, key, CONTENT_TYPE)
+
+    def open(self, key: str):
+        return self.s3.open_object(key)
+
+    def delete(self, key: str) -> None:
+        self.s3.delete_objects([key])
+
+
+class FileArchiveStore:
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def put(self, key: str, fileobj) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written aside and renamed, so a crash never leaves half an archive.
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as tmp:
+            shutil.copyfileobj(fileobj, tmp)
+        os.replace(tmp.name, path)
+
+    def open(self, key: str):
+        return open(self._path(key), "rb")
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+def get_archive_store():
+    if settings.ARCHIVE_BACKEND == "filesystem":
+        return FileArchiveStore(settings.ARCHIVE_DIR)
+    return S3ArchiveStore()
+
+
+def archive_key(session: ChatSession, archived_at: datetime.datetime) -> str:
+    # Unique per archival: deleting the blob of an earlier archival can never
+    # remove a newer one.
+    return (
+        f"{settings.ARCHIVE_PREFIX}{session.user_id}/{session.id}/"
+        f"{archived_at:%Y%m%dT%H%M%S%f}.ndjson.zst"
+    )
+
+
+async def archive_session(db: AsyncSession, session: ChatSession) -> None:
+    """
+    Write the session's records to cold storage and delete them from the
+    hot tables, in the caller's transaction (commit to complete it). The
+    session row should be locked, with its summary loaded.
+    """
+    _require_zstandard()
+    archived_at = datetime.datetime.utcnow()
+    key = archive_key(session, archived_at)
+    urls = set()
+
+    with tempfile.SpooledTemporaryFile(max_size=settings.ARCHIVE_SPOOL_BYTES) as spool:
+        compressor = zstandard.ZstdCompressor(level=settings.ARCHIVE_ZSTD_LEVEL)
+        with compressor.stream_writer(spool, closefd=False) as writer:
+            async for record in stream_session_records(db, session):
+                if isinstance(record, AttachmentRecord):
+                    urls.update((record.url, record.audio_url))
+                writer.write(record.model_dump_json().encode() + b"\n")
+        spool.seek(0)
+        await asyncio.to_thread(get_archive_store().put, key, spool)
+
+    # attachment_contents go with their attachments (ON DELETE CASCADE)
+    session_messages = select(Message.id).where(Message.session_id == session.id)
+    await db.execute(
+        delete(Attachment).where(
+            or_(
+                Attachment.session_id == session.id,
+                Attachment.message_id.in_(session_messages),
+            )
+        )
+    )
+    await db.execute(delete(Message).where(Message.session_id == session.id))
+    # The media stays in S3; record it for the GC and imports.
+    media_keys = [
+        {"session_id": session.id, "key": media_key} for media_key in keys_from_urls(urls)
+    ]
+    if media_keys:
+        await db.execute(insert(ArchivedMediaKey), media_keys)
+    await db.execute(
+        update(ChatSession)
+        .where(ChatSession.id == session.id)
+        # What the user sees is unchanged; keep updated_at (and ETags) as is.
+        .values(archived_at=archived_at, archive_key=key, updated_at=ChatSession.updated_at)
+    )
+
+
+async def read_archived_records(key: str) -> AsyncIterator[HistoryRecord]:
+    """The records of an archive, streamed and decompressed as they are read."""
+    _require_zstandard()
+    raw = await asyncio.to_thread(get_archive_store().open, key)
+    try:
+        reader = zstandard.ZstdDecompressor().stream_reader(raw)
+        buffer = b""
+        while chunk := await asyncio.to_thread(reader.read, READ_CHUNK_BYTES):
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line:
+                    yield history_record.validate_json(line)
+        if buffer:
+            yield history_record.validate_json(buffer)
+    finally:
+        raw.close()
+
+
+async def delete_archive(key: str) -> None:
+    try:
+        await asyncio.to_thread(get_archive_store().delete, key)
+    except Exception as e:
+        logger.warning("Could not delete session archive %s: %s", key, e)
+
+
+async def restore_session(db: AsyncSession, session: ChatSession) -> None:
+    """
+    Move an archived session's messages and attachments back into the hot
+    tables and commit. Concurrent restores of the same session wait for the
+    first one and then find nothing to do.
+    """
+    q = await db.execute(
+        select(ChatSession.archive_key)
+        .where(ChatSession.id == session.id, ChatSession.archived_at.is_not(None))
+        .with_for_update()
+    )
+    key = q.scalar_one_or_none()
+    if key is not None:
+        try:
+            history_import = HistoryImport(db, session.user_id)
+            async for record in read_archived_records(key):
+                # The session row itself was never removed
+                if not isinstance(record, SessionRecord):
+                    await history_import.add(record)
+            await history_import.flush()
+            await db.execute(
+                delete(ArchivedMediaKey).where(ArchivedMediaKey.session_id == session.id)
+            )
+            await db.execute(
+                update(ChatSession)
+                .where(ChatSession.id == session.id)
+                .values(archived_at=None, archive_key=None, updated_at=ChatSession.updated_at)
+            )
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            SESSION_ARCHIVE_OPERATIONS.labels("restore", "failed").inc()
+            raise
+        SESSION_ARCHIVE_OPERATIONS.labels("restore", "ok").inc()
+        await delete_archive(key)
+    else:
+        await db.commit()
+    set_committed_value(session, "archived_at", None)
+    set_committed_value(session, "archive_key", None)
+
+
+async def archive_inactive_sessions(
+    session_factory=None,
+    older_than: Optional[datetime.timedelta] = None,
+    limit: Optional[int] = None,
+) -> int:
+    """
+    Archive up to `limit` sessions not updated for `older_than`, least
+    recently updated first, one transaction each. Returns how many were
+    archived; stops at the first failure.
+    """
+    if session_factory is None:
+        from app.db.session import AsyncSessionLocal as session_factory
+
+    cutoff = datetime.datetime.utcnow() - (
+        older_than or datetime.timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+    )
+    archived = 0
+    while archived < (limit or settings.ARCHIVE_BATCH_SIZE):
+        async with session_factory() as db:
+            q = await db.execute(
+                select(ChatSession)
+                .where(ChatSession.archived_at.is_(None), ChatSession.updated_at < cutoff)
+                .order_by(ChatSession.updated_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+                .options(undefer_group("summary"), lazyload(ChatSession.user))
+            )
+            session = q.scalars().first()
+            if session is None:
+                break
+            try:
+                await archive_session(db, session)
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                SESSION_ARCHIVE_OPERATIONS.labels("archive", "failed").inc()
+                logger.warning("Archiving session %s failed: %s", session.id, e)
+                break
+        SESSION_ARCHIVE_OPERATIONS.labels("archive", "ok").inc()
+        archived += 1
+    return archived
+
+
+class SessionArchiver:
+    """Periodic `archive_inactive_sessions` in the background of a worker."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if zstandard is None:
+            logger.warning("Session archiving disabled: zstandard is not installed")
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="session-archiver")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.ARCHIVE_INTERVAL_SECONDS)
+            try:
+                archived = await archive_inactive_sessions()
+            except Exception as e:
+                logger.warning("Session archiving run failed: %s", e)
+                continue
+            if archived:
+                logger.info("Archived %d inactive sessions", archived)
+
+
+archiver = SessionArchiver()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    print(f"Archived {asyncio.run(archive_inactive_sessions())} sessions")
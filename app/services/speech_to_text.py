@@ -0,0 +1,125 @@
+"""
+Speech-to-text backends and routing between them.
+
+- `AwsTranscribe`: Transcribe batch jobs on the uploaded S3 object. Handles
+  any length, but job start and polling add 10-30 s even to a short clip.
+- `LocalWhisper`: an ONNX Whisper model in the shared process pool
+  (app/services/whisper_onnx.py). Needs the clip decoded to PCM by audio
+  preprocessing, and is limited to `LOCAL_TRANSCRIPTION_MAX_SECONDS`.
+
+`settings.TRANSCRIPTION_BACKEND` picks:
+
+- "aws": always AWS Transcribe.
+- "auto": local for clips it accepts when `WHISPER_MODEL_DIR` is set, AWS
+  otherwise; a failed local transcription falls back to AWS.
+- "local": local only, never AWS. Clips it cannot take (not decoded, e.g.
+  presigned uploads or no ffmpeg, or too long) raise
+  `LocalTranscriptionError`; local failures are raised as is.
+
+Both backends return a Transcribe-shaped result.
+"""
+
+import asyncio
+import logging
+import uuid
+from typing import Optional
+
+from app.core.config import settings
+from app.core.tracing import traced
+from app.services.audio_preprocess import ProcessedAudio, audio_format_for
+from app.services.transcribe import transcribe_file
+from app.utils import get_breaker
+from app.utils.worker_pool import run_in_process_pool
+
+logger = logging.getLogger(__name__)
+
+
+class LocalTranscriptionError(RuntimeError):
+    pass
+
+
+def local_transcription_enabled() -> bool:
+    return settings.TRANSCRIPTION_BACKEND in ("local", "auto") and bool(settings.WHISPER_MODEL_DIR)
+
+
+class AwsTranscribe:
+    name = "aws"
+
+    def accepts(self, audio: Optional[ProcessedAudio]) -> bool:
+        return True
+
+    async def transcribe(
+        self, file_url: str, content_type: str, audio: Optional[ProcessedAudio]
+    ) -> dict:
+        media_format = audio.media_format if audio else audio_format_for(content_type)
+        async with get_breaker("transcribe").guard():
+            # Unique job names: concurrent requests must not delete each other's job.
+            return await asyncio.to_thread(
+                transcribe_file,
+                job_name=f"bharatlens-{uuid.uuid4().hex}",
+                s3_uri=file_url,
+                media_format=media_format or "mp3",
+            )
+
+
+class LocalWhisper:
+    name = "local"
+
+    def accepts(self, audio: Optional[ProcessedAudio]) -> bool:
+        return (
+            audio is not None
+            and audio.pcm is not None
+            and audio.duration <= settings.LOCAL_TRANSCRIPTION_MAX_SECONDS
+        )
+
+    @traced("whisper.transcribe", backend="whisper")
+    async def transcribe(
+        self, file_url: str, content_type: str, audio: Optional[ProcessedAudio]
+    ) -> dict:
+        from app.services.whisper_onnx import transcribe_pcm
+
+        return await run_in_process_pool(
+            transcribe_pcm,
+            audio.pcm,
+            settings.WHISPER_MODEL_DIR,
+            sample_rate=settings.AUDIO_SAMPLE_RATE,
+            languages=settings.WHISPER_LANGUAGES,
+            max_tokens=settings.WHISPER_MAX_TOKENS,
+            threads=settings.WHISPER_THREADS,
+        )
+
+
+aws_transcribe = AwsTranscribe()
+local_whisper = LocalWhisper()
+
+
+def pick_backend(audio: Optional[ProcessedAudio]):
+    if settings.TRANSCRIPTION_BACKEND == "local":
+        if not settings.WHISPER_MODEL_DIR:
+            raise LocalTranscriptionError(
+                'TRANSCRIPTION_BACKEND is "local" but WHISPER_MODEL_DIR is not set'
+            )
+        if not local_whisper.accepts(audio):
+            raise LocalTranscriptionError(
+                "Audio must be decodable and at most "
+                f"{settings.LOCAL_TRANSCRIPTION_MAX_SECONDS:g} s to transcribe locally"
+            )
+        return local_whisper
+    if local_transcription_enabled() and local_whisper.accepts(audio):
+        return local_whisper
+    return aws_transcribe
+
+
+async def transcribe_audio(
+    file_url: str, content_type: str, audio: Optional[ProcessedAudio] = None
+) -> dict:
+    """Transcribe an uploaded clip with the backend routing picks for it."""
+    backend = pick_backend(audio)
+    if backend is local_whisper:
+        try:
+            return await local_whisper.transcribe(file_url, content_type, audio)
+        except Exception as e:
+            if settings.TRANSCRIPTION_BACKEND == "local":
+                raise
+            logger.warning("Local transcription failed, using AWS: %s", e)
+    return await aws_transcribe.transcribe(file_url, content_type, audio)
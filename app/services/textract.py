@@ -1,15 +1,16 @@
 import io
 import asyncio
+import logging
 from urllib.parse import urlparse
 
-import httpx
-import docx
-from PyPDF2 import PdfReader
-import boto3
-from app.utils import extract_bucket_and_key
-from app.core.config import settings
+from app.services.aws_clients import get_aws_client
+from app.utils import extract_bucket_and_key, get_breaker
+from app.core.tracing import span, traced
 
+logger = logging.getLogger(__name__)
 
+
+@traced("extract_text_from_s3_docs")
 async def extract_text_from_s3_docs(s3_url: str) -> str:
     """
     Async extraction of text from PDF or DOCX documents stored in S3.
@@ -20,17 +21,24 @@ async def extract_text_from_s3_docs(s3_url: str) -> str:
     """
     parsed_url = urlparse(s3_url)
 
-    # --- Async download from S3 ---
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(s3_url)
-        resp.raise_for_status()
-        file_bytes = resp.content
+    # --- Download from S3 (authenticated, so private buckets and
+    # S3-compatible endpoints set via AWS_ENDPOINT_URL_S3 work) ---
+    bucket, document = extract_bucket_and_key(s3_url)
+    s3 = get_aws_client("s3")
+
+    def download_sync():
+        return s3.get_object(Bucket=bucket, Key=document)["Body"].read()
+
+    with span("s3.download", backend="s3"):
+        file_bytes = await asyncio.to_thread(download_sync)
 
     # --- PDF Handling ---
     if parsed_url.path.lower().endswith(".pdf"):
 
         def parse_pdf():
             """Synchronous PDF text extraction using PyPDF2."""
+            from PyPDF2 import PdfReader
+
             text = ""
             try:
                 pdf_reader = PdfReader(io.BytesIO(file_bytes))
@@ -40,7 +48,7 @@ async def extract_text_from_s3_docs(s3_url: str) -> str:
                         text += page_text + "\n"
                 return text.strip() if text else None
             except Exception as e:
-                print(f"[PDF Parsing Error] {e}")
+                logger.warning("PDF parsing error: %s", e)
                 return None
 
         # Run sync PDF parser in a separate thread
@@ -49,20 +57,16 @@ async def extract_text_from_s3_docs(s3_url: str) -> str:
             return text
 
         # Fallback to Textract for scanned or unparseable PDFs
-        bucket, document = extract_bucket_and_key(s3_url)
-        textract = boto3.client(
-            "textract",
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_S3_REGION,
-        )
+        textract = get_aws_client("textract")
 
         def textract_sync():
             return textract.detect_document_text(
                 Document={"S3Object": {"Bucket": bucket, "Name": document}}
             )
 
-        response = await asyncio.to_thread(textract_sync)
+        with span("textract.detect_document_text", backend="textract"):
+            async with get_breaker("textract").guard():
+                response = await asyncio.to_thread(textract_sync)
         lines = [
             item["Text"]
             for item in response.get("Blocks", [])
@@ -75,6 +79,8 @@ async def extract_text_from_s3_docs(s3_url: str) -> str:
 
         def parse_docx():
             """Synchronous DOCX text extraction using python-docx."""
+            import docx
+
             text = ""
             try:
                 doc = docx.Document(io.BytesIO(file_bytes))
@@ -83,7 +89,7 @@ async def extract_text_from_s3_docs(s3_url: str) -> str:
                         text += para.text + "\n"
                 return text.strip()
             except Exception as e:
-                print(f"[DOCX Parsing Error] {e}")
+                logger.warning("DOCX parsing error: %s", e)
                 return ""
 
         return await asyncio.to_thread(parse_docx)
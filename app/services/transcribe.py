@@ -1,19 +1,25 @@
-import boto3
+import logging
 import time
-import requests
+
 from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, check, remaining
+from app.services.aws_clients import get_aws_client
+from app.core.tracing import traced
 from app.utils import delete_job_if_exists
 
+logger = logging.getLogger(__name__)
+
+
+@traced("transcribe.transcribe_file", backend="transcribe")
 def transcribe_file(job_name, s3_uri, media_format="mp3"):
-    transcribe = boto3.client(
-        "transcribe",
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        region_name=settings.AWS_S3_REGION,
-    )
+    """
+    Blocking; run it in a thread. Polling stops with `DeadlineExceeded` once
+    the caller's deadline (copied into the thread's context) has passed.
+    """
+    transcribe = get_aws_client("transcribe")
 
     delete_job_if_exists(transcribe, job_name)
-    print(f"Starting new transcription job: {job_name}")
+    logger.info("Starting new transcription job: %s", job_name)
 
     transcribe.start_transcription_job(
         TranscriptionJobName=job_name,
@@ -30,18 +36,23 @@ def transcribe_file(job_name, s3_uri, media_format="mp3"):
         status = job["TranscriptionJob"]["TranscriptionJobStatus"]
         if status in ["COMPLETED", "FAILED"]:
             break
-        print("Waiting for job to complete...")
-        time.sleep(5)
+        if remaining() == 0:
+            logger.warning("Gave up waiting for transcription job %s", job_name)
+            raise DeadlineExceeded("transcribe")
+        logger.debug("Waiting for transcription job %s to complete", job_name)
+        time.sleep(remaining(settings.TRANSCRIBE_POLL_INTERVAL_SECONDS))
 
     if status == "COMPLETED":
+        import requests
+
+        check("transcribe")
         transcript_url = job["TranscriptionJob"]["Transcript"]["TranscriptFileUri"]
-        transcript_json = requests.get(transcript_url).json()
-        print(
-            "\nTranscript:\n",
-            transcript_json["results"]["transcripts"][0]["transcript"],
-        )
-        print(
-            "Languages detected:",
+        transcript_json = requests.get(
+            transcript_url, timeout=remaining(settings.TRANSCRIPT_DOWNLOAD_TIMEOUT_SECONDS)
+        ).json()
+        logger.info(
+            "Transcription job %s completed, languages detected: %s",
+            job_name,
             transcript_json.get("results", {}).get("language_codes", []),
         )
         return transcript_json
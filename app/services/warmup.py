@@ -0,0 +1,56 @@
+import importlib
+import logging
+import time
+
+from app.core.config import settings
+from app.services.aws_clients import get_aws_client
+
+logger = logging.getLogger(__name__)
+
+# Third-party backends the services import on first use.
+HEAVY_MODULES = (
+    "openai",
+    "httpx",
+    "boto3",
+    "requests",
+    "PyPDF2",
+    "docx",
+    "PIL.Image",
+    "PIL.ImageOps",
+    "tiktoken",
+)
+
+AWS_SERVICES = ("s3", "textract", "transcribe")
+
+
+def warm_up() -> None:
+    """
+    Import the heavy backends and build the shared AWS clients so the first
+    requests don't pay for it. Blocking; the app runs it in a thread after
+    startup. Failures are logged and left for the first real call to surface.
+    """
+    started = time.perf_counter()
+    for module in HEAVY_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            logger.warning("Warmup could not import %s: %s", module, e)
+    # Loads (and on first run downloads) the tokenizer encoding.
+    from app.services.conversation import load_tokenizer
+
+    load_tokenizer()
+    # Start loading the local speech model in a worker process (the other
+    # workers load it on their first clip).
+    from app.services.speech_to_text import local_transcription_enabled
+
+    if local_transcription_enabled():
+        from app.services.whisper_onnx import load_model
+        from app.utils.worker_pool import get_process_pool
+
+        get_process_pool().submit(load_model, settings.WHISPER_MODEL_DIR, settings.WHISPER_THREADS)
+    for service in AWS_SERVICES:
+        try:
+            get_aws_client(service)
+        except Exception as e:
+            logger.warning("Warmup could not create %s client: %s", service, e)
+    logger.info("Service warmup finished in %.2fs", time.perf_counter() - started)
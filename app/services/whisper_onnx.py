@@ -0,0 +1,158 @@
+"""
+Local speech to text with a Whisper model exported to ONNX.
+
+`model_dir` is an Optimum export (`optimum-cli export onnx --model
+openai/whisper-base <dir>`): `encoder_model.onnx`, `decoder_model.onnx`,
+`decoder_with_past_model.onnx` and the Hugging Face processor files. The
+model is loaded once per worker process and decoded greedily, which is
+plenty for voice notes of up to Whisper's 30 s window.
+
+The first decoder step runs `decoder_model.onnx` over the prompt; every
+later step feeds only the new token to `decoder_with_past_model.onnx`
+together with the cached keys and values, so decoding is linear in the
+output length. Exports without the with-past decoder still work, but
+re-run the full decoder per token (quadratic).
+
+Synchronous and CPU-bound; meant to run in the shared process pool.
+"""
+
+import os
+from typing import Optional, Sequence
+
+# 16-bit PCM, mono
+BYTES_PER_SAMPLE = 2
+
+_model: Optional["WhisperModel"] = None
+
+
+class WhisperModel:
+    def __init__(self, model_dir: str, threads: int = 1):
+        import onnxruntime
+        from transformers import WhisperProcessor
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        providers = ["CPUExecutionProvider"]
+        self.encoder = onnxruntime.InferenceSession(
+            os.path.join(model_dir, "encoder_model.onnx"), options, providers=providers
+        )
+        self.decoder = onnxruntime.InferenceSession(
+            os.path.join(model_dir, "decoder_model.onnx"), options, providers=providers
+        )
+        with_past = os.path.join(model_dir, "decoder_with_past_model.onnx")
+        self.decoder_with_past = (
+            onnxruntime.InferenceSession(with_past, options, providers=providers)
+            if os.path.exists(with_past)
+            else None
+        )
+        self.processor = WhisperProcessor.from_pretrained(model_dir)
+        tokenizer = self.processor.tokenizer
+        self.start = tokenizer.convert_tokens_to_ids("<|startoftranscript|>")
+        self.transcribe_task = tokenizer.convert_tokens_to_ids("<|transcribe|>")
+        self.no_timestamps = tokenizer.convert_tokens_to_ids("<|notimestamps|>")
+        self.end = tokenizer.eos_token_id
+
+    @staticmethod
+    def _run(session, feed: dict, past: dict):
+        """
+        Run a decoder; returns the logits of the last position and `past`
+        updated with its `present.*` outputs (as `past_key_values.*`).
+        """
+        names = [output.name for output in session.get_outputs()]
+        outputs = dict(zip(names, session.run(names, feed)))
+        for name, value in outputs.items():
+            if name.startswith("present."):
+                past["past_key_values." + name[len("present."):]] = value
+        return outputs["logits"][0, -1], past
+
+    def _first_logits(self, tokens: list[int], hidden):
+        import numpy as np
+
+        return self._run(
+            self.decoder,
+            {
+                "input_ids": np.array([tokens], dtype=np.int64),
+                "encoder_hidden_states": hidden,
+            },
+            {},
+        )
+
+    def _next_logits(self, tokens: list[int], hidden, past: dict):
+        import numpy as np
+
+        if self.decoder_with_past is None:
+            return self._first_logits(tokens, hidden)
+        inputs = [i.name for i in self.decoder_with_past.get_inputs()]
+        feed = {name: past[name] for name in inputs if name in past}
+        feed["input_ids"] = np.array([tokens[-1:]], dtype=np.int64)
+        if "encoder_hidden_states" in inputs:
+            feed["encoder_hidden_states"] = hidden
+        return self._run(self.decoder_with_past, feed, past)
+
+    def transcribe(
+        self, pcm: bytes, sample_rate: int, languages: Sequence[str], max_tokens: int
+    ) -> tuple[str, str]:
+        """Text and detected language (one of `languages`) of a clip."""
+        import numpy as np
+
+        audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+        features = self.processor.feature_extractor(
+            audio, sampling_rate=sample_rate, return_tensors="np"
+        ).input_features
+        (hidden,) = self.encoder.run(["last_hidden_state"], {"input_features": features})
+
+        # Language detection, restricted to the expected languages
+        tokenizer = self.processor.tokenizer
+        candidates = {
+            tokenizer.convert_tokens_to_ids(f"<|{code}|>"): code for code in languages
+        }
+        logits, _ = self._first_logits([self.start], hidden)
+        language_token = max(candidates, key=lambda token: logits[token])
+
+        tokens = [self.start, language_token, self.transcribe_task, self.no_timestamps]
+        prompt_length = len(tokens)
+        logits, past = self._first_logits(tokens, hidden)
+        while len(tokens) - prompt_length < max_tokens:
+            token = int(np.argmax(logits))
+            if token == self.end:
+                break
+            tokens.append(token)
+            if len(tokens) - prompt_length < max_tokens:
+                logits, past = self._next_logits(tokens, hidden, past)
+        text = tokenizer.decode(tokens[prompt_length:], skip_special_tokens=True)
+        return text.strip(), candidates[language_token]
+
+
+def load_model(model_dir: str, threads: int = 1) -> WhisperModel:
+    global _model
+    if _model is None:
+        _model = WhisperModel(model_dir, threads)
+    return _model
+
+
+def transcribe_pcm(
+    pcm: bytes,
+    model_dir: str,
+    sample_rate: int = 16000,
+    languages: Sequence[str] = ("en", "hi"),
+    max_tokens: int = 224,
+    threads: int = 1,
+) -> dict:
+    """
+    Transcribe 16-bit mono PCM. Returns the transcript in the shape of an
+    AWS Transcribe result so both backends are stored and read alike.
+    """
+    text, language = load_model(model_dir, threads).transcribe(
+        pcm, sample_rate, languages, max_tokens
+    )
+    duration = len(pcm) / (BYTES_PER_SAMPLE * sample_rate)
+    return {
+        "backend": "whisper-onnx",
+        "results": {
+            "transcripts": [{"transcript": text}],
+            "language_codes": [
+                {"language_code": language, "duration_in_seconds": round(duration, 2)}
+            ],
+        },
+    }
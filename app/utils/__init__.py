@@ -1,3 +1,7 @@
 from .extract_from_url import extract_bucket_and_key
 from .delete_transcrption_job import delete_job_if_exists
-from .clean_text import clean_text_fn
\ No newline at end of file
+from .clean_text import clean_text_fn
+from .worker_pool import run_in_process_pool, shutdown_worker_pools
+from .rate_limit import TokenBucket
+from .single_flight import SingleFlight, content_hash
+from .resilience import CircuitOpenError, get_breaker, hedged
@@ -1,12 +1,14 @@
-from botocore.exceptions import ClientError
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 def delete_job_if_exists(transcribe, job_name):
     try:
         transcribe.delete_transcription_job(TranscriptionJobName=job_name)
-        print(f"Deleted previous job: {job_name}")
-    except ClientError as e:
+        logger.info("Deleted previous transcription job: %s", job_name)
+    except transcribe.exceptions.ClientError as e:
         if e.response["Error"]["Code"] in ["NotFoundException", "BadRequestException"]:
-            print("No existing job found to delete.")
+            logger.debug("No existing transcription job %s to delete", job_name)
         else:
             raise
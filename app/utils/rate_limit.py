@@ -0,0 +1,39 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `capacity` tokens, refilled continuously at `rate`
+    tokens per second. Not thread-safe; meant to be used from one event loop.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, amount: float = 1.0) -> float:
+        """
+        Take `amount` tokens if available. Returns 0 on success, otherwise the
+        number of seconds until enough tokens will have accumulated.
+        """
+        self._refill()
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Wait until `amount` tokens are available, then take them."""
+        while True:
+            wait = self.try_acquire(amount)
+            if wait == 0:
+                return
+            await asyncio.sleep(wait)
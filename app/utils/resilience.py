@@ -0,0 +1,224 @@
+"""
+Circuit breakers and hedged requests for external backends.
+
+A `CircuitBreaker` counts consecutive backend failures. Past the threshold it
+opens and calls fail fast with `CircuitOpenError` instead of waiting for the
+backend to fail again. After a cool-down one probe call is let through
+(half-open); its outcome closes or re-opens the breaker.
+
+`hedged` runs an idempotent call and, if it is slower than the operation's
+recent p95, starts a second copy and keeps whichever finishes first. Hedges
+are limited to a fraction of calls so a slow backend isn't flooded.
+"""
+
+import asyncio
+import bisect
+import collections
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+from app.core.config import settings
+from app.core.metrics import CIRCUIT_BREAKER_REJECTIONS, CIRCUIT_BREAKER_STATE, HEDGED_REQUESTS
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable (circuit open)")
+        self.stage = name
+        self.retry_after = retry_after
+
+
+def is_backend_failure(exc: BaseException) -> bool:
+    """
+    Whether `exc` says something about the backend's health. Client errors
+    (4xx other than 408/429) mean the request was bad, not the backend.
+    """
+    status = getattr(exc, "status_code", None)
+    response = getattr(exc, "response", None)
+    if status is None and isinstance(response, dict):
+        # botocore ClientError
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    if isinstance(status, int) and 400 <= status < 500 and status not in (408, 429):
+        return False
+    return True
+
+
+class CircuitBreaker:
+    """
+    Per-backend breaker, used around each call to the backend:
+
+        async with get_breaker("transcribe").guard():
+            ...
+
+    Not thread-safe; meant to be used from one event loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        reset_timeout: float,
+        slow_call_seconds: float,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_seconds = slow_call_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        CIRCUIT_BREAKER_STATE.labels(name).set(0)
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        CIRCUIT_BREAKER_STATE.labels(self.name).set(_STATE_VALUES[state])
+
+    def before_call(self) -> None:
+        """Raise `CircuitOpenError` unless a call may go to the backend now."""
+        if self.state == OPEN:
+            waited = time.monotonic() - self.opened_at
+            if waited < self.reset_timeout:
+                CIRCUIT_BREAKER_REJECTIONS.labels(self.name).inc()
+                raise CircuitOpenError(self.name, self.reset_timeout - waited)
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probing:
+                CIRCUIT_BREAKER_REJECTIONS.labels(self.name).inc()
+                raise CircuitOpenError(self.name, self.reset_timeout)
+            self._probing = True
+
+    def record_success(self) -> None:
+        self._probing = False
+        self.failures = 0
+        if self.state != CLOSED:
+            self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        self._probing = False
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+    def release(self) -> None:
+        """The call ended without telling anything about the backend."""
+        self._probing = False
+
+    @asynccontextmanager
+    async def guard(self) -> AsyncIterator[None]:
+        """Wrap one backend call: fail fast while open, record its outcome."""
+        self.before_call()
+        started = time.monotonic()
+        try:
+            yield
+        except asyncio.CancelledError:
+            # Abandoned by the caller (deadline, lost hedge). Only a call that
+            # had already hung for a long time counts against the backend.
+            if time.monotonic() - started >= self.slow_call_seconds:
+                self.record_failure()
+            else:
+                self.release()
+            raise
+        except Exception as e:
+            if is_backend_failure(e):
+                self.record_failure()
+            else:
+                self.release()
+            raise
+        else:
+            self.record_success()
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(
+            name,
+            failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=settings.CIRCUIT_RESET_SECONDS,
+            slow_call_seconds=settings.CIRCUIT_SLOW_CALL_SECONDS,
+        )
+    return breaker
+
+
+def breaker_states() -> dict[str, str]:
+    return {name: breaker.state for name, breaker in _breakers.items()}
+
+
+class LatencyTracker:
+    """Sliding window of recent successful call durations."""
+
+    def __init__(self, window: int = 200):
+        self._recent: collections.deque[float] = collections.deque(maxlen=window)
+        self._sorted: list[float] = []
+
+    def observe(self, seconds: float) -> None:
+        if len(self._recent) == self._recent.maxlen:
+            oldest = self._recent[0]
+            del self._sorted[bisect.bisect_left(self._sorted, oldest)]
+        self._recent.append(seconds)
+        bisect.insort(self._sorted, seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if len(self._sorted) < settings.HEDGE_MIN_SAMPLES:
+            return None
+        index = min(len(self._sorted) - 1, int(len(self._sorted) * pct / 100))
+        return self._sorted[index]
+
+
+class _Hedging:
+    def __init__(self):
+        self.latency = LatencyTracker()
+        # Hedge budget: every call earns HEDGE_BUDGET_RATIO of a hedge.
+        self.budget = 1.0
+
+
+_hedging: dict[str, _Hedging] = collections.defaultdict(_Hedging)
+
+
+async def hedged(operation: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Run the idempotent `fn`; if it hasn't finished after the operation's
+    recent p95 latency, start a second `fn()` and return the first result
+    (the other attempt is cancelled). Errors only propagate once no attempt
+    is left running.
+    """
+    state = _hedging[operation]
+    state.budget = min(settings.HEDGE_MAX_BURST, state.budget + settings.HEDGE_BUDGET_RATIO)
+    p95 = state.latency.percentile(95)
+    delay = max(settings.HEDGE_MIN_DELAY_SECONDS, p95) if p95 is not None else None
+
+    started = time.monotonic()
+    pending = {asyncio.ensure_future(fn())}
+    hedge = None
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done and state.budget >= 1:
+                state.budget -= 1
+                HEDGED_REQUESTS.labels(operation, "sent").inc()
+                hedge = asyncio.ensure_future(fn())
+                pending.add(hedge)
+
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    state.latency.observe(time.monotonic() - started)
+                    if task is hedge:
+                        HEDGED_REQUESTS.labels(operation, "won").inc()
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,178 @@
+import asyncio
+import datetime
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.core.config import settings
+from app.core.deadline import detached_context
+from app.core.metrics import SINGLE_FLIGHT_CALLS
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls sharing a key: the first caller (the leader)
+    starts the work, later callers await the same in-flight task instead of
+    repeating the backend call. Nothing is cached once the call finishes.
+
+    Cancellation safety: a cancelled caller only stops waiting; the shared
+    task keeps running for the remaining callers and is cancelled only when
+    nobody is waiting for it any more. The same goes for deadlines: the
+    shared task runs under a deadline of its own, and each caller's `stage`
+    bounds only how long that caller waits.
+
+    With `settings.SINGLE_FLIGHT_MODE == "advisory"` the leader additionally
+    claims the key with an "in_progress" row in `single_flight_results` and
+    publishes its result there, so identical calls in other workers poll for
+    it and reuse the result instead of running again. A claim older than
+    `SINGLE_FLIGHT_LOCK_TIMEOUT_SECONDS` is taken over.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[str, _Call] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(
+        self, key: str, fn: Callable[[], Awaitable[Any]], operation: str = "default"
+    ) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            SINGLE_FLIGHT_CALLS.labels(self.name, operation, "leader").inc()
+            if settings.SINGLE_FLIGHT_MODE == "advisory":
+                coro = self._run_across_workers(key, fn, operation)
+            else:
+                coro = fn()
+            # Not bound by the leader's deadline: followers may have more time.
+            call = _Call(asyncio.create_task(coro, context=detached_context()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            SINGLE_FLIGHT_CALLS.labels(self.name, operation, "coalesced").inc()
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Retrieve the exception so an abandoned failing task is not reported
+        # as "never retrieved".
+        if not call.task.cancelled():
+            call.task.exception()
+
+    async def _run_across_workers(
+        self, key: str, fn: Callable[[], Awaitable[Any]], operation: str
+    ) -> Any:
+        from app.db.session import engine
+        from app.models import SingleFlightResult
+
+        table = SingleFlightResult.__table__
+        result_key = f"{self.name}:{key}"
+
+        # Every step is a short transaction of its own: no connection is held
+        # while the backend call runs, however long it takes.
+        while True:
+            now = datetime.datetime.utcnow()
+            fresh_after = now - datetime.timedelta(
+                seconds=settings.SINGLE_FLIGHT_RESULT_TTL_SECONDS
+            )
+            stale_before = now - datetime.timedelta(
+                seconds=settings.SINGLE_FLIGHT_LOCK_TIMEOUT_SECONDS
+            )
+            async with engine.begin() as conn:
+                # Expired results, and claims whose leader apparently died
+                await conn.execute(
+                    delete(table).where(
+                        table.c.key == result_key,
+                        or_(
+                            and_(table.c.status == "completed", table.c.created_at < fresh_after),
+                            and_(table.c.status == "in_progress", table.c.created_at < stale_before),
+                        ),
+                    )
+                )
+                claimed = (
+                    await conn.execute(
+                        pg_insert(table)
+                        .values(key=result_key, status="in_progress", result=None, created_at=now)
+                        .on_conflict_do_nothing(index_elements=[table.c.key])
+                        .returning(table.c.key)
+                    )
+                ).first()
+                row = None
+                if claimed is None:
+                    row = (
+                        await conn.execute(
+                            select(table.c.status, table.c.result).where(table.c.key == result_key)
+                        )
+                    ).first()
+
+            if claimed is not None:
+                return await self._lead(result_key, now, fn)
+            if row is None:
+                # Released by a failed leader in the meantime
+                continue
+            if row.status == "completed":
+                SINGLE_FLIGHT_CALLS.labels(self.name, operation, "shared").inc()
+                return row.result
+            await asyncio.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL_SECONDS)
+
+    async def _lead(
+        self, result_key: str, claimed_at: datetime.datetime, fn: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Run the call under a claim, then publish its result or release the claim."""
+        from app.db.session import engine
+        from app.models import SingleFlightResult
+
+        table = SingleFlightResult.__table__
+        ours = and_(
+            table.c.key == result_key,
+            table.c.status == "in_progress",
+            table.c.created_at == claimed_at,
+        )
+        try:
+            result = await fn()
+        except BaseException:
+            # Waiters in other workers claim the key and run the call themselves.
+            async with engine.begin() as conn:
+                await conn.execute(delete(table).where(ours))
+            raise
+
+        now = datetime.datetime.utcnow()
+        fresh_after = now - datetime.timedelta(
+            seconds=settings.SINGLE_FLIGHT_RESULT_TTL_SECONDS
+        )
+        async with engine.begin() as conn:
+            await conn.execute(
+                delete(table).where(
+                    table.c.status == "completed", table.c.created_at < fresh_after
+                )
+            )
+            await conn.execute(
+                update(table).where(ours).values(status="completed", result=result, created_at=now)
+            )
+        return result
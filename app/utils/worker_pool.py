@@ -0,0 +1,37 @@
+import asyncio
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Lazily create the shared process pool used for CPU-bound media work
+    (image decoding/resizing, audio transcoding, ...).
+    """
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=settings.WORKER_POOL_SIZE)
+    return _process_pool
+
+
+async def run_in_process_pool(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a picklable, CPU-bound function in the shared process pool without
+    blocking the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_process_pool(), functools.partial(fn, *args, **kwargs)
+    )
+
+
+def shutdown_worker_pools() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
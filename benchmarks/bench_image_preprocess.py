@@ -0,0 +1,66 @@
+"""
+Per-image processing time of the vision preprocessing pipeline.
+
+Usage:
+    python -m benchmarks.bench_image_preprocess [image ...] [--runs N]
+
+Without image paths a synthetic 12 MP "phone photo" (4032x3024, noisy, with
+an EXIF orientation tag) is generated so the benchmark runs offline.
+"""
+
+import argparse
+import io
+import statistics
+import time
+
+from PIL import Image
+
+from app.services.image_preprocess import preprocess_image
+
+
+def synthetic_photo(width: int = 4032, height: int = 3024) -> bytes:
+    img = Image.effect_noise((width, height), 64).convert("RGB")
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 CW
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=92, exif=exif)
+    return out.getvalue()
+
+
+def bench(name: str, file_bytes: bytes, runs: int) -> dict:
+    timings = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = preprocess_image(file_bytes)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    return {
+        "image": name,
+        "runs": runs,
+        "mean_ms": round(statistics.mean(timings), 2),
+        "p50_ms": round(timings[len(timings) // 2], 2),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+        "bytes_in": len(file_bytes),
+        "bytes_out": len(result.data),
+        "size_out": f"{result.width}x{result.height}",
+        "detail": result.detail,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("images", nargs="*")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    inputs = [(path, open(path, "rb").read()) for path in args.images] or [
+        ("synthetic-12mp.jpg", synthetic_photo())
+    ]
+    for name, file_bytes in inputs:
+        print(bench(name, file_bytes, args.runs))
+
+
+if __name__ == "__main__":
+    main()
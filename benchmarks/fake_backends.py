@@ -0,0 +1,261 @@
+"""
+Offline stand-ins for every external backend the API talks to.
+
+- OpenAI: chat completions (text + vision, optionally streamed) and TTS.
+- AWS Transcribe / Textract: the JSON-protocol operations the app uses.
+- S3: a moto server.
+
+Each fake adds a configurable latency (mean + uniform jitter) so benchmark
+runs can model slow or degraded dependencies.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from aiohttp import web
+
+
+@dataclass
+class Latency:
+    mean: float = 0.0
+    jitter: float = 0.0
+    # Partial outage: this fraction of calls stalls for `stall` extra seconds.
+    stall_rate: float = 0.0
+    stall: float = 0.0
+
+    async def sleep(self) -> None:
+        delay = self.mean + random.uniform(-self.jitter, self.jitter)
+        if self.stall_rate and random.random() < self.stall_rate:
+            delay += self.stall
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+@dataclass
+class LatencyProfile:
+    chat: Latency = field(default_factory=lambda: Latency(0.3, 0.1))
+    vision: Latency = field(default_factory=lambda: Latency(1.0, 0.3))
+    tts: Latency = field(default_factory=lambda: Latency(0.5, 0.1))
+    # Time until a Transcribe job reports COMPLETED.
+    transcribe: Latency = field(default_factory=lambda: Latency(1.0, 0.2))
+    textract: Latency = field(default_factory=lambda: Latency(0.8, 0.2))
+    # Fraction of OpenAI chat/vision calls answered with a 500.
+    openai_error_rate: float = 0.0
+
+
+# TTS output per response_format: leading bytes, content type, bytes per second
+SPEECH_FORMATS = {
+    "mp3": (b"\xff\xf3", "audio/mpeg", 6000),  # 48 kbps
+    "opus": (b"OggS", "audio/ogg", 4000),  # 32 kbps
+    "aac": (b"\xff\xf1", "audio/aac", 6000),
+    "flac": (b"fLaC", "audio/flac", 30000),
+    "wav": (b"RIFF", "audio/wav", 48000),
+    "pcm": (b"", "audio/pcm", 48000),  # 24 kHz, 16-bit, mono
+}
+
+
+def _completion(content: str, prompt_tokens: int) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "fake",
+        "choices": [
+            {
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(content.split()),
+            "total_tokens": prompt_tokens + len(content.split()),
+        },
+    }
+
+
+class FakeBackends:
+    """Runs the fake OpenAI/AWS HTTP server and a moto S3 server in background threads."""
+
+    REPLY = (
+        "India's position reflects strategic autonomy, balancing economic "
+        "interests with long-standing regional partnerships."
+    )
+
+    def __init__(self, profile: LatencyProfile, host: str = "127.0.0.1"):
+        self.profile = profile
+        self.host = host
+        self.port = None
+        self.s3_port = None
+        self._jobs: dict[str, float] = {}
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._moto = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def s3_url(self) -> str:
+        return f"http://{self.host}:{self.s3_port}"
+
+    # ----- OpenAI -----
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        messages = body.get("messages", [])
+        is_vision = any(isinstance(m.get("content"), list) for m in messages)
+        await (self.profile.vision if is_vision else self.profile.chat).sleep()
+        if random.random() < self.profile.openai_error_rate:
+            return web.json_response(
+                {"error": {"message": "injected failure", "type": "server_error"}},
+                status=500,
+            )
+
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+        if not body.get("stream"):
+            return web.json_response(_completion(self.REPLY, prompt_tokens))
+
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+        for word in self.REPLY.split(" "):
+            chunk = {
+                "id": chunk_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": "fake",
+                "choices": [
+                    {"index": 0, "delta": {"content": word + " "}, "finish_reason": None}
+                ],
+            }
+            await resp.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await resp.write(b"data: [DONE]\n\n")
+        await resp.write_eof()
+        return resp
+
+    async def speech(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        await self.profile.tts.sleep()
+        # About 15 characters of speech per second, at the bitrate the TTS
+        # API encodes each format with.
+        audio_format = body.get("response_format", "mp3")
+        header, content_type, bytes_per_second = SPEECH_FORMATS[audio_format]
+        seconds = max(1.0, len(body.get("input", "")) / 15)
+        size = int(seconds * bytes_per_second)
+        return web.Response(body=header + random.randbytes(size), content_type=content_type)
+
+    # ----- AWS JSON protocol (Transcribe, Textract) -----
+    async def aws(self, request: web.Request) -> web.Response:
+        target = request.headers.get("X-Amz-Target", "")
+        body = await request.json()
+        operation = target.split(".")[-1]
+
+        if operation == "StartTranscriptionJob":
+            name = body["TranscriptionJobName"]
+            self._jobs[name] = time.monotonic() + max(0.0, self.profile.transcribe.mean)
+            return web.json_response({"TranscriptionJob": self._job(name)})
+        if operation == "GetTranscriptionJob":
+            name = body["TranscriptionJobName"]
+            if name not in self._jobs:
+                return self._aws_error("NotFoundException", "Job not found")
+            return web.json_response({"TranscriptionJob": self._job(name)})
+        if operation == "DeleteTranscriptionJob":
+            if self._jobs.pop(body["TranscriptionJobName"], None) is None:
+                return self._aws_error("NotFoundException", "Job not found")
+            return web.json_response({})
+        if operation == "DetectDocumentText":
+            await self.profile.textract.sleep()
+            lines = [
+                {"BlockType": "LINE", "Text": f"Scanned line {i}"} for i in range(40)
+            ]
+            return web.json_response(
+                {"DocumentMetadata": {"Pages": 1}, "Blocks": lines}
+            )
+        return self._aws_error("UnknownOperationException", target)
+
+    def _job(self, name: str) -> dict:
+        done = time.monotonic() >= self._jobs[name]
+        job = {
+            "TranscriptionJobName": name,
+            "TranscriptionJobStatus": "COMPLETED" if done else "IN_PROGRESS",
+        }
+        if done:
+            job["Transcript"] = {
+                "TranscriptFileUri": f"{self.base_url}/transcripts/{name}.json"
+            }
+        return job
+
+    @staticmethod
+    def _aws_error(code: str, message: str) -> web.Response:
+        return web.json_response({"__type": code, "message": message}, status=400)
+
+    async def transcript(self, request: web.Request) -> web.Response:
+        words = "what is india's stance on the indo pacific".split()
+        return web.json_response(
+            {
+                "jobName": request.match_info["name"],
+                "results": {
+                    "language_codes": [{"language_code": "en-IN", "duration_in_seconds": 3.0}],
+                    "transcripts": [{"transcript": " ".join(words)}],
+                    "items": [
+                        {
+                            "type": "pronunciation",
+                            "alternatives": [{"content": w, "confidence": "0.99"}],
+                        }
+                        for w in words
+                    ],
+                },
+            }
+        )
+
+    # ----- lifecycle -----
+    def _make_app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024**2)
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_post("/v1/audio/speech", self.speech)
+        app.router.add_get("/transcripts/{name}.json", self.transcript)
+        app.router.add_post("/", self.aws)
+        return app
+
+    def start(self) -> "FakeBackends":
+        from moto.server import ThreadedMotoServer
+
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        self._moto = ThreadedMotoServer(ip_address=self.host, port=0, verbose=False)
+        self._moto.start()
+        self.s3_port = self._moto.get_host_and_port()[1]
+
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._runner = web.AppRunner(self._make_app(), access_log=None)
+            self._loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, self.host, 0)
+            self._loop.run_until_complete(site.start())
+            self.port = site._server.sockets[0].getsockname()[1]
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="fake-backends", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop(self) -> None:
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+        if self._moto is not None:
+            self._moto.stop()
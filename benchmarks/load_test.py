@@ -0,0 +1,467 @@
+"""
+Offline load test for the API.
+
+Boots the FastAPI app with uvicorn against SQLite (default) or a local
+Postgres, a moto S3 server and fake OpenAI/Transcribe/Textract backends
+(see `fake_backends.py`). It then drives a weighted mix of `/chat` and
+`/multimodal/chat` traffic and reports throughput, p50/p95/p99 latency per
+scenario and event-loop lag inside the server.
+
+Usage:
+    python -m benchmarks.load_test --duration 30 --concurrency 20
+    python -m benchmarks.load_test --mix chat=5,image=1 --chat-latency 0.5
+    python -m benchmarks.load_test --save-baseline benchmarks/baselines/default.json
+    python -m benchmarks.load_test --compare benchmarks/baselines/default.json
+
+With `--compare`, the exit code is 1 when any tracked number regresses by more
+than `--tolerance`.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.fake_backends import FakeBackends, Latency, LatencyProfile
+
+DEFAULT_MIX = {
+    "chat": 40,
+    "history": 20,
+    "multimodal_text": 10,
+    "image": 10,
+    "pdf": 8,
+    "scanned_pdf": 2,
+    "audio": 10,
+}
+
+BUCKET = "bench-bucket"
+
+
+# ----- payloads -----
+def make_pdf(text: str | None) -> bytes:
+    """Minimal single-page PDF; without text it looks "scanned" and hits Textract."""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode() if text else b""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(
+        b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+        % (len(objects) + 1, xref)
+    )
+    return out.getvalue()
+
+
+def make_image(width: int, height: int) -> bytes:
+    from PIL import Image
+
+    out = io.BytesIO()
+    Image.effect_noise((width, height), 48).convert("RGB").save(
+        out, format="JPEG", quality=90
+    )
+    return out.getvalue()
+
+
+def make_payloads(image_size: tuple[int, int]) -> dict[str, tuple[str, bytes, str]]:
+    return {
+        "image": ("photo.jpg", make_image(*image_size), "image/jpeg"),
+        "pdf": (
+            "brief.pdf",
+            make_pdf("India and the Quad: a short policy brief " * 3),
+            "application/pdf",
+        ),
+        "scanned_pdf": ("scan.pdf", make_pdf(None), "application/pdf"),
+        "audio": ("note.mp3", b"ID3\x03\x00\x00\x00\x00\x00\x00" + random.randbytes(48_000), "audio/mpeg"),
+    }
+
+
+# ----- server side -----
+class LagMonitor:
+    """
+    ASGI wrapper that samples event-loop lag inside the server process:
+    how late a periodic `sleep(interval)` wakes up.
+    """
+
+    def __init__(self, app, interval: float = 0.01):
+        self.app = app
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task = None
+
+    async def _monitor(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval) * 1000)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan" and self._task is None:
+            self._task = asyncio.create_task(self._monitor())
+        await self.app(scope, receive, send)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def configure_environment(args, fakes: FakeBackends, workdir: str) -> None:
+    database_url = args.database_url or f"sqlite+aiosqlite:///{workdir}/bench.db"
+    os.environ.update(
+        {
+            "DATABASE_URL": database_url,
+            "JWT_SECRET_KEY": "bench-secret",
+            "OPENAI_API_KEY": "sk-bench",
+            "OPENAI_BASE_URL": f"{fakes.base_url}/v1",
+            "OPENAI_REQUESTS_PER_MINUTE": "1000000",
+            "AWS_ACCESS_KEY_ID": "testing",
+            "AWS_SECRET_ACCESS_KEY": "testing",
+            "AWS_S3_BUCKET_NAME": BUCKET,
+            "AWS_S3_REGION": "us-east-1",
+            "AWS_ENDPOINT_URL_S3": fakes.s3_url,
+            "AWS_ENDPOINT_URL_TRANSCRIBE": fakes.base_url,
+            "AWS_ENDPOINT_URL_TEXTRACT": fakes.base_url,
+            "TRANSCRIBE_POLL_INTERVAL_SECONDS": "0.2",
+            "TRACING_EXPORTER": "none",
+            # Virtual users send back to back; only the worker limits apply.
+            "USER_RATE_PER_SECOND": "1000",
+        }
+    )
+
+
+def prepare_storage() -> None:
+    import boto3
+    from sqlalchemy import Computed, event
+    from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.ext.compiler import compiles
+
+    boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+
+    @compiles(JSONB, "sqlite")
+    def _jsonb_sqlite(type_, compiler, **kw):
+        return "JSON"
+
+    # SQLite has no full-text search types; the search columns become plain,
+    # always-NULL columns there (search itself needs Postgres).
+    @compiles(TSVECTOR, "sqlite")
+    def _tsvector_sqlite(type_, compiler, **kw):
+        return "TEXT"
+
+    @compiles(Computed, "sqlite")
+    def _computed_sqlite(element, compiler, **kw):
+        return ""
+
+    import app.models  # noqa: F401 - register tables
+    from app.db.base import Base
+    from app.db.session import engine as app_engine
+
+    if app_engine.dialect.name == "sqlite":
+        # Session deletion relies on ON DELETE CASCADE, which SQLite only
+        # enforces when asked to.
+        @event.listens_for(app_engine.sync_engine, "connect")
+        def _sqlite_foreign_keys(dbapi_connection, _):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.close()
+
+    async def create_schema():
+        engine = create_async_engine(os.environ["DATABASE_URL"])
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await engine.dispose()
+
+    asyncio.run(create_schema())
+
+
+def start_server(port: int):
+    import uvicorn
+
+    from app.main import app
+
+    monitored = LagMonitor(app)
+    server = uvicorn.Server(
+        uvicorn.Config(monitored, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, name="api-server", daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, monitored
+
+
+# ----- load generation -----
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, payloads: dict):
+        self.client = client
+        self.payloads = payloads
+        self.headers = {}
+        self.session_id = None
+
+    async def setup(self) -> None:
+        email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+        resp = await self.client.post(
+            "/api/v1/auth/register", json={"email": email, "password": "bench-pass"}
+        )
+        resp.raise_for_status()
+        resp = await self.client.post(
+            "/api/v1/auth/login", data={"username": email, "password": "bench-pass"}
+        )
+        resp.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+        resp = await self.client.post(
+            "/api/v1/chat/sessions", json={"title": "bench"}, headers=self.headers
+        )
+        resp.raise_for_status()
+        self.session_id = resp.json()["id"]
+
+    async def run(self, scenario: str) -> httpx.Response:
+        base = f"/api/v1/chat/sessions/{self.session_id}"
+        if scenario == "chat":
+            return await self.client.post(
+                f"{base}/messages",
+                json={"content": "How does India view the Indo-Pacific?"},
+                headers=self.headers,
+            )
+        if scenario == "history":
+            return await self.client.get(f"{base}/messages", headers=self.headers)
+
+        data = {"session_id": self.session_id, "prompt": "Summarise this for me"}
+        files = None
+        if scenario in self.payloads:
+            files = {"file": self.payloads[scenario]}
+        return await self.client.post(
+            "/api/v1/multimodal/chat", data=data, files=files, headers=self.headers
+        )
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return round(ordered[index], 2)
+
+
+def summarize(values: list[float]) -> dict:
+    return {
+        "count": len(values),
+        "mean": round(statistics.mean(values), 2) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": round(max(values), 2) if values else 0.0,
+    }
+
+
+async def drive_load(args, port: int, payloads: dict) -> dict:
+    mix = args.mix
+    scenarios, weights = zip(*mix.items())
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{port}", timeout=args.request_timeout, limits=limits
+    ) as client:
+        users = [VirtualUser(client, payloads) for _ in range(args.concurrency)]
+        await asyncio.gather(*(u.setup() for u in users))
+
+        deadline = time.perf_counter() + args.duration
+        started = time.perf_counter()
+
+        async def loop(user: VirtualUser):
+            while time.perf_counter() < deadline:
+                scenario = random.choices(scenarios, weights)[0]
+                start = time.perf_counter()
+                try:
+                    resp = await user.run(scenario)
+                    ok = resp.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                elapsed = (time.perf_counter() - start) * 1000
+                if ok:
+                    latencies[scenario].append(elapsed)
+                else:
+                    errors[scenario] += 1
+
+        await asyncio.gather(*(loop(u) for u in users))
+        wall = time.perf_counter() - started
+
+    completed = sum(len(v) for v in latencies.values())
+    return {
+        "wall_seconds": round(wall, 2),
+        "requests": completed,
+        "errors": dict(errors),
+        "throughput_rps": round(completed / wall, 2),
+        "latency_ms": {
+            "all": summarize([x for v in latencies.values() for x in v]),
+            **{name: summarize(values) for name, values in sorted(latencies.items())},
+        },
+    }
+
+
+# ----- baselines -----
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return human-readable regressions (higher latency/lag, lower throughput)."""
+    regressions = []
+
+    def check(label, now, before, higher_is_worse=True):
+        if not before:
+            return
+        change = (now - before) / before
+        if (change > tolerance) if higher_is_worse else (change < -tolerance):
+            regressions.append(f"{label}: {before} -> {now} ({change:+.0%})")
+
+    check("throughput_rps", current["throughput_rps"], baseline["throughput_rps"], False)
+    for scenario, stats in current["latency_ms"].items():
+        before = baseline["latency_ms"].get(scenario)
+        if not before:
+            continue
+        for pct in ("p50", "p95", "p99"):
+            check(f"{scenario}.{pct}_ms", stats[pct], before[pct])
+    check(
+        "event_loop_lag.p99_ms",
+        current["event_loop_lag_ms"]["p99"],
+        baseline["event_loop_lag_ms"]["p99"],
+    )
+    return regressions
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown scenario: {name}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    parser.add_argument("--concurrency", type=int, default=10, help="virtual users")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--image-size", default="4032x3024")
+    for name, default in (
+        ("chat", 0.3),
+        ("vision", 1.0),
+        ("tts", 0.5),
+        ("transcribe", 1.0),
+        ("textract", 0.8),
+    ):
+        parser.add_argument(f"--{name}-latency", type=float, default=default)
+    parser.add_argument("--jitter", type=float, default=0.2, help="fraction of latency")
+    parser.add_argument(
+        "--stall-rate", type=float, default=0.0, help="fraction of backend calls that stall"
+    )
+    parser.add_argument("--stall-seconds", type=float, default=10.0)
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="fraction of OpenAI calls failing with 500"
+    )
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--save-baseline", help="write results as a baseline JSON")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    def latency(mean):
+        return Latency(mean, mean * args.jitter, args.stall_rate, args.stall_seconds)
+
+    profile = LatencyProfile(
+        chat=latency(args.chat_latency),
+        vision=latency(args.vision_latency),
+        tts=latency(args.tts_latency),
+        transcribe=latency(args.transcribe_latency),
+        textract=latency(args.textract_latency),
+        openai_error_rate=args.error_rate,
+    )
+
+    with tempfile.TemporaryDirectory(prefix="bharatlens-bench-") as workdir:
+        fakes = FakeBackends(profile).start()
+        configure_environment(args, fakes, workdir)
+        prepare_storage()
+
+        port = free_port()
+        server, thread, monitor = start_server(port)
+        width, height = (int(x) for x in args.image_size.split("x"))
+        try:
+            results = asyncio.run(drive_load(args, port, make_payloads((width, height))))
+        finally:
+            server.should_exit = True
+            thread.join()
+            fakes.stop()
+
+    results["event_loop_lag_ms"] = summarize(monitor.samples)
+    results["config"] = {
+        "duration": args.duration,
+        "concurrency": args.concurrency,
+        "mix": args.mix,
+        "database": "postgres" if args.database_url else "sqlite",
+        "latency_profile": {
+            "chat": args.chat_latency,
+            "vision": args.vision_latency,
+            "tts": args.tts_latency,
+            "transcribe": args.transcribe_latency,
+            "textract": args.textract_latency,
+            "jitter": args.jitter,
+            "stall_rate": args.stall_rate,
+            "stall_seconds": args.stall_seconds,
+            "error_rate": args.error_rate,
+        },
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+    }
+
+    print(json.dumps(results, indent=2))
+    for path in filter(None, (args.output, args.save_baseline)):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+        print("\nNo regressions against baseline.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
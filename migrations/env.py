@@ -12,6 +12,12 @@ import asyncio
 import app.models.user
 import app.models.chat_session
 import app.models.message
+import app.models.attachment
+import app.models.attachment_content
+import app.models.single_flight_result
+import app.models.idempotency_key
+import app.models.pending_s3_deletion
+import app.models.archived_media_key
 
 config = context.config
 fileConfig(config.config_file_name)
@@ -0,0 +1,42 @@
+"""Add single_flight_results table
+
+Revision ID: 3c1f2a7d9e40
+Revises: f5fcb6b173ec
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f2a7d9e40'
+down_revision: Union[str, Sequence[str], None] = 'f5fcb6b173ec'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'single_flight_results',
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('result', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('key'),
+    )
+    op.create_index(
+        op.f('ix_single_flight_results_created_at'),
+        'single_flight_results',
+        ['created_at'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_single_flight_results_created_at'), table_name='single_flight_results')
+    op.drop_table('single_flight_results')
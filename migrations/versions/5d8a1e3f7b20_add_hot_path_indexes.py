@@ -0,0 +1,75 @@
+"""Add indexes for the session list and history queries
+
+Revision ID: 5d8a1e3f7b20
+Revises: 7e2b9c41d5a8
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8a1e3f7b20'
+down_revision: Union[str, Sequence[str], None] = '7e2b9c41d5a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, columns)
+NEW_INDEXES = [
+    ('ix_messages_session_id_created_at', 'messages', ['session_id', 'created_at']),
+    ('ix_chat_sessions_user_id_created_at', 'chat_sessions', ['user_id', 'created_at']),
+    ('ix_attachments_message_id', 'attachments', ['message_id']),
+    ('ix_attachments_session_id', 'attachments', ['session_id']),
+]
+
+# Single-column indexes made redundant by the composite ones above.
+REPLACED_INDEXES = [
+    ('ix_messages_session_id', 'messages', ['session_id']),
+    ('ix_chat_sessions_user_id', 'chat_sessions', ['user_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction; building
+    # the indexes this way does not block writes to the tables.
+    with op.get_context().autocommit_block():
+        for name, table, columns in NEW_INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        for name, table, _ in REPLACED_INDEXES:
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in REPLACED_INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        for name, table, _ in NEW_INDEXES:
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
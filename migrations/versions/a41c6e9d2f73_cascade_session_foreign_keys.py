@@ -0,0 +1,74 @@
+"""Make session child foreign keys ON DELETE CASCADE
+
+Revision ID: a41c6e9d2f73
+Revises: 5d8a1e3f7b20
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41c6e9d2f73'
+down_revision: Union[str, Sequence[str], None] = '5d8a1e3f7b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, referenced table)
+FOREIGN_KEYS = [
+    ('chat_sessions', 'user_id', 'users'),
+    ('messages', 'session_id', 'chat_sessions'),
+    ('attachments', 'session_id', 'chat_sessions'),
+    ('attachments', 'message_id', 'messages'),
+]
+
+
+def _foreign_key_names(table: str, column: str, referenced: str) -> list[str]:
+    """Names of the existing foreign keys from table.column to referenced."""
+    rows = op.get_bind().execute(
+        sa.text(
+            "SELECT c.conname FROM pg_constraint c "
+            "JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = ANY (c.conkey) "
+            "WHERE c.contype = 'f' "
+            "AND c.conrelid = CAST(:table AS regclass) "
+            "AND c.confrelid = CAST(:referenced AS regclass) "
+            "AND cardinality(c.conkey) = 1 AND a.attname = :column"
+        ),
+        {"table": table, "referenced": referenced, "column": column},
+    )
+    return [name for (name,) in rows]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The tables predate the migration history, so make sure session
+    # deletion can rely on the database cascading to messages/attachments.
+    # Whatever the existing constraints are called, they are replaced.
+    for table, column, referenced in FOREIGN_KEYS:
+        name = f'{table}_{column}_fkey'
+        drops = ''.join(
+            f'DROP CONSTRAINT "{existing}", '
+            for existing in _foreign_key_names(table, column, referenced)
+        )
+        # NOT VALID: the ALTER only holds its ACCESS EXCLUSIVE lock briefly.
+        op.execute(
+            f'ALTER TABLE {table} {drops}'
+            f'ADD CONSTRAINT {name} FOREIGN KEY ({column}) '
+            f'REFERENCES {referenced} (id) ON DELETE CASCADE NOT VALID'
+        )
+
+    # Validating scans each table under a SHARE UPDATE EXCLUSIVE lock, which
+    # lets writes through, but only once the transaction holding the
+    # ALTERs' locks has committed.
+    with op.get_context().autocommit_block():
+        for table, column, _ in FOREIGN_KEYS:
+            op.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {table}_{column}_fkey')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The models have always declared ON DELETE CASCADE; nothing to undo.
+    pass
@@ -0,0 +1,49 @@
+"""Add archive columns to chat_sessions
+
+Revision ID: a7d3e9f1c245
+Revises: f3b7c2d9e514
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e9f1c245'
+down_revision: Union[str, Sequence[str], None] = 'f3b7c2d9e514'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable columns without defaults: metadata-only, no table rewrite.
+    op.add_column('chat_sessions', sa.Column('archived_at', sa.DateTime(), nullable=True))
+    op.add_column('chat_sessions', sa.Column('archive_key', sa.String(), nullable=True))
+    # Built without blocking writes; cannot run inside a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_chat_sessions_updated_at_hot',
+            'chat_sessions',
+            ['updated_at'],
+            unique=False,
+            postgresql_where=sa.text('archived_at IS NULL'),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_chat_sessions_updated_at_hot',
+            table_name='chat_sessions',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column('chat_sessions', 'archive_key')
+    op.drop_column('chat_sessions', 'archived_at')
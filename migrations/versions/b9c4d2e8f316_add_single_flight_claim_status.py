@@ -0,0 +1,33 @@
+"""Add status to single_flight_results
+
+Revision ID: b9c4d2e8f316
+Revises: a7d3e9f1c245
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9c4d2e8f316'
+down_revision: Union[str, Sequence[str], None] = 'a7d3e9f1c245'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows are published results.
+    op.add_column(
+        'single_flight_results',
+        sa.Column('status', sa.String(length=16), nullable=False, server_default='completed'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM single_flight_results WHERE status = 'in_progress'")
+    op.drop_column('single_flight_results', 'status')
@@ -0,0 +1,42 @@
+"""Add s3_gc_pending table
+
+Revision ID: c5e8a3f9d721
+Revises: b9c4d2e8f316
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e8a3f9d721'
+down_revision: Union[str, Sequence[str], None] = 'b9c4d2e8f316'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        's3_gc_pending',
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('retry_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('key'),
+    )
+    op.create_index(
+        op.f('ix_s3_gc_pending_retry_at'),
+        's3_gc_pending',
+        ['retry_at'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_s3_gc_pending_retry_at'), table_name='s3_gc_pending')
+    op.drop_table('s3_gc_pending')
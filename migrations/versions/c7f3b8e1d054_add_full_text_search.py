@@ -0,0 +1,89 @@
+"""Add full-text search vectors on messages and attachments
+
+Revision ID: c7f3b8e1d054
+Revises: a41c6e9d2f73
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7f3b8e1d054'
+down_revision: Union[str, Sequence[str], None] = 'a41c6e9d2f73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ATTACHMENT_SEARCH_TEXT = (
+    "left("
+    "coalesce(metadata_->>'document_text', '') || ' ' || "
+    "coalesce(metadata_->>'image_description', '') || ' ' || "
+    "coalesce(metadata_#>>'{transcription,results,transcripts,0,transcript}', ''), "
+    "100000)"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Adding a stored generated column rewrites the table; run this in a
+    # low-traffic window on large databases.
+    op.add_column(
+        'messages',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('english', coalesce(content, ''))", persisted=True),
+            nullable=True,
+        ),
+    )
+    op.add_column(
+        'attachments',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(f"to_tsvector('english', {ATTACHMENT_SEARCH_TEXT})", persisted=True),
+            nullable=True,
+        ),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messages_search_vector',
+            'messages',
+            ['search_vector'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_attachments_search_vector',
+            'attachments',
+            ['search_vector'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_attachments_search_vector',
+            table_name='attachments',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            'ix_messages_search_vector',
+            table_name='messages',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column('attachments', 'search_vector')
+    op.drop_column('messages', 'search_vector')
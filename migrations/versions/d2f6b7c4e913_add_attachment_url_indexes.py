@@ -0,0 +1,51 @@
+"""Add hash indexes on attachment URLs
+
+Revision ID: d2f6b7c4e913
+Revises: c5e8a3f9d721
+Create Date: 2026-10-20 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f6b7c4e913'
+down_revision: Union[str, Sequence[str], None] = 'c5e8a3f9d721'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, columns)
+NEW_INDEXES = [
+    ('ix_attachments_url', 'attachments', ['url']),
+    ('ix_attachments_audio_url', 'attachments', ['audio_url']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built without blocking writes; cannot run inside a transaction.
+    with op.get_context().autocommit_block():
+        for name, table, columns in NEW_INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_using='hash',
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in NEW_INDEXES:
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
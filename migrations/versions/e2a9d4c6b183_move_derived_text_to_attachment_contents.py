@@ -0,0 +1,132 @@
+"""Move derived attachment text into attachment_contents
+
+Revision ID: e2a9d4c6b183
+Revises: c7f3b8e1d054
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a9d4c6b183'
+down_revision: Union[str, Sequence[str], None] = 'c7f3b8e1d054'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ATTACHMENT_SEARCH_TEXT = (
+    "left("
+    "coalesce(metadata_->>'document_text', '') || ' ' || "
+    "coalesce(metadata_->>'image_description', '') || ' ' || "
+    "coalesce(metadata_#>>'{transcription,results,transcripts,0,transcript}', ''), "
+    "100000)"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'attachment_contents',
+        sa.Column('attachment_id', sa.UUID(), nullable=False),
+        sa.Column('kind', sa.String(length=32), nullable=False),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('raw', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('english', left(text, 100000))", persisted=True),
+            nullable=True,
+        ),
+        sa.ForeignKeyConstraint(['attachment_id'], ['attachments.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('attachment_id'),
+    )
+
+    # Backfill from the JSONB metadata. Audio keeps the full Transcribe JSON
+    # in `raw`, and the transcript text becomes the searchable text.
+    op.execute(
+        """
+        INSERT INTO attachment_contents (attachment_id, kind, text, raw, created_at)
+        SELECT id, kind, text, raw, created_at FROM (
+            SELECT id, 'document_text' AS kind, metadata_->>'document_text' AS text,
+                   NULL::jsonb AS raw, created_at
+            FROM attachments WHERE metadata_ ? 'document_text'
+            UNION ALL
+            SELECT id, 'image_description', metadata_->>'image_description',
+                   NULL::jsonb, created_at
+            FROM attachments WHERE metadata_ ? 'image_description'
+            UNION ALL
+            SELECT id, 'transcript',
+                   coalesce(metadata_#>>'{transcription,results,transcripts,0,transcript}', ''),
+                   metadata_->'transcription', created_at
+            FROM attachments WHERE metadata_ ? 'transcription'
+        ) derived
+        WHERE text IS NOT NULL
+        ON CONFLICT (attachment_id) DO NOTHING
+        """
+    )
+    op.execute(
+        """
+        UPDATE attachments a
+        SET metadata_ = (a.metadata_ - 'document_text' - 'image_description' - 'transcription')
+            || jsonb_build_object('content_kind', c.kind, 'content_chars', length(c.text))
+        FROM attachment_contents c
+        WHERE c.attachment_id = a.id
+        """
+    )
+    op.execute(
+        """
+        UPDATE attachments
+        SET metadata_ = metadata_ - 'document_text' - 'image_description' - 'transcription'
+        WHERE metadata_ ?| array['document_text', 'image_description', 'transcription']
+        """
+    )
+    op.create_index(
+        'ix_attachment_contents_search_vector',
+        'attachment_contents',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+    # Search now reads attachment_contents.search_vector.
+    op.drop_index('ix_attachments_search_vector', table_name='attachments', if_exists=True)
+    op.drop_column('attachments', 'search_vector')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        """
+        UPDATE attachments a
+        SET metadata_ = (coalesce(a.metadata_, '{}'::jsonb) - 'content_kind' - 'content_chars')
+            || CASE c.kind
+                 WHEN 'transcript' THEN jsonb_build_object('transcription', c.raw)
+                 ELSE jsonb_build_object(c.kind, c.text)
+               END
+        FROM attachment_contents c
+        WHERE c.attachment_id = a.id
+        """
+    )
+    op.add_column(
+        'attachments',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(f"to_tsvector('english', {ATTACHMENT_SEARCH_TEXT})", persisted=True),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        'ix_attachments_search_vector',
+        'attachments',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin',
+    )
+    op.drop_index('ix_attachment_contents_search_vector', table_name='attachment_contents')
+    op.drop_table('attachment_contents')
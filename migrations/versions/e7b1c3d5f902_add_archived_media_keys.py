@@ -0,0 +1,42 @@
+"""Add archived_media_keys table
+
+Revision ID: e7b1c3d5f902
+Revises: d2f6b7c4e913
+Create Date: 2026-10-21 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b1c3d5f902'
+down_revision: Union[str, Sequence[str], None] = 'd2f6b7c4e913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'archived_media_keys',
+        sa.Column('session_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['session_id'], ['chat_sessions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('session_id', 'key'),
+    )
+    op.create_index(
+        op.f('ix_archived_media_keys_key'),
+        'archived_media_keys',
+        ['key'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_archived_media_keys_key'), table_name='archived_media_keys')
+    op.drop_table('archived_media_keys')
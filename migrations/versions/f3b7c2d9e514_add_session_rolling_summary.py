@@ -0,0 +1,31 @@
+"""Add rolling summary columns to chat_sessions
+
+Revision ID: f3b7c2d9e514
+Revises: e2a9d4c6b183
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b7c2d9e514'
+down_revision: Union[str, Sequence[str], None] = 'e2a9d4c6b183'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable columns without defaults: metadata-only, no table rewrite.
+    op.add_column('chat_sessions', sa.Column('summary', sa.Text(), nullable=True))
+    op.add_column('chat_sessions', sa.Column('summarized_until', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('chat_sessions', 'summarized_until')
+    op.drop_column('chat_sessions', 'summary')
@@ -0,0 +1,35 @@
+"""
+Background summary compaction started from a request (no database: the
+compaction itself is replaced).
+"""
+import asyncio
+import uuid
+
+from app.core.config import settings
+from app.core.deadline import remaining, request_deadline
+from app.core.tracing import get_current_span, span
+from app.services import conversation
+
+
+def test_compaction_outlives_the_triggering_request(monkeypatch):
+    seen = {}
+
+    async def compact_session(session_id):
+        seen["budget"] = remaining()
+        seen["span"] = get_current_span()
+        await asyncio.sleep(0.2)
+        return True
+
+    monkeypatch.setattr(conversation, "compact_session", compact_session)
+
+    async def request():
+        with request_deadline(0.05), span("POST /chat/sessions/x/messages"):
+            return conversation.schedule_compaction(uuid.uuid4())
+
+    async def main():
+        task = await request()
+        return await task
+
+    assert asyncio.run(main()) is True
+    assert seen["budget"] > settings.MAX_REQUEST_TIMEOUT_SECONDS - 1
+    assert seen["span"] is None
@@ -0,0 +1,104 @@
+"""
+Response compression against the Starlette version pinned in uv.lock, at
+the ASGI level so each streamed chunk can be checked as it is sent.
+"""
+import asyncio
+import pathlib
+import re
+import zlib
+
+import pytest
+import starlette
+from starlette.responses import Response, StreamingResponse
+
+from app.core import compression
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
+
+LOCK = pathlib.Path(__file__).resolve().parent.parent / "uv.lock"
+CHUNK = b'{"type": "message", "content": "maritime security"}\n' * 100
+
+
+def _locked_version(package: str) -> str:
+    match = re.search(rf'name = "{package}"\nversion = "([^"]+)"', LOCK.read_text())
+    return match.group(1)
+
+
+def _run(response: Response, accept_encoding: str) -> list[dict]:
+    """Messages the middleware sends for `response`."""
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }
+    asyncio.run(CompressionMiddleware(response)(scope, receive, send))
+    return sent
+
+
+def _headers(messages: list[dict]) -> dict:
+    return {k.decode(): v.decode() for k, v in messages[0]["headers"]}
+
+
+def _bodies(messages: list[dict]) -> list[bytes]:
+    return [m["body"] for m in messages[1:] if m.get("body")]
+
+
+def _stream(media_type: str) -> StreamingResponse:
+    async def body():
+        for _ in range(3):
+            yield CHUNK
+
+    return StreamingResponse(body(), media_type=media_type)
+
+
+def test_runs_against_the_locked_starlette():
+    assert starlette.__version__ == _locked_version("starlette")
+
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli is not installed")
+def test_brotli_compresses_and_flushes_each_chunk():
+    brotli = compression.brotli
+    whole = _run(Response(CHUNK, media_type="application/json"), "gzip, br")
+    assert _headers(whole)["content-encoding"] == "br"
+    assert brotli.decompress(_bodies(whole)[0]) == CHUNK
+
+    streamed = _run(_stream("text/plain"), "br")
+    decoder = brotli.Decompressor()
+    # Every chunk decodes on arrival: nothing is held back until the end
+    # (the last, empty message only finishes the stream).
+    decoded = [decoder.process(body) for body in _bodies(streamed)]
+    assert [chunk for chunk in decoded if chunk] == [CHUNK] * 3
+
+
+def test_gzip_flushes_each_chunk():
+    streamed = _run(_stream("text/plain"), "gzip")
+    assert _headers(streamed)["content-encoding"] == "gzip"
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    decoded = [decoder.decompress(body) for body in _bodies(streamed)]
+    assert [chunk for chunk in decoded if chunk] == [CHUNK] * 3
+
+
+@pytest.mark.parametrize("accept_encoding", ["br", "gzip"])
+def test_ndjson_streams_and_media_are_sent_as_is(accept_encoding):
+    streamed = _run(_stream("application/x-ndjson"), accept_encoding)
+    assert "content-encoding" not in _headers(streamed)
+    assert _bodies(streamed) == [CHUNK] * 3
+
+    audio = _run(Response(CHUNK, media_type="audio/mpeg"), accept_encoding)
+    assert "content-encoding" not in _headers(audio)
+
+
+def test_small_bodies_are_sent_as_is():
+    small = b"x" * (settings.COMPRESSION_MINIMUM_SIZE - 1)
+    sent = _run(Response(small, media_type="application/json"), "br, gzip")
+    assert "content-encoding" not in _headers(sent)
+    assert _bodies(sent) == [small]
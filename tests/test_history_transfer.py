@@ -0,0 +1,224 @@
+"""
+NDJSON history export and import round trip, with batches far smaller than
+the history so cursor fetches and INSERT batches cross record boundaries.
+Needs Postgres (see tests/conftest.py).
+"""
+import asyncio
+import datetime
+import json
+import uuid
+
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import (
+    Attachment,
+    AttachmentContent,
+    ChatSession,
+    Message,
+    RoleEnum,
+    User,
+)
+from app.models.attachment import MediaType
+
+SOURCE_USER, TARGET_USER = 1, 2
+SESSIONS = 3
+MESSAGES = 25
+
+
+async def _seed(engine) -> None:
+    base = datetime.datetime(2025, 1, 1)
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(User.__table__),
+            [
+                {"id": user_id, "email": f"user{user_id}@example.com", "hashed_password": "x", "is_active": True}
+                for user_id in (SOURCE_USER, TARGET_USER)
+            ],
+        )
+        for s in range(SESSIONS):
+            session_id = uuid.uuid4()
+            started = base + datetime.timedelta(days=s)
+            await conn.execute(
+                insert(ChatSession.__table__),
+                [{"id": session_id, "user_id": SOURCE_USER, "title": f"s{s}", "created_at": started, "updated_at": started}],
+            )
+            message_ids = [uuid.uuid4() for _ in range(MESSAGES)]
+            await conn.execute(
+                insert(Message.__table__),
+                [
+                    {
+                        "id": message_id,
+                        "session_id": session_id,
+                        "role": RoleEnum.user if m % 2 == 0 else RoleEnum.assistant,
+                        "content": f"Session {s} message {m}",
+                        "created_at": started + datetime.timedelta(seconds=m),
+                    }
+                    for m, message_id in enumerate(message_ids)
+                ],
+            )
+            attachment_id = uuid.uuid4()
+            await conn.execute(
+                insert(Attachment.__table__),
+                [
+                    {
+                        "id": attachment_id,
+                        "session_id": session_id,
+                        "message_id": message_ids[0],
+                        "url": f"https://bucket.s3.amazonaws.com/uploads/{s}.pdf",
+                        "media_type": MediaType.document,
+                        "metadata_": {"filename": f"{s}.pdf"},
+                        "created_at": started,
+                    }
+                ],
+            )
+            await conn.execute(
+                insert(AttachmentContent.__table__),
+                [{"attachment_id": attachment_id, "kind": "document_text", "text": f"Brief {s}"}],
+            )
+    await engine.dispose()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def seeded(pg_engine):
+    asyncio.run(_seed(pg_engine()))
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    monkeypatch.setattr(settings, "HISTORY_BATCH_SIZE", 7)
+
+
+async def _count(engine, model) -> int:
+    async with AsyncSession(engine) as db:
+        return (await db.execute(select(func.count()).select_from(model))).scalar_one()
+
+
+def _export(with_client, user_id: int) -> bytes:
+    exported = {}
+
+    async def test(client, engine):
+        response = await client.get("/api/v1/chat/export")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        exported["body"] = response.content
+
+    with_client(test, user_id)
+    return exported["body"]
+
+
+def test_export_lists_each_session_before_its_records(with_client):
+    records = [json.loads(line) for line in _export(with_client, SOURCE_USER).splitlines()]
+
+    assert [r["type"] for r in records].count("session") == SESSIONS
+    assert [r["type"] for r in records].count("message") == SESSIONS * MESSAGES
+    seen = set()
+    for record in records:
+        if record["type"] == "session":
+            seen.add(record["id"])
+        elif record["type"] == "message":
+            assert record["session_id"] in seen
+            seen.add(record["id"])
+        else:
+            assert record["message_id"] in seen
+            assert record["content"]["kind"] == "document_text"
+
+
+def test_import_copies_history_into_another_account(with_client):
+    body = _export(with_client, SOURCE_USER)
+
+    async def test(client, engine):
+        messages_before = await _count(engine, Message)
+        response = await client.post("/api/v1/chat/import", content=body)
+        assert response.status_code == 200
+        assert response.json() == {
+            "sessions": SESSIONS,
+            "messages": SESSIONS * MESSAGES,
+            "attachments": SESSIONS,
+            "media_dropped": 0,
+        }
+        assert await _count(engine, Message) == messages_before + SESSIONS * MESSAGES
+
+        sessions = (await client.get("/api/v1/chat/sessions")).json()
+        assert sorted(s["title"] for s in sessions) == ["s0", "s1", "s2"]
+        first = next(s for s in sessions if s["title"] == "s0")
+        assert first["messages"][0]["content"] == "Session 0 message 0"
+        assert first["messages"][0]["attachments"][0]["metadata_"] == {"filename": "0.pdf"}
+
+    with_client(test, TARGET_USER)
+
+    # Imported rows get ids of their own: the source history is untouched.
+    assert _export(with_client, SOURCE_USER) == body
+
+
+def test_rejected_import_writes_nothing(with_client):
+    body = _export(with_client, SOURCE_USER).splitlines()
+    first_message = next(i for i, line in enumerate(body) if b'"message"' in line)
+
+    async def test(client, engine):
+        sessions_before = await _count(engine, ChatSession)
+
+        # A message before its session
+        reordered = b"\n".join(body[first_message:] + body[:first_message])
+        response = await client.post("/api/v1/chat/import", content=reordered)
+        assert response.status_code == 400
+
+        malformed = b"\n".join(body[:5] + [b'{"type": "message"}'])
+        response = await client.post("/api/v1/chat/import", content=malformed)
+        assert response.status_code == 400
+        assert response.json()["detail"].startswith("Line 6:")
+
+        assert await _count(engine, ChatSession) == sessions_before
+
+    with_client(test, TARGET_USER)
+
+
+def test_import_copies_owned_media_and_drops_the_rest(with_client, monkeypatch):
+    """With the export's URLs in our bucket, only their owner gets copies."""
+    monkeypatch.setattr(settings, "AWS_S3_BUCKET_NAME", "bucket")
+    copies = []
+
+    class FakeS3:
+        def copy_object(self, src_key, dst_key):
+            copies.append((src_key, dst_key))
+
+    monkeypatch.setattr("app.services.s3_storage.UploadToS3", FakeS3)
+    body = _export(with_client, SOURCE_USER)
+
+    def import_as(user_id: int, body: bytes) -> dict:
+        result = {}
+
+        async def test(client, engine):
+            response = await client.post("/api/v1/chat/import", content=body)
+            assert response.status_code == 200
+            result.update(response.json())
+            async with AsyncSession(engine) as db:
+                result["urls"] = set(
+                    (
+                        await db.execute(
+                            select(Attachment.url)
+                            .join(ChatSession, Attachment.session_id == ChatSession.id)
+                            .where(ChatSession.user_id == user_id)
+                        )
+                    ).scalars()
+                )
+
+        with_client(test, user_id)
+        return result
+
+    # Objects nobody attached to the importer's sessions (here, archive
+    # blobs) are not reachable through an import
+    forged = body.replace(b"/uploads/", b"/archive/")
+    other = import_as(TARGET_USER, forged)
+    assert other["media_dropped"] == SESSIONS
+    assert copies == []
+
+    # The owner's import points at fresh copies under their upload prefix
+    own = import_as(SOURCE_USER, body)
+    assert own["media_dropped"] == 0
+    assert sorted(src for src, _ in copies) == [f"uploads/{s}.pdf" for s in range(SESSIONS)]
+    for _, dst in copies:
+        assert dst.startswith(f"uploads/{SOURCE_USER}/")
+        assert f"https://bucket.s3.{settings.AWS_S3_REGION}.amazonaws.com/{dst}" in own["urls"]
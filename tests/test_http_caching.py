@@ -0,0 +1,128 @@
+"""
+Conditional GET and compression on the history endpoints, measured in bytes
+on the wire (`num_bytes_downloaded` counts the body as received, before
+decompression). Needs Postgres (see tests/conftest.py).
+"""
+import asyncio
+import datetime
+import uuid
+
+import pytest
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.message import add_messages, build_message
+from app.models import ChatSession, Message, RoleEnum, User
+
+USER_ID = 1
+MESSAGES = 200
+
+
+async def _seed(engine) -> uuid.UUID:
+    base = datetime.datetime(2025, 1, 1)
+    session_id = uuid.uuid4()
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(User.__table__),
+            [{"id": USER_ID, "email": "user@example.com", "hashed_password": "x", "is_active": True}],
+        )
+        await conn.execute(
+            insert(ChatSession.__table__),
+            [{"id": session_id, "user_id": USER_ID, "title": "s", "created_at": base, "updated_at": base}],
+        )
+        await conn.execute(
+            insert(Message.__table__),
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "session_id": session_id,
+                    "role": RoleEnum.user if m % 2 == 0 else RoleEnum.assistant,
+                    "content": f"Message {m} about India's foreign policy and regional trade.",
+                    "created_at": base + datetime.timedelta(seconds=m),
+                }
+                for m in range(MESSAGES)
+            ],
+        )
+    await engine.dispose()
+    return session_id
+
+
+@pytest.fixture(scope="module")
+def session_id(pg_engine):
+    return asyncio.run(_seed(pg_engine()))
+
+
+def _capture(engine) -> list[str]:
+    """SQL statements `engine` executes from now on."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    return statements
+
+
+def test_unchanged_history_answers_304_without_loading_messages(session_id, with_client):
+    async def test(client, engine):
+        statements = _capture(engine)
+        url = f"/api/v1/chat/sessions/{session_id}/messages"
+        full = await client.get(url, headers={"Accept-Encoding": "identity"})
+        assert full.status_code == 200
+        assert len(full.json()) == MESSAGES
+        etag = full.headers["etag"]
+
+        statements.clear()
+        cached = await client.get(url, headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.num_bytes_downloaded == 0
+        assert cached.headers["etag"] == etag
+        assert not [s for s in statements if "FROM messages" in s]
+
+        since = await client.get(url, headers={"If-Modified-Since": full.headers["last-modified"]})
+        assert since.status_code == 304
+
+    with_client(test)
+
+
+def test_new_message_changes_etags(session_id, with_client):
+    async def test(client, engine):
+        messages_url = f"/api/v1/chat/sessions/{session_id}/messages"
+        before = await client.get(messages_url)
+        sessions_before = await client.get("/api/v1/chat/sessions")
+
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            await add_messages(db, [build_message(session_id, RoleEnum.user, "one more")])
+
+        after = await client.get(messages_url, headers={"If-None-Match": before.headers["etag"]})
+        assert after.status_code == 200
+        assert after.headers["etag"] != before.headers["etag"]
+        assert after.json()[-1]["content"] == "one more"
+
+        sessions_after = await client.get(
+            "/api/v1/chat/sessions", headers={"If-None-Match": sessions_before.headers["etag"]}
+        )
+        assert sessions_after.status_code == 200
+        assert sessions_after.headers["etag"] != sessions_before.headers["etag"]
+
+        unchanged = await client.get(
+            "/api/v1/chat/sessions", headers={"If-None-Match": sessions_after.headers["etag"]}
+        )
+        assert unchanged.status_code == 304
+
+    with_client(test)
+
+
+def test_large_history_is_compressed(session_id, with_client):
+    async def test(client, engine):
+        url = f"/api/v1/chat/sessions/{session_id}/messages"
+        plain = await client.get(url, headers={"Accept-Encoding": "identity"})
+        gzipped = await client.get(url, headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in plain.headers
+        assert gzipped.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in gzipped.headers["vary"]
+        assert gzipped.json() == plain.json()
+        assert gzipped.num_bytes_downloaded * 5 < plain.num_bytes_downloaded
+
+    with_client(test)
@@ -0,0 +1,89 @@
+"""
+Idempotency-Key claims racing between two requests, each with its own
+database session like two concurrent requests in the app. Needs Postgres
+(see tests/conftest.py).
+"""
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.idempotency import IdempotentRequest
+from app.core.config import settings
+from app.crud.user import get_user
+from app.models import User
+
+USER_ID = 1
+
+
+async def _seed(engine) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(User.__table__),
+            [{"id": USER_ID, "email": "user@example.com", "hashed_password": "x", "is_active": True}],
+        )
+    await engine.dispose()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def seeded(pg_engine):
+    asyncio.run(_seed(pg_engine()))
+
+
+@pytest.fixture(autouse=True)
+def short_wait(monkeypatch):
+    monkeypatch.setattr(settings, "IDEMPOTENCY_WAIT_SECONDS", 5.0)
+
+
+async def _race(engine, first_fails: bool):
+    """
+    Run a duplicate while the first request holds the key, end the first
+    request, and return the duplicate's guard, its user and whether its
+    session sat in a transaction while waiting.
+    """
+    key = uuid.uuid4().hex
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as first_db, AsyncSession(
+            engine, expire_on_commit=False
+        ) as second_db:
+            first = IdempotentRequest(first_db, USER_ID, key, "send_message", "fp")
+            await first.__aenter__()
+
+            # Loaded through the request's session, like get_current_user
+            current_user = await get_user(second_db, USER_ID)
+            second = IdempotentRequest(second_db, USER_ID, key, "send_message", "fp")
+            waiting = asyncio.create_task(second.__aenter__())
+            await asyncio.sleep(0.3)
+            idle_in_transaction = second_db.in_transaction()
+
+            if first_fails:
+                await first.__aexit__(RuntimeError, RuntimeError("boom"), None)
+            else:
+                first.save({"ok": True})
+                await first.__aexit__(None, None, None)
+            await waiting
+            user_id = current_user.id
+            await second.__aexit__(None, None, None)
+            return second, user_id, idle_in_transaction
+    finally:
+        await engine.dispose()
+
+
+def test_duplicate_reclaims_a_released_key(pg_engine):
+    second, user_id, idle_in_transaction = asyncio.run(_race(pg_engine(), first_fails=True))
+
+    assert second.replay is None
+    # Claim conflicts must not expire the request's objects
+    assert user_id == USER_ID
+    assert not idle_in_transaction
+
+
+def test_duplicate_replays_the_first_response(pg_engine):
+    second, user_id, idle_in_transaction = asyncio.run(_race(pg_engine(), first_fails=False))
+
+    assert second.replay is not None
+    assert second.replay.body == b'{"ok":true}'
+    assert user_id == USER_ID
+    assert not idle_in_transaction
@@ -0,0 +1,190 @@
+"""
+Query-plan regression tests for the hot read paths.
+
+Each CRUD call is run against a seeded Postgres database while its SQL is
+captured; every captured statement is then EXPLAINed and the test fails if
+the planner falls back to a sequential scan on one of the app tables. This
+catches a dropped index or an accidental unindexed filter before it reaches
+production.
+
+Needs Postgres (see tests/conftest.py).
+"""
+import asyncio
+import datetime
+import json
+import uuid
+
+import pytest
+from sqlalchemy import event, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import message as message_crud
+from app.crud import search as search_crud
+from app.crud import session as session_crud
+from app.crud import user as user_crud
+from app.models import Attachment, ChatSession, Message, RoleEnum, User
+from app.models.attachment import MediaType
+
+APP_TABLES = {"users", "chat_sessions", "messages", "attachments"}
+
+# Large enough that the planner prefers an index over scanning a table
+# that fits in a handful of pages.
+USERS = 2000
+SESSIONS_PER_USER = 5
+MESSAGES_PER_SESSION = 8
+ATTACHMENT_EVERY = 8
+BATCH = 5000
+
+
+async def _insert(conn, table, rows):
+    for start in range(0, len(rows), BATCH):
+        await conn.execute(insert(table), rows[start:start + BATCH])
+
+
+async def _seed(engine) -> dict:
+    base = datetime.datetime(2025, 1, 1)
+    users, sessions, messages, attachments = [], [], [], []
+    for u in range(1, USERS + 1):
+        users.append(
+            {
+                "id": u,
+                "email": f"user{u}@example.com",
+                "hashed_password": "x",
+                "is_active": True,
+                "is_superuser": False,
+                "created_at": base,
+            }
+        )
+        for s in range(SESSIONS_PER_USER):
+            session_id = uuid.uuid4()
+            sessions.append(
+                {
+                    "id": session_id,
+                    "user_id": u,
+                    "title": f"session {s}",
+                    "created_at": base + datetime.timedelta(minutes=len(sessions)),
+                    "updated_at": base,
+                }
+            )
+            for m in range(MESSAGES_PER_SESSION):
+                message_id = uuid.uuid4()
+                messages.append(
+                    {
+                        "id": message_id,
+                        "session_id": session_id,
+                        "role": RoleEnum.user if m % 2 == 0 else RoleEnum.assistant,
+                        "content": f"message {m}",
+                        "created_at": base + datetime.timedelta(seconds=len(messages)),
+                    }
+                )
+                if len(messages) % ATTACHMENT_EVERY == 0:
+                    attachments.append(
+                        {
+                            "id": uuid.uuid4(),
+                            "session_id": session_id,
+                            "message_id": message_id,
+                            "url": f"https://example.com/{message_id}.png",
+                            "media_type": MediaType.image,
+                            "created_at": base,
+                        }
+                    )
+
+    async with engine.begin() as conn:
+        await _insert(conn, User.__table__, users)
+        await _insert(conn, ChatSession.__table__, sessions)
+        await _insert(conn, Message.__table__, messages)
+        await _insert(conn, Attachment.__table__, attachments)
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("ANALYZE"))
+    await engine.dispose()
+
+    # Pick a user in the middle of the data so nothing lines up with the
+    # start or end of a table.
+    sample = sessions[len(sessions) // 2]
+    return {
+        "user_id": sample["user_id"],
+        "email": f"user{sample['user_id']}@example.com",
+        "session_id": sample["id"],
+    }
+
+
+@pytest.fixture(scope="module")
+def seeded(pg_engine):
+    return asyncio.run(_seed(pg_engine()))
+
+
+def _seq_scans(node: dict) -> list[str]:
+    found = []
+    if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in APP_TABLES:
+        found.append(node["Relation Name"])
+    for child in node.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+async def _explain_crud_call(engine, call, ids: dict) -> list[tuple[str, list[str]]]:
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        await call(db, ids)
+    event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    plans = []
+    async with engine.connect() as conn:
+        for statement, parameters in captured:
+            result = await conn.exec_driver_sql(
+                "EXPLAIN (FORMAT JSON) " + statement, parameters
+            )
+            plan = result.scalar()
+            if isinstance(plan, (str, bytes)):
+                plan = json.loads(plan)
+            plans.append((statement, _seq_scans(plan[0]["Plan"])))
+    await engine.dispose()
+    assert captured, "the CRUD call did not issue any SELECT"
+    return plans
+
+
+HOT_PATHS = {
+    "get_user": lambda db, ids: user_crud.get_user(db, ids["user_id"]),
+    "get_user_by_email": lambda db, ids: user_crud.get_user_by_email(db, ids["email"]),
+    "get_chat_session": lambda db, ids: session_crud.get_chat_session(db, ids["session_id"]),
+    "list_sessions_with_messages": lambda db, ids: session_crud.list_sessions_with_messages(
+        db, ids["user_id"]
+    ),
+    "get_messages_by_session": lambda db, ids: message_crud.get_messages_by_session(
+        db, ids["session_id"]
+    ),
+    "get_messages_after_summary": lambda db, ids: message_crud.get_messages_by_session(
+        db, ids["session_id"], after=datetime.datetime(2000, 1, 1)
+    ),
+    "get_session_summary": lambda db, ids: session_crud.get_session_summary(
+        db, ids["session_id"]
+    ),
+    "get_session_version": lambda db, ids: session_crud.get_session_version(
+        db, ids["session_id"]
+    ),
+    "get_sessions_version": lambda db, ids: session_crud.get_sessions_version(
+        db, ids["user_id"]
+    ),
+    "get_messages_with_attachments": lambda db, ids: message_crud.get_messages_with_attachments(
+        db, ids["session_id"]
+    ),
+    "search_messages": lambda db, ids: search_crud.search_messages(
+        db, ids["user_id"], "message", limit=20, offset=0
+    ),
+}
+
+
+@pytest.mark.parametrize("name", sorted(HOT_PATHS))
+def test_hot_path_uses_indexes(pg_engine, seeded, name):
+    plans = asyncio.run(_explain_crud_call(pg_engine(), HOT_PATHS[name], seeded))
+    offenders = [(stmt, tables) for stmt, tables in plans if tables]
+    assert not offenders, "\n\n".join(
+        f"Seq Scan on {', '.join(tables)}:\n{stmt}" for stmt, tables in offenders
+    )
@@ -0,0 +1,93 @@
+"""
+Paging through full-text search results. Needs Postgres (see
+tests/conftest.py).
+"""
+import asyncio
+import datetime
+import uuid
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.search import search_messages
+from app.models import Attachment, AttachmentContent, ChatSession, Message, RoleEnum, User
+from app.models.attachment import MediaType
+
+USER_ID = 1
+TEXT = "harbour patrol report"
+ATTACHMENTS = 4
+
+
+async def _seed(engine) -> None:
+    now = datetime.datetime(2025, 1, 1)
+    session_id, message_id = uuid.uuid4(), uuid.uuid4()
+    attachment_ids = [uuid.uuid4() for _ in range(ATTACHMENTS)]
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(User.__table__),
+            [{"id": USER_ID, "email": "a@example.com", "hashed_password": "x", "created_at": now}],
+        )
+        await conn.execute(
+            insert(ChatSession.__table__),
+            [{"id": session_id, "user_id": USER_ID, "created_at": now, "updated_at": now}],
+        )
+        await conn.execute(
+            insert(Message.__table__),
+            [
+                {
+                    "id": message_id,
+                    "session_id": session_id,
+                    "role": RoleEnum.user,
+                    "content": TEXT,
+                    "created_at": now,
+                }
+            ],
+        )
+        await conn.execute(
+            insert(Attachment.__table__),
+            [
+                {
+                    "id": attachment_id,
+                    "session_id": session_id,
+                    "message_id": message_id,
+                    "url": f"https://example.com/{attachment_id}.pdf",
+                    "media_type": MediaType.document,
+                    "created_at": now,
+                }
+                for attachment_id in attachment_ids
+            ],
+        )
+        # Same text everywhere: every hit ranks the same on the same message.
+        await conn.execute(
+            insert(AttachmentContent.__table__),
+            [
+                {"attachment_id": attachment_id, "kind": "document_text", "text": TEXT}
+                for attachment_id in attachment_ids
+            ],
+        )
+    await engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def seeded(pg_engine):
+    asyncio.run(_seed(pg_engine()))
+
+
+async def _pages(engine, limit: int) -> list[tuple]:
+    hits, offset, has_more = [], 0, True
+    async with AsyncSession(engine) as db:
+        while has_more:
+            rows, has_more = await search_messages(db, USER_ID, "patrol", limit, offset)
+            hits.extend((row.source, row.attachment_id) for row in rows)
+            offset += limit
+    await engine.dispose()
+    return hits
+
+
+def test_paging_through_tied_hits_returns_each_once(pg_engine, seeded):
+    whole = asyncio.run(_pages(pg_engine(), limit=ATTACHMENTS + 1))
+    assert len(set(whole)) == ATTACHMENTS + 1
+
+    paged = asyncio.run(_pages(pg_engine(), limit=1))
+    assert paged == whole
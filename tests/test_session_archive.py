@@ -0,0 +1,319 @@
+"""
+Archiving inactive sessions to cold storage and restoring them on access,
+with the filesystem archive backend. Needs Postgres (see tests/conftest.py).
+"""
+import asyncio
+import datetime
+import uuid
+
+import pytest
+
+pytest.importorskip("zstandard")
+
+from sqlalchemy import func, insert, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+
+from app.api.deps import get_current_user  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import (  # noqa: E402
+    Attachment,
+    AttachmentContent,
+    ChatSession,
+    Message,
+    PendingS3Deletion,
+    RoleEnum,
+    User,
+)
+from app.models.attachment import MediaType  # noqa: E402
+from app.services.s3_gc import s3_gc  # noqa: E402
+from app.services.session_archive import archive_inactive_sessions  # noqa: E402
+
+USER_ID = 1
+MESSAGES = 30
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+BUCKET = "session-archive-tests"
+
+
+async def _seed(engine) -> tuple[uuid.UUID, uuid.UUID]:
+    inactive_since = datetime.datetime(2024, 1, 1)
+    inactive, active = uuid.uuid4(), uuid.uuid4()
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(User.__table__),
+            [{"id": USER_ID, "email": "user@example.com", "hashed_password": "x", "is_active": True}],
+        )
+        now = datetime.datetime.utcnow()
+        await conn.execute(
+            insert(ChatSession.__table__),
+            [
+                {"id": inactive, "user_id": USER_ID, "title": "old", "created_at": inactive_since,
+                 "updated_at": inactive_since, "summary": "Earlier: the Quad"},
+                {"id": active, "user_id": USER_ID, "title": "new", "created_at": now,
+                 "updated_at": now, "summary": None},
+            ],
+        )
+        for session_id, started in ((inactive, inactive_since), (active, now)):
+            message_ids = [uuid.uuid4() for _ in range(MESSAGES)]
+            await conn.execute(
+                insert(Message.__table__),
+                [
+                    {
+                        "id": message_id,
+                        "session_id": session_id,
+                        "role": RoleEnum.user if m % 2 == 0 else RoleEnum.assistant,
+                        "content": f"Message {m} on maritime security in the Indian Ocean.",
+                        "created_at": started + datetime.timedelta(seconds=m),
+                    }
+                    for m, message_id in enumerate(message_ids)
+                ],
+            )
+            attachment_id = uuid.uuid4()
+            await conn.execute(
+                insert(Attachment.__table__),
+                [
+                    {
+                        "id": attachment_id,
+                        "session_id": session_id,
+                        "message_id": message_ids[0],
+                        "url": f"https://{BUCKET}.s3.amazonaws.com/uploads/{session_id}.pdf",
+                        "media_type": MediaType.document,
+                        "metadata_": {"filename": "brief.pdf"},
+                        "created_at": started,
+                    }
+                ],
+            )
+            await conn.execute(
+                insert(AttachmentContent.__table__),
+                [{"attachment_id": attachment_id, "kind": "document_text", "text": "Brief"}],
+            )
+    await engine.dispose()
+    return inactive, active
+
+
+@pytest.fixture(scope="module")
+def sessions(pg_engine):
+    return asyncio.run(_seed(pg_engine()))
+
+
+@pytest.fixture(autouse=True)
+def filesystem_archive(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "ARCHIVE_BACKEND", "filesystem")
+    monkeypatch.setattr(settings, "ARCHIVE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "HISTORY_BATCH_SIZE", 7)
+    monkeypatch.setattr(settings, "AWS_S3_BUCKET_NAME", BUCKET)
+    return tmp_path
+
+
+async def _archive(engine) -> int:
+    return await archive_inactive_sessions(
+        session_factory=lambda: AsyncSession(engine, expire_on_commit=False)
+    )
+
+
+async def _hot_rows(engine, session_id) -> tuple[int, int, int]:
+    async with AsyncSession(engine) as db:
+        messages = await db.execute(
+            select(func.count()).select_from(Message).where(Message.session_id == session_id)
+        )
+        attachments = await db.execute(
+            select(func.count()).select_from(Attachment).where(Attachment.session_id == session_id)
+        )
+        contents = await db.execute(select(func.count()).select_from(AttachmentContent))
+        return messages.scalar_one(), attachments.scalar_one(), contents.scalar_one()
+
+
+def _archives(root) -> list:
+    return [path for path in root.rglob("*.ndjson.zst")]
+
+
+def test_archived_session_is_restored_on_first_read(sessions, filesystem_archive, with_client):
+    inactive, active = sessions
+
+    async def test(client, engine):
+        url = f"/api/v1/chat/sessions/{inactive}/messages"
+        before = await client.get(url)
+        assert before.status_code == 200
+        listed_before = await client.get("/api/v1/chat/sessions")
+
+        assert await _archive(engine) == 1
+        assert await _hot_rows(engine, inactive) == (0, 0, 1)
+        assert await _hot_rows(engine, active) == (MESSAGES, 1, 1)
+        (archive,) = _archives(filesystem_archive)
+        assert archive.read_bytes().startswith(ZSTD_MAGIC)
+
+        # The list shows archived sessions without messages, under a new ETag
+        relisted = await client.get(
+            "/api/v1/chat/sessions",
+            headers={"If-None-Match": listed_before.headers["etag"]},
+        )
+        assert relisted.status_code == 200
+        listed = {s["id"]: s for s in relisted.json()}
+        assert listed[str(inactive)]["archived_at"] is not None
+        assert listed[str(inactive)]["messages"] == []
+        assert listed[str(active)]["archived_at"] is None
+
+        # Nothing changed for the client: its cached copy is still current.
+        cached = await client.get(url, headers={"If-None-Match": before.headers["etag"]})
+        assert cached.status_code == 304
+        assert await _hot_rows(engine, inactive) == (0, 0, 1)
+
+        after = await client.get(url)
+        assert after.status_code == 200
+        assert after.json() == before.json()
+        assert after.headers["etag"] == before.headers["etag"]
+        assert await _hot_rows(engine, inactive) == (MESSAGES, 1, 2)
+        assert _archives(filesystem_archive) == []
+
+        async with AsyncSession(engine) as db:
+            session = await db.get(ChatSession, inactive)
+            assert session.archived_at is None and session.archive_key is None
+
+    with_client(test)
+
+
+def test_export_and_delete_read_the_archive(sessions, filesystem_archive, with_client):
+    inactive, _ = sessions
+
+    async def test(client, engine):
+        assert await _archive(engine) == 1
+
+        # Someone else's requests are refused without restoring the session
+        app.dependency_overrides[get_current_user] = lambda: User(id=USER_ID + 1)
+        response = await client.post(
+            f"/api/v1/chat/sessions/{inactive}/messages", json={"content": "hi"}
+        )
+        assert response.status_code == 403
+        response = await client.post(
+            "/api/v1/multimodal/chat", data={"session_id": str(inactive), "prompt": "hi"}
+        )
+        assert response.status_code == 403
+        app.dependency_overrides[get_current_user] = lambda: User(id=USER_ID)
+        assert await _hot_rows(engine, inactive) == (0, 0, 1)
+
+        export = (await client.get("/api/v1/chat/export")).text.splitlines()
+        assert sum('"type":"message"' in line for line in export) == 2 * MESSAGES
+        assert await _hot_rows(engine, inactive) == (0, 0, 1)
+
+        response = await client.delete(f"/api/v1/chat/sessions/{inactive}")
+        assert response.status_code == 204
+        assert _archives(filesystem_archive) == []
+        async with AsyncSession(engine) as db:
+            assert await db.get(ChatSession, inactive) is None
+
+        # The archived upload is queued for the GC, which survives restarts.
+        async with AsyncSession(engine) as db:
+            pending = (await db.execute(select(PendingS3Deletion.key))).scalars().all()
+        assert pending == [f"uploads/{inactive}.pdf"]
+
+        class S3:
+            deleted = []
+
+            def delete_objects(self, keys):
+                self.deleted.extend(keys)
+                return []
+
+        s3 = S3()
+        collected = await s3_gc.collect(s3, lambda: AsyncSession(engine))
+        assert collected == 1 and s3.deleted == pending
+        assert await s3_gc.collect(s3, lambda: AsyncSession(engine)) == 0
+
+    with_client(test)
+
+
+def test_delete_keeps_objects_other_attachments_point_at(sessions, filesystem_archive, with_client):
+    _, active = sessions
+    shared_url = f"https://{BUCKET}.s3.amazonaws.com/uploads/{active}.pdf"
+
+    async def test(client, engine):
+        other = uuid.uuid4()
+        async with AsyncSession(engine) as db:
+            db.add(ChatSession(id=other, user_id=USER_ID, title="copy"))
+            await db.flush()
+            db.add(Attachment(session_id=other, url=shared_url, media_type=MediaType.document))
+            await db.commit()
+
+        response = await client.delete(f"/api/v1/chat/sessions/{active}")
+        assert response.status_code == 204
+        async with AsyncSession(engine) as db:
+            pending = (await db.execute(select(PendingS3Deletion.key))).scalars().all()
+        assert pending == []
+
+    with_client(test)
+
+
+def test_delete_keeps_objects_archived_sessions_point_at(
+    sessions, filesystem_archive, with_client, monkeypatch
+):
+    shared_url = f"https://{BUCKET}.s3.amazonaws.com/uploads/shared.pdf"
+    archived, hot = uuid.uuid4(), uuid.uuid4()
+
+    async def test(client, engine):
+        async with AsyncSession(engine) as db:
+            old = datetime.datetime(2024, 1, 1)
+            db.add(ChatSession(id=archived, user_id=USER_ID, created_at=old, updated_at=old))
+            db.add(ChatSession(id=hot, user_id=USER_ID))
+            await db.flush()
+            for session_id in (archived, hot):
+                db.add(Attachment(session_id=session_id, url=shared_url, media_type=MediaType.document))
+            await db.commit()
+        assert await _archive(engine) == 1
+
+        async def no_archive_reads(key):
+            raise AssertionError("delete must not open the archive")
+            yield
+
+        monkeypatch.setattr(
+            "app.services.session_archive.read_archived_records", no_archive_reads
+        )
+
+        async def pending():
+            async with AsyncSession(engine) as db:
+                return (await db.execute(select(PendingS3Deletion.key))).scalars().all()
+
+        # The archive still needs the upload
+        assert (await client.delete(f"/api/v1/chat/sessions/{hot}")).status_code == 204
+        assert await pending() == []
+
+        assert (await client.delete(f"/api/v1/chat/sessions/{archived}")).status_code == 204
+        assert await pending() == ["uploads/shared.pdf"]
+
+    with_client(test)
+
+
+def test_import_treats_archived_media_as_owned(
+    sessions, filesystem_archive, with_client, monkeypatch
+):
+    upload = f"uploads/{uuid.uuid4()}-brief.pdf"
+    session_id = uuid.uuid4()
+    copies = []
+
+    class FakeS3:
+        def copy_object(self, src_key, dst_key):
+            copies.append(src_key)
+
+    monkeypatch.setattr("app.services.s3_storage.UploadToS3", FakeS3)
+
+    async def test(client, engine):
+        async with AsyncSession(engine) as db:
+            old = datetime.datetime(2024, 1, 1)
+            db.add(ChatSession(id=session_id, user_id=USER_ID, created_at=old, updated_at=old))
+            await db.flush()
+            db.add(
+                Attachment(
+                    session_id=session_id,
+                    url=f"https://{BUCKET}.s3.amazonaws.com/{upload}",
+                    media_type=MediaType.document,
+                )
+            )
+            await db.commit()
+        export = (await client.get("/api/v1/chat/export")).content
+        assert await _archive(engine) == 1
+
+        # /chat uploads carry no user prefix: only the archive vouches for it
+        response = await client.post("/api/v1/chat/import", content=export)
+        assert response.status_code == 200
+        assert response.json()["media_dropped"] == 0
+        assert upload in copies
+
+    with_client(test)
@@ -0,0 +1,34 @@
+"""
+Deadlines of callers sharing a single-flight call (local mode, no database).
+"""
+import asyncio
+
+from app.core.deadline import DeadlineExceeded, remaining, request_deadline, stage
+from app.utils import SingleFlight
+
+
+def test_leader_deadline_does_not_bound_the_shared_call():
+    flight = SingleFlight("test")
+    budgets = []
+
+    async def backend():
+        budgets.append(remaining())
+        await asyncio.sleep(0.3)
+        return "transcript"
+
+    async def caller(seconds: float):
+        with request_deadline(seconds):
+            async with stage("transcribe"):
+                return await flight.do("key", backend)
+
+    async def main():
+        leader = asyncio.create_task(caller(0.1))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(caller(5.0))
+        return await asyncio.gather(leader, follower, return_exceptions=True)
+
+    leader, follower = asyncio.run(main())
+
+    assert isinstance(leader, DeadlineExceeded)
+    assert follower == "transcript"
+    assert len(budgets) == 1 and budgets[0] > 5.0
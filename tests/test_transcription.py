@@ -0,0 +1,86 @@
+"""
+Routing between the speech-to-text backends (the backends themselves are
+replaced).
+"""
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services import speech_to_text
+from app.services.audio_preprocess import ProcessedAudio
+from app.services.speech_to_text import LocalTranscriptionError, transcribe_audio
+
+
+def _clip(duration: float) -> ProcessedAudio:
+    return ProcessedAudio(b"", "audio/ogg", "ogg", "ogg", duration, 0, pcm=b"\0\0")
+
+
+SHORT, LONG = _clip(5.0), _clip(600.0)
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    calls = []
+
+    def fake(name, fails=False):
+        async def transcribe(file_url, content_type, audio):
+            calls.append(name)
+            if fails:
+                raise RuntimeError(f"{name} failed")
+            return {"backend": name}
+
+        return transcribe
+
+    monkeypatch.setattr(settings, "WHISPER_MODEL_DIR", "/models/whisper")
+    monkeypatch.setattr(speech_to_text.aws_transcribe, "transcribe", fake("aws"))
+    monkeypatch.setattr(speech_to_text.local_whisper, "transcribe", fake("local"))
+
+    def use(backend, local_fails=False):
+        monkeypatch.setattr(settings, "TRANSCRIPTION_BACKEND", backend)
+        if local_fails:
+            monkeypatch.setattr(
+                speech_to_text.local_whisper, "transcribe", fake("local", fails=True)
+            )
+        return calls
+
+    return use
+
+
+def _transcribe(audio):
+    return asyncio.run(transcribe_audio("s3://bucket/clip.ogg", "audio/ogg", audio))
+
+
+def test_auto_falls_back_to_aws(backends):
+    calls = backends("auto")
+    assert _transcribe(SHORT) == {"backend": "local"}
+    assert _transcribe(LONG) == {"backend": "aws"}
+    assert _transcribe(None) == {"backend": "aws"}
+
+    calls = backends("auto", local_fails=True)
+    assert _transcribe(SHORT) == {"backend": "aws"}
+    assert calls[-2:] == ["local", "aws"]
+
+
+@pytest.mark.parametrize("audio", [LONG, None])
+def test_local_rejects_clips_it_cannot_take(backends, audio):
+    calls = backends("local")
+    with pytest.raises(LocalTranscriptionError):
+        _transcribe(audio)
+    assert calls == []
+
+
+def test_local_never_falls_back_to_aws(backends, monkeypatch):
+    calls = backends("local", local_fails=True)
+    with pytest.raises(RuntimeError, match="local failed"):
+        _transcribe(SHORT)
+    assert calls == ["local"]
+
+    monkeypatch.setattr(settings, "WHISPER_MODEL_DIR", None)
+    with pytest.raises(LocalTranscriptionError, match="WHISPER_MODEL_DIR"):
+        _transcribe(SHORT)
+
+
+def test_aws_only(backends):
+    backends("aws")
+    assert _transcribe(SHORT) == {"backend": "aws"}